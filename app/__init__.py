@@ -1,29 +1,73 @@
+import threading
 import traceback
-from celery import Celery
-from flask import Flask
+from flask import Flask, has_app_context
 from flask_bcrypt import Bcrypt
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from flask_marshmallow import Marshmallow
-from flask_migrate import Migrate
-from flask_pymongo import PyMongo
-from flask_socketio import SocketIO
 from flask_sqlalchemy import SQLAlchemy
-from graphene_file_upload.flask import FileUploadGraphQLView
+from werkzeug.utils import import_string
 
+from app.replicas import RoutingSession
 from settings.config import app_config
 
 
-db = SQLAlchemy()
-migrate = Migrate()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 ma = Marshmallow()
 bcrypt = Bcrypt()
-celery = Celery(__name__)
 jwt = JWTManager()
-socketio = SocketIO()
-mongo = PyMongo()
+
+# created on first import (`from app import celery`), so processes that never use them never load them
+LAZY_EXTENSIONS = {
+    'celery': lambda: import_string('celery.Celery')(__name__),
+    'migrate': lambda: import_string('flask_migrate.Migrate')(),
+    'socketio': lambda: import_string('flask_socketio.SocketIO')(),
+    'mongo': lambda: import_string('flask_pymongo.PyMongo')(),
+}
+_lazy_lock = threading.Lock()
+
+def __getattr__(name):
+    factory = LAZY_EXTENSIONS.get(name)
+    if factory is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    with _lazy_lock:
+        if name not in globals():
+            globals()[name] = factory()
+    return globals()[name]
 
 def make_celery(app):
+    from app import celery
+
+    class ContextTask(celery.Task):
+        def __call__(self, *args, **kwargs):
+            # eager calls already run in the caller's app context, which need not be `app`
+            if has_app_context():
+                return self.run(*args, **kwargs)
+            with app.app_context():
+                return self.run(*args, **kwargs)
+
+    celery.Task = ContextTask
+    if 'mongo' in app.config['SUBSYSTEMS']:
+        from celery.signals import worker_ready
+
+        @worker_ready.connect(weak=False)
+        def create_mongo_indexes(**kwargs):
+            # the like counters are summed by article on every read, so the index can't wait for a scheduled job
+            from app.mongo_models import ArticleLikeCount
+            with app.app_context():
+                ArticleLikeCount.ensure_indexes()
+
+    beat_schedule = {}
+    if app.config['LIKE_COUNT_RECONCILE_INTERVAL']:
+        beat_schedule['reconcile-like-counts'] = {
+            'task': 'app.tasks.reconcile_like_counts',
+            'schedule': app.config['LIKE_COUNT_RECONCILE_INTERVAL'],
+        }
+    if app.config['TRENDING_REFRESH_INTERVAL']:
+        beat_schedule['refresh-trending-articles'] = {
+            'task': 'app.tasks.refresh_trending_articles',
+            'schedule': app.config['TRENDING_REFRESH_INTERVAL'],
+        }
     # Update Celery configuration
     celery.conf.update(
         broker_url=app.config['CELERY_BROKER_URL'],
@@ -31,24 +75,86 @@ def make_celery(app):
         accept_content=app.config['CELERY_ACCEPT_CONTENT'],
         task_serializer=app.config['CELERY_TASK_SERIALIZER'],
         result_serializer=app.config['CELERY_RESULT_SERIALIZER'],
-        timezone=app.config['CELERY_TIMEZONE']
+        timezone=app.config['CELERY_TIMEZONE'],
+        broker_pool_limit=app.config['CELERY_BROKER_POOL_LIMIT'],
+        broker_connection_timeout=app.config['CELERY_BROKER_CONNECTION_TIMEOUT'],
+        beat_schedule=beat_schedule
     )
     celery.autodiscover_tasks(['app.tasks'])
     return celery
 
-def create_app(config_class):
+def create_app(config_class, role=None, config=None):
+    """`config` overrides settings of `config_class`, most of which are read from the environment at import."""
     app = Flask(__name__)
     app.config.from_object(app_config[config_class])
+    app.config.update(config or {})
+    if app.config['PROXY_FIX_X_FOR']:
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_FIX_X_FOR'])
+
+    from app.subsystems import LazyView, enabled_subsystems
+    app.config['APP_ROLE'] = role = role or app.config['APP_ROLE']
+    app.config['SUBSYSTEMS'] = subsystems = enabled_subsystems(app.config, role)
+
+    from app.admission import admission_controller
+    admission_controller.init_app(app)
+
+    from app.pools import configure_engine_options, configure_redis_pools, install_statement_timeout
+    from app.replicas import configure_replica_binds, replica_router
+    configure_engine_options(app.config)
+    configure_replica_binds(app.config)
+    configure_redis_pools(app.config)
     db.init_app(app)
-    migrate.init_app(app, db)
+    with app.app_context():
+        for engine in db.engines.values():
+            install_statement_timeout(engine, app.config['DB_STATEMENT_TIMEOUT_MS'])
+        replica_router.init_app(app, db)
+    if 'migrate' in subsystems:
+        from app import migrate
+        migrate.init_app(app, db)
     ma.init_app(app)
     bcrypt.init_app(app)
     jwt.init_app(app)
-    socketio.init_app(app, cors_allowed_origins="http://127.0.0.1:5500")
+    async_mode = None
+    if 'socketio' in subsystems:
+        from app import socketio
+        from app.realtime import like_events, message_queue_options
+        socketio.init_app(app, cors_allowed_origins="http://127.0.0.1:5500", **message_queue_options(app.config))
+        like_events.init_app(app)
+        async_mode = socketio.async_mode
     CORS(app, origins=["http://127.0.0.1:5500"])
     
-    mongo.init_app(app)
-    make_celery(app)
+    from app.instrumentation import query_instrumentation
+    if app.config['QUERY_INSTRUMENTATION']:
+        query_instrumentation.init_app(app)
+    if 'mongo' in subsystems:
+        from app import mongo
+        from app.mongo_monitoring import mongo_command_listener, mongo_pool_listener
+        mongo_listeners = [mongo_pool_listener]
+        if app.config['QUERY_INSTRUMENTATION']:
+            mongo_listeners.append(mongo_command_listener)
+        mongo.init_app(app, event_listeners=mongo_listeners, **app.config['MONGO_POOL_OPTIONS'])
+        from app.mongo_models import ArticleLikeCount
+        ArticleLikeCount.configure(app.config['LIKE_COUNT_SHARDS'])
+    if 'celery' in subsystems:
+        make_celery(app)
+
+    from app.cache import article_cache, like_count_cache, search_cache
+    article_cache.init_app(app)
+    like_count_cache.configure(app.config['LIKE_COUNT_CACHE_SIZE'], app.config['LIKE_COUNT_CACHE_TTL'])
+    search_cache.configure(app.config['SEARCH_CACHE_SIZE'], app.config['SEARCH_CACHE_TTL'])
+
+    from app.like_buffer import like_buffer
+    like_buffer.init_app(app)
+
+    from app.trending import trending
+    trending.init_app(app)
+
+    from app.passwords import password_hasher
+    password_hasher.init_app(app, async_mode=async_mode)
+
+    from app.ratelimit import rate_limiter
+    rate_limiter.init_app(app)
 
     @app.errorhandler(Exception)
     def handle_all_exceptions(e):
@@ -57,26 +163,51 @@ def create_app(config_class):
         from app.exceptions import handle_exception
         return handle_exception(e)
     
+    if 'cli' in subsystems:
+        from app.commands import app_cli, articles_cli, auth_cli
+        app.cli.add_command(app_cli)
+        app.cli.add_command(articles_cli)
+        app.cli.add_command(auth_cli)
+
+    if 'graphql' in subsystems:
+        app.add_url_rule('/graphql/auth', 'graphql', LazyView('app.graph_view.graphql_view'), methods=['GET', 'POST', 'PUT', 'DELETE'])
+
+    if 'rest' in subsystems:
+        register_rest_api(app)
+
+    return app
+
+
+def register_rest_api(app):
+    from app.subsystems import subsystem_enabled
+
+
     @app.route('/')
     def index():
         from app.tasks import article_task
         task = article_task.delay(123)
-        socketio.emit('message', {'data': f"Task {task.id} has started."})
+        if subsystem_enabled('socketio'):
+            from app import socketio
+            from app.realtime import TASKS_ROOM
+            socketio.emit('message', {'data': f"Task {task.id} has started."}, to=TASKS_ROOM)
         return f"FLOG: welcome to my blog. Task {task.id}"
     
 
     from app.auth.routes import auth_bp
     from app.article.routes import article_bp
 
-    app.register_blueprint(auth_bp, url_prefix='/api/auth')
-    app.register_blueprint(article_bp, url_prefix='/api/articles')
+    if app.config['ASYNC_MODE']:
+        from app.async_db import async_db, async_mongo, event_loop
+        from app.auth.async_routes import async_auth_bp
+        from app.article.async_routes import async_article_bp
+        async_db.init_app(app)
+        async_mongo.init_app(app)
+        app.async_to_sync = event_loop.async_to_sync
+        app.register_blueprint(async_auth_bp, url_prefix='/api/auth')
+        app.register_blueprint(async_article_bp, url_prefix='/api/articles')
 
-    from app.auth.schema import schema
-    app.add_url_rule(
-        '/graphql/auth',
-        view_func=FileUploadGraphQLView.as_view(
-            'graphql', schema=schema, graphiql=True
-        )
-    )
+    from app.admin.routes import admin_bp
 
-    return app
+    app.register_blueprint(auth_bp, url_prefix='/api/auth')
+    app.register_blueprint(admin_bp, url_prefix='/api/admin')
+    app.register_blueprint(article_bp, url_prefix='/api/articles')
@@ -0,0 +1,21 @@
+from flask import Blueprint
+
+from app import db
+from app.admission import admission_controller
+from app.pools import describe_pools
+from app.replicas import replica_router
+from app.utils import admin_required, success_response
+
+admin_bp = Blueprint('admin_bp', __name__)
+
+
+@admin_bp.route('/metrics/pools/', methods=['GET'])
+@admin_required
+def pool_metrics():
+    return success_response("pool metrics fetched", dict(describe_pools(db), replicas=replica_router.describe()))
+
+
+@admin_bp.route('/metrics/admission/', methods=['GET'])
+@admin_required
+def admission_metrics():
+    return success_response("admission metrics fetched", admission_controller.describe())
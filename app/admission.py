@@ -0,0 +1,120 @@
+import logging
+import threading
+import time
+
+from flask import g, request
+
+from app.exceptions import ServiceUnavailableException
+
+logger = logging.getLogger(__name__)
+
+
+def upstream_wait(header):
+    """Seconds a request spent queued in front of us, from an X-Request-Start of `t=<epoch>` in s, ms or µs."""
+    if not header:
+        return 0.0
+    try:
+        started = float(header.strip().removeprefix('t='))
+    except ValueError:
+        return 0.0
+    if started > 1e14:
+        started /= 1e6
+    elif started > 1e11:
+        started /= 1e3
+    return max(0.0, time.time() - started)
+
+
+class AdmissionController:
+    """Adaptive cap on the number of requests executing at once.
+
+    Requests over the cap wait for a slot. One that has queued for
+    ADMISSION_MAX_QUEUE_MS is shed with a 503 instead of adding to everyone's
+    latency; time spent upstream counts too when ADMISSION_TRUST_REQUEST_START
+    says a proxy sets X-Request-Start (clients can send it as well). The cap adapts AIMD-style: it shrinks by ADMISSION_DECREASE_FACTOR
+    when a request waited longer than ADMISSION_TARGET_QUEUE_MS, and grows by
+    one slot per cap's worth of requests that found it full but got in quickly.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.limit = 32.0
+        self.min_limit = 4
+        self.max_limit = 256
+        self.max_queue = 0.5
+        self.target_queue = 0.05
+        self.decrease_factor = 0.9
+        self.retry_after = 1
+        self.trust_request_start = False
+        self.in_flight = 0
+        self.admitted = 0
+        self.shed = 0
+        self._condition = threading.Condition()
+
+    def init_app(self, app):
+        self.enabled = app.config['ADMISSION_CONTROL']
+        self.limit = float(app.config['ADMISSION_INITIAL_LIMIT'])
+        self.min_limit = app.config['ADMISSION_MIN_LIMIT']
+        self.max_limit = app.config['ADMISSION_MAX_LIMIT']
+        self.max_queue = app.config['ADMISSION_MAX_QUEUE_MS'] / 1000
+        self.target_queue = app.config['ADMISSION_TARGET_QUEUE_MS'] / 1000
+        self.decrease_factor = app.config['ADMISSION_DECREASE_FACTOR']
+        self.retry_after = app.config['ADMISSION_RETRY_AFTER']
+        self.trust_request_start = app.config['ADMISSION_TRUST_REQUEST_START']
+        if self.enabled:
+            app.before_request(self.admit)
+            app.teardown_request(self.release)
+
+    def _decrease(self):
+        self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+
+    def _shed(self, decrease=True):
+        self.shed += 1
+        if decrease:
+            self._decrease()
+        logger.warning(
+            "shedding %s %s: %d in flight, limit %d", request.method, request.path, self.in_flight, int(self.limit)
+        )
+        return ServiceUnavailableException("server is overloaded, retry shortly", self.retry_after)
+
+    def admit(self):
+        started = time.monotonic()
+        upstream = upstream_wait(request.headers.get('X-Request-Start')) if self.trust_request_start else 0.0
+        deadline = started + self.max_queue - upstream
+        with self._condition:
+            if upstream >= self.max_queue:
+                # already waited out its budget in the proxy's queue; that says nothing about our own cap
+                raise self._shed(decrease=False)
+            saturated = self.in_flight >= int(self.limit)
+            while self.in_flight >= int(self.limit):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise self._shed()
+                self._condition.wait(remaining)
+            self.in_flight += 1
+            self.admitted += 1
+            waited = time.monotonic() - started + upstream
+            if waited > self.target_queue:
+                self._decrease()
+            elif saturated:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+        g.admitted = True
+
+    def release(self, exc=None):
+        if not g.pop('admitted', False):
+            return
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify()
+
+    def describe(self):
+        with self._condition:
+            return {
+                'enabled': self.enabled,
+                'limit': int(self.limit),
+                'in_flight': self.in_flight,
+                'admitted': self.admitted,
+                'shed': self.shed,
+            }
+
+
+admission_controller = AdmissionController()
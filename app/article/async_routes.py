@@ -0,0 +1,83 @@
+
+from flask import Blueprint, current_app, request
+from flask_jwt_extended import jwt_required
+from sqlalchemy import select
+
+from app.async_db import async_db, run_blocking
+from app.article.routes import (
+    article_cache_entry, article_response, get_article_fields, list_etag, serialize_articles,
+    validators_response, wants_like_counts, wants_revalidation,
+)
+from app.cache import article_cache
+from app.models import Article
+from app.pagination import build_page, keyset_window
+from app.schemas import article_list_schema
+from app.serializers import article_serializer
+from app.utils import add_validators, not_modified_response, success_response
+
+
+# registered ahead of article_bp in async mode; routes not defined here fall through to the sync views
+async_article_bp = Blueprint('async_article_bp', __name__)
+
+
+def project_select(fields, *criteria):
+    if current_app.config['FAST_SERIALIZER']:
+        columns = article_serializer.columns(fields, extra=(Article.id, Article.created_at))
+        return select(*columns).where(*criteria)
+    stmt = select(Article).where(*criteria)
+    return stmt if fields is None else stmt.options(Article.load_fields(fields))
+
+
+async def fetch_page(stmt, cursor):
+    stmt, direction, limit = keyset_window(stmt, cursor)
+    async with async_db.session() as session:
+        result = await session.execute(stmt)
+        items = result.all() if current_app.config['FAST_SERIALIZER'] else result.scalars().all()
+    return build_page(items, direction, cursor, limit)
+
+
+async def fetch_list_validators(**filters):
+    async with async_db.session() as session:
+        return await Article.get_list_validators_async(session, **filters)
+
+
+@async_article_bp.route('/', methods=['GET'])
+async def get_all_public_articles():
+    fields = get_article_fields()
+    cursor = request.args.get('cursor')
+    stmt = project_select(fields, Article.is_public == True)
+
+    if wants_like_counts():
+        # like counts live in mongo and aren't covered by the validators
+        articles, page = await fetch_page(stmt, cursor)
+        data = await article_list_schema(fields).embed_like_counts_async(serialize_articles(articles, fields))
+        return success_response("all public articles fetched", data, meta=page)
+
+    # the page query only runs once the validators say there is no 304
+    last_modified, count = await fetch_list_validators(is_public=True)
+    etag = list_etag({'is_public': True}, last_modified, count)
+    not_modified = not_modified_response(etag)
+    if not_modified:
+        return not_modified
+    articles, page = await fetch_page(stmt, cursor)
+    response, status_code = success_response("all public articles fetched", serialize_articles(articles, fields), meta=page)
+    return add_validators(response, etag), status_code
+
+
+@async_article_bp.route('/<string:slug>/', methods=['GET'])
+@jwt_required()
+async def get_article_by_slug(slug):
+    # the cache may sit on a shared redis tier and waits on concurrent loads, so it stays off the loop
+    entry = await run_blocking(article_cache.peek, slug)
+    if entry is None:
+        async with async_db.session() as session:
+            if wants_revalidation():
+                not_modified = validators_response(await Article.get_validators_async(session, slug))
+                if not_modified:
+                    return not_modified
+            article = await Article.get_by_slug_async(session, slug)
+            loaded = article_cache_entry(article) if article else None
+        if loaded is not None:
+            # fills both cache tiers; the loader just hands back what was fetched
+            entry = await run_blocking(article_cache.get_or_load, slug, lambda: loaded)
+    return article_response(entry)
@@ -1,63 +1,234 @@
-from flask import Blueprint, request, jsonify
+import json
+from datetime import datetime
+
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
 
-from app import db, socketio
+from app import db
+from app.cache import article_cache
+from app.exceptions import BadRequestException, NotFoundException
+from app.importer import import_articles
+from app.like_buffer import like_buffer
 from app.models import Article, Like
-from app.schemas import ArticleSchema, LikeSchema
-from app.utils import article_ownership_required, error_response, success_response
-from app.tasks import update_like_count
+from app.pagination import get_page_limit, paginate_articles
+from app.ratelimit import rate_limited
+from app.realtime import like_events
+from app.replicas import replica_reads, use_primary
+from app.search import search_public_articles as search_articles
+from app.trending import trending
+from app.serializers import article_serializer
+from app.schemas import ARTICLE_FIELDS, ARTICLE_VIEWS, ArticleSchema, LikeSchema, article_list_schema
+from app.utils import add_validators, error_response, make_etag, not_modified_response, success_response
 
 
 article_bp = Blueprint('article_bp', __name__)
 
 article_schema = ArticleSchema()
-articles_schema = ArticleSchema(many=True)
 like_schema = LikeSchema()
 
+def get_article_fields(default=None):
+    """Fields requested through ?view= or ?fields=, as a sorted tuple; `default` when neither is given."""
+    view = request.args.get('view')
+    if view:
+        if view not in ARTICLE_VIEWS:
+            raise BadRequestException(f"unknown view: {view}")
+        return ARTICLE_VIEWS[view]
+    requested = {name.strip() for name in request.args.get('fields', '').split(',') if name.strip()}
+    if not requested:
+        return default
+    unknown = requested - ARTICLE_FIELDS
+    if unknown:
+        raise BadRequestException(f"unknown fields: {', '.join(sorted(unknown))}")
+    return tuple(sorted(requested | {'id'}))
+
+def project(query, fields):
+    if current_app.config['FAST_SERIALIZER']:
+        # plain Row tuples; id/created_at ride along for the keyset cursors
+        return query.with_entities(*article_serializer.columns(fields, extra=(Article.id, Article.created_at)))
+    return query if fields is None else query.options(Article.load_fields(fields))
+
+def serialize_articles(articles, fields=None):
+    if current_app.config['FAST_SERIALIZER']:
+        return article_serializer.dump(articles, fields)
+    return article_list_schema(fields).dump(articles)
+
+def dump_articles(articles, fields=None):
+    data = serialize_articles(articles, fields)
+    if wants_like_counts():
+        article_list_schema(fields).embed_like_counts(data)
+    return data
+
+
+def wants_like_counts():
+    return 'like_count' in request.args.get('include', '').split(',')
+
+def list_etag(filters, last_modified, count):
+    return make_etag('articles', sorted(filters.items()), request.full_path, last_modified, count)
+
+def list_articles(message, **filters):
+    etag = None
+    # like counts live in mongo and aren't covered by the validators
+    if not wants_like_counts():
+        last_modified, count = Article.get_list_validators(**filters)
+        etag = list_etag(filters, last_modified, count)
+        # ETag only: deleting or unpublishing an article changes the count but not the newest timestamp,
+        # so If-Modified-Since would answer 304 for a list that lost a row
+        not_modified = not_modified_response(etag)
+        if not_modified:
+            return not_modified
+
+    fields = get_article_fields()
+    query = project(Article.query.filter_by(**filters), fields)
+    articles, page = paginate_articles(query, request.args.get('cursor'))
+    response, status_code = success_response(message, dump_articles(articles, fields), meta=page)
+    if etag:
+        add_validators(response, etag)
+    return response, status_code
+
+
 @article_bp.route('/', methods=['GET'])
 def get_all_public_articles():
-    articles = Article.query.filter_by(is_public=True).all()
-    return success_response("all public articles fetched", articles_schema.dump(articles))
+    return list_articles("all public articles fetched", is_public=True)
 
 
 @article_bp.route('/user/published/', methods=['GET'])
 @jwt_required()
 def get_all_published_articles():
     user = get_jwt_identity()
-    articles = Article.query.filter_by(is_public=True, user_id=user['id']).all()
-    return success_response("users published articles fetched", articles_schema.dump(articles))
+    return list_articles("users published articles fetched", is_public=True, user_id=user['id'])
 
 @article_bp.route('/user/private/', methods=['GET'])
 @jwt_required()
 def get_all_draft_articles():
     user = get_jwt_identity()
-    articles = Article.query.filter_by(is_public=False, user_id=user['id']).all()
-    return success_response("users draft articles fetched", articles_schema.dump(articles))
+    return list_articles("users draft articles fetched", is_public=False, user_id=user['id'])
+
+
+def ndjson_export(batch_size, **filters):
+    def generate():
+        # queried here, not in the view: the view's session is closed by teardown before streaming starts
+        for article in Article.iter_batched(batch_size, **filters):
+            yield json.dumps(article_schema.dump(article)) + '\n'
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+@article_bp.route('/export/', methods=['GET'])
+def export_public_articles():
+    batch_size = current_app.config['ARTICLES_EXPORT_BATCH_SIZE']
+    return ndjson_export(batch_size, is_public=True)
+
+
+@article_bp.route('/user/export/', methods=['GET'])
+@jwt_required()
+def export_user_articles():
+    user = get_jwt_identity()
+    batch_size = current_app.config['ARTICLES_EXPORT_BATCH_SIZE']
+    return ndjson_export(batch_size, user_id=user['id'])
 
 
 @article_bp.route('/search/', methods=['POST'])
+@rate_limited('search')
+@replica_reads
 def search_public_articles():
     data = request.get_json()
     query = data.get('q')
     if not query:
         return jsonify([])
 
-    results = Article.query.filter(
-        Article.is_public == True,
-        Article.search_vector.match(query)
-    ).all()
+    max_limit = current_app.config['ARTICLES_MAX_PAGE_SIZE']
+    try:
+        limit = max(1, min(int(data.get('limit', current_app.config['ARTICLES_PAGE_SIZE'])), max_limit))
+        offset = max(0, int(data.get('offset', 0)))
+    except (TypeError, ValueError):
+        return error_response("limit and offset must be integers", 400)
+
+    fields = get_article_fields(ARTICLE_VIEWS['search'])
+    rows, next_offset = search_articles(query, limit, offset, fields)
+    results = dump_articles([article for article, _ in rows], fields)
+    for item, (_, snippet) in zip(results, rows):
+        item['snippet'] = snippet
+    page = {'limit': limit, 'offset': offset, 'next_offset': next_offset}
+    return success_response("searched articles fetched", results, meta=page)
 
-    return success_response("searched articles fetched", articles_schema.dump(results))
+
+@article_bp.route('/trending/', methods=['GET'])
+def get_trending_articles():
+    limit = get_page_limit()
+    offset = max(0, request.args.get('offset', 0, type=int))
+    page_ids, scores, next_offset, generated_at = trending.page(offset, limit)
+
+    fields = get_article_fields()
+    articles = []
+    if page_ids:
+        query = project(Article.query.filter(Article.id.in_(page_ids), Article.is_public == True), fields)
+        articles = query.all()
+        # articles made private or deleted since the ranking was computed are skipped
+        position = {article_id: index for index, article_id in enumerate(page_ids)}
+        articles.sort(key=lambda article: position[article.id])
+    score_of = dict(zip(page_ids, scores))
+    results = dump_articles(articles, fields)
+    for item, article in zip(results, articles):
+        item['trending_score'] = score_of[article.id]
+    page = {'limit': limit, 'offset': offset, 'next_offset': next_offset, 'generated_at': generated_at}
+    return success_response("trending articles fetched", results, meta=page)
+
+
+def article_cache_entry(article):
+    return {
+        'is_public': article.is_public,
+        'user_id': article.user_id,
+        'etag': make_etag('article', article.id, article.modified_at),
+        'modified_at': article.modified_at.isoformat(),
+        'data': article_schema.dump(article),
+    }
+
+def can_view(is_public, user_id):
+    return is_public or get_jwt_identity()['id'] == user_id
+
+def wants_revalidation():
+    return bool(request.if_none_match or request.if_modified_since)
+
+def validators_response(validators):
+    """304 straight from the narrow validator lookup, so a hit skips the load and dump."""
+    if validators is None:
+        raise NotFoundException("article not found.")
+    article_id, is_public, user_id, modified_at = validators
+    if can_view(is_public, user_id):
+        return not_modified_response(make_etag('article', article_id, modified_at), modified_at)
+    return None
+
+def article_response(entry):
+    if entry is None:
+        raise NotFoundException("article not found.")
+    if can_view(entry['is_public'], entry['user_id']):
+        modified_at = datetime.fromisoformat(entry['modified_at'])
+        not_modified = not_modified_response(entry['etag'], modified_at)
+        if not_modified:
+            return not_modified
+        response, status_code = success_response("article fetched", entry['data'])
+        return add_validators(response, entry['etag'], modified_at), status_code
+    else:
+        return error_response("you dont have permission to view this one", 401)
 
 
 @article_bp.route('/<string:slug>/', methods=['GET'])
 @jwt_required()
 def get_article_by_slug(slug):
-    article = Article.query.filter_by(slug=slug).first_or_404()
-    if article.is_public or get_jwt_identity()['id'] == article.user_id:
-        return success_response("article fetched", article_schema.dump(article))
-    else:
-        return error_response("you dont have permission to view this one", 401)
+    def load():
+        # a lagging replica would put a stale row, and its ETag, in the cache for minutes
+        with use_primary():
+            article = Article.query.filter_by(slug=slug).first()
+        return article_cache_entry(article) if article else None
+
+    entry = article_cache.peek(slug)
+    if entry is None and wants_revalidation():
+        not_modified = validators_response(Article.get_validators(slug))
+        if not_modified:
+            return not_modified
+
+    if entry is None:
+        entry = article_cache.get_or_load(slug, load)
+    return article_response(entry)
 
 
 @article_bp.route('/', methods=['POST'])
@@ -75,13 +246,29 @@ def create_article():
     return success_response("article created", article_schema.dump(article), 201)
 
 
+@article_bp.route('/import/', methods=['POST'])
+@jwt_required()
+def bulk_import_articles():
+    # NDJSON bodies are read line by line; a JSON array is accepted as well
+    user_id = get_jwt_identity()['id']
+    batch_size = current_app.config['ARTICLES_IMPORT_BATCH_SIZE']
+    if request.is_json:
+        records = request.get_json()
+        if not isinstance(records, list):
+            return error_response("expected a JSON array of articles", 400)
+    else:
+        records = request.stream
+    imported, errors = import_articles(records, user_id, batch_size)
+    return success_response("articles imported", {'imported': imported, 'errors': errors}, 201 if imported else 200)
+
+
 @article_bp.route('/<int:article_id>/', methods=['PUT'])
 @jwt_required()
-@article_ownership_required
 def update_article(article_id):
     data = request.get_json()
     Article.update(
         article_id,
+        get_jwt_identity()['id'],
         title=data.get('title'),
         content=data.get('content'),
         hero_image=data.get('hero_image'),
@@ -92,43 +279,45 @@ def update_article(article_id):
 
 @article_bp.route('/<int:article_id>/public/', methods=['PUT'])
 @jwt_required()
-@article_ownership_required
 def make_article_public(article_id):
-    Article.update(article_id, is_public=True)
+    Article.update(article_id, get_jwt_identity()['id'], is_public=True)
     return success_response("article made public")
     
 
 
 @article_bp.route('/<int:article_id>/private/', methods=['PUT'])
 @jwt_required()
-@article_ownership_required
 def make_article_private(article_id):
-    Article.update(article_id, is_public=False)
+    Article.update(article_id, get_jwt_identity()['id'], is_public=False)
     return success_response("article made private/draft")
 
 
 @article_bp.route('/<int:article_id>/', methods=['DELETE'])
 @jwt_required()
-@article_ownership_required
 def delete_article(article_id):
-    Article.delete(article_id)
+    Article.delete(article_id, get_jwt_identity()['id'])
     return success_response("article trashed")
 
 
 @article_bp.route('/<int:article_id>/like/', methods=['GET'])
+@rate_limited('like')
 @jwt_required()
 def like_article(article_id):
     user_id = get_jwt_identity()['id']
     Like.add(user_id, article_id)
-    task = update_like_count.delay(article_id, 1)
-    socketio.emit('message', {'data': f"Task {task.id} has started."})
+    like_buffer.add(article_id, 1)
+    trending.record(article_id)
+    like_events.add(article_id, 1)
     return success_response("article liked")
 
 @article_bp.route('/<int:article_id>/unlike/', methods=['GET'])
 @jwt_required()
 def unlike_article(article_id):
     user_id = get_jwt_identity()['id']
-    Like.delete(user_id, article_id)
-    task = update_like_count.delay(article_id, -1)
-    socketio.emit('message', {'data': f"Task {task.id} has started."})
+    # a GET that reads then deletes; the lookup must see the like the user just made
+    with use_primary():
+        liked_at = Like.delete(user_id, article_id)
+    like_buffer.add(article_id, -1)
+    trending.record(article_id, liked_at, -1)
+    like_events.add(article_id, -1)
     return success_response("article unliked")
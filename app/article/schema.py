@@ -0,0 +1,35 @@
+import graphene
+from graphene import relay
+from graphene_sqlalchemy import SQLAlchemyObjectType
+from graphene_sqlalchemy.fields import UnsortedSQLAlchemyConnectionField
+
+from app.loaders import get_loaders
+from app.models import Article
+
+
+class ArticleType(SQLAlchemyObjectType):
+    class Meta:
+        model = Article
+        interfaces = (relay.Node,)
+        exclude_fields = ('search_vector', 'user')
+
+    author = graphene.Field('app.auth.schema.UserType')
+    like_count = graphene.Int()
+
+    def resolve_author(self, info):
+        return get_loaders().users.load(self.user_id)
+
+    def resolve_like_count(self, info):
+        return get_loaders().like_counts.load(self.id)
+
+
+class ArticleQuery(graphene.ObjectType):
+    articles = UnsortedSQLAlchemyConnectionField(ArticleType)
+    article = graphene.Field(ArticleType, slug=graphene.String(required=True))
+
+    def resolve_articles(self, info, **kwargs):
+        # the connection field slices this query with OFFSET/LIMIT per page
+        return Article.query.filter_by(is_public=True).order_by(Article.created_at.desc(), Article.id.desc())
+
+    def resolve_article(self, info, slug):
+        return Article.query.filter_by(slug=slug, is_public=True).first()
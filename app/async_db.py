@@ -0,0 +1,157 @@
+import asyncio
+import contextvars
+import threading
+from functools import wraps
+
+from sqlalchemy.engine import make_url
+
+ASYNC_DRIVERS = {
+    'postgresql': 'postgresql+asyncpg',
+    'sqlite': 'sqlite+aiosqlite',
+}
+
+
+def async_database_uri(uri):
+    url = make_url(uri)
+    drivername = ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername)
+    return url.set(drivername=drivername).render_as_string(hide_password=False)
+
+
+class EventLoopThread:
+    """One event loop, on a background thread, that every async view runs on.
+
+    Flask runs an async view through `app.async_to_sync`, whose default starts
+    a fresh loop per call, so each request would open its own engine and pool.
+    Routed here instead, views from every WSGI worker thread share this loop
+    and the asyncpg/pymongo pools opened on it; the request thread only waits
+    for its coroutine. Anything blocking inside a view goes through
+    `run_blocking` so it doesn't stall the other requests on the loop.
+    """
+
+    def __init__(self):
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self):
+        if self._loop is None:
+            with self._lock:
+                if self._loop is None:
+                    loop = asyncio.new_event_loop()
+                    self._thread = threading.Thread(target=loop.run_forever, name='async-views', daemon=True)
+                    self._thread.start()
+                    self._loop = loop
+        return self._loop
+
+    def async_to_sync(self, func):
+        @wraps(func)
+        def run(*args, **kwargs):
+            if threading.current_thread() is self._thread:
+                raise RuntimeError("can't wait on the async view loop from inside it")
+            # the coroutine's task copies this thread's context, so Flask's request context comes along
+            return asyncio.run_coroutine_threadsafe(func(*args, **kwargs), self.loop).result()
+        return run
+
+
+async def run_blocking(fn, *args):
+    """Run a blocking call (sync redis, a lock wait) on the default executor, in the caller's context."""
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(None, context.run, fn, *args)
+
+
+class PerLoop:
+    """One client per running event loop.
+
+    asyncpg and pymongo's async client bind their connections to the loop that
+    opened them. Views all run on the EventLoopThread loop and share its
+    client; any other loop (a script, a test) gets its own, which is disposed
+    once that loop has closed.
+    """
+
+    def __init__(self, factory, dispose=None):
+        self.factory = factory
+        self.dispose = dispose
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def get(self):
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None or len(self._clients) > 1:
+            with self._lock:
+                self._sweep()
+                client = self._clients.get(loop)
+                if client is None:
+                    client = self._clients[loop] = self.factory()
+        return client
+
+    def _sweep(self):
+        for loop in [loop for loop in self._clients if loop.is_closed()]:
+            client = self._clients.pop(loop)
+            if self.dispose:
+                self.dispose(client)
+
+
+class AsyncDatabase:
+    """Async SQLAlchemy engine/session factory for the opt-in async mode."""
+
+    def __init__(self):
+        self.uri = None
+        self.engine_options = {}
+        self._engines = None
+
+    def init_app(self, app):
+        self.uri = app.config['ASYNC_DATABASE_URI'] or async_database_uri(app.config['SQLALCHEMY_DATABASE_URI'])
+        self.engine_options = dict(app.config.get('ASYNC_ENGINE_OPTIONS', {}))
+        timeout_ms = app.config['DB_STATEMENT_TIMEOUT_MS']
+        if timeout_ms and self.uri.startswith('postgresql+asyncpg'):
+            self.engine_options.setdefault('connect_args', {'server_settings': {'statement_timeout': str(timeout_ms)}})
+        self._engines = PerLoop(self._create_engine, self._dispose_engine)
+        app.extensions['async_db'] = self
+
+    def _create_engine(self):
+        from sqlalchemy.ext.asyncio import create_async_engine
+        return create_async_engine(self.uri, **self.engine_options)
+
+    @staticmethod
+    def _dispose_engine(engine):
+        # its loop is gone, so the connections can only be dropped, not closed gracefully
+        engine.sync_engine.dispose(close=False)
+
+    @property
+    def engine(self):
+        return self._engines.get()
+
+    def session(self):
+        from sqlalchemy.ext.asyncio import AsyncSession
+        return AsyncSession(self.engine, expire_on_commit=False)
+
+
+class AsyncMongo:
+    """pymongo's native async client, for the opt-in async mode."""
+
+    def __init__(self):
+        self.uri = None
+        self.options = {}
+        self._clients = None
+
+    def init_app(self, app):
+        self.uri = app.config['MONGO_URI']
+        self.options = app.config['MONGO_POOL_OPTIONS']
+        self._clients = PerLoop(self._create_client)
+        app.extensions['async_mongo'] = self
+
+    def _create_client(self):
+        from pymongo import AsyncMongoClient
+        from app.mongo_monitoring import mongo_pool_listener
+        return AsyncMongoClient(self.uri, event_listeners=[mongo_pool_listener], **self.options)
+
+    @property
+    def db(self):
+        return self._clients.get().get_default_database()
+
+
+event_loop = EventLoopThread()
+async_db = AsyncDatabase()
+async_mongo = AsyncMongo()
@@ -0,0 +1,37 @@
+from flask import Blueprint, request
+from flask_jwt_extended import create_access_token, create_refresh_token, get_jwt_identity, jwt_required
+
+from app.async_db import async_db
+from app.models import User
+from app.passwords import verify_and_rehash_async
+from app.ratelimit import rate_limited
+from app.utils import error_response, success_response
+
+# registered ahead of auth_bp in async mode; routes not defined here fall through to the sync views
+async_auth_bp = Blueprint('async_auth_bp', __name__)
+
+
+@async_auth_bp.route('/login/', methods=['POST'])
+@rate_limited('login')
+async def login():
+    data = request.get_json()
+    async with async_db.session() as session:
+        user = await User.get_user_by_email_async(session, data['email'])
+        if await verify_and_rehash_async(session, user, data['password']):
+            access_token = create_access_token(identity={'id': user.id, 'is_admin': user.is_admin})
+            refresh_token = create_refresh_token(identity={'id': user.id, 'is_admin': user.is_admin})
+            return success_response("logged in successfully", {
+                'access_token': access_token,
+                'refresh_token': refresh_token
+            })
+        else:
+            return error_response('Invalid credentials', 401)
+
+
+@async_auth_bp.route("/profile/", methods=["GET"])
+@jwt_required()
+async def profile():
+    current_user = get_jwt_identity()
+    async with async_db.session() as session:
+        user = await User.get_user_data_async(session, current_user['id'])
+    return success_response("profile fetched", user)
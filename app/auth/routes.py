@@ -1,8 +1,10 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity, create_refresh_token
 
-from app import db, bcrypt
+from app import db
 from app.models import User
+from app.passwords import hash_password, verify_and_rehash
+from app.ratelimit import rate_limited
 from app.schemas import UserSchema
 from app.utils import error_response, success_response
 
@@ -11,22 +13,24 @@ auth_bp = Blueprint('auth_bp', __name__)
 user_schema = UserSchema()
 
 @auth_bp.route('/register/', methods=['POST'])
+@rate_limited('register')
 def register():
     data = request.get_json()
     errors = user_schema.validate(data, session=db.session)
     if errors:
         return jsonify(errors), 400
 
-    hashed_password = bcrypt.generate_password_hash(data['password']).decode('utf-8')
+    hashed_password = hash_password(data['password'])
     User.add(data['name'], data['email'], hashed_password)
     return success_response("user registered.", {}, 201)
 
 
 @auth_bp.route('/login/', methods=['POST'])
+@rate_limited('login')
 def login():
     data = request.get_json()
     user = User.get_user_by_email(data['email'])
-    if bcrypt.check_password_hash(user.password, data['password']):
+    if verify_and_rehash(user, data['password']):
         access_token = create_access_token(identity={'id': user.id, 'is_admin': user.is_admin})
         refresh_token = create_refresh_token(identity={'id': user.id, 'is_admin': user.is_admin})
         return success_response("logged in successfully", {
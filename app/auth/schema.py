@@ -1,15 +1,29 @@
 import graphene
 from graphene_sqlalchemy import SQLAlchemyObjectType
+from graphene_sqlalchemy.fields import UnsortedSQLAlchemyConnectionField
 from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt_identity
 
-from app import db, bcrypt
+from app import db
+from app.loaders import connection_limit, get_loaders
 from app.models import User
-from app.utils import ResponseType
+from app.passwords import hash_password, verify_and_rehash
+
+# Response type for success or error messages
+class ResponseType(graphene.ObjectType):
+    status = graphene.String()
+    message = graphene.String()
+    data = graphene.String()  # Optional: Adjust based on what type of data you expect to return.
 
 # SQLAlchemy UserType for GraphQL
 class UserType(SQLAlchemyObjectType):
     class Meta:
         model = User
+        exclude_fields = ('password', 'articles')
+
+    articles = UnsortedSQLAlchemyConnectionField('app.article.schema.ArticleType')
+
+    def resolve_articles(self, info, **kwargs):
+        return get_loaders().articles_by_user.load((self.id, connection_limit(kwargs)))
 
 # User Schema for registering new users and validating their data
 class RegisterInput(graphene.InputObjectType):
@@ -29,7 +43,7 @@ class RegisterUser(graphene.Mutation):
         if existing_user:
             return RegisterUser(response=ResponseType(status="error", message="User with this email already exists"))
 
-        hashed_password = bcrypt.generate_password_hash(input.password).decode('utf-8')
+        hashed_password = hash_password(input.password)
         new_user = User(name=input.name, email=input.email, password=hashed_password)
         db.session.add(new_user)
         db.session.commit()
@@ -49,7 +63,7 @@ class LoginUser(graphene.Mutation):
 
     def mutate(self, info, email, password):
         user = User.query.filter_by(email=email).first()
-        if not user or not bcrypt.check_password_hash(user.password, password):
+        if not user or not verify_and_rehash(user, password):
             return LoginUser(response=ResponseType(status="error", message="Invalid credentials"))
 
         access_token = create_access_token(identity={'id': user.id, 'is_admin': user.is_admin})
@@ -71,18 +85,18 @@ class Query(graphene.ObjectType):
     @jwt_required()
     def resolve_profile(self, info):
         current_user = get_jwt_identity()
-        user = User.query.get(current_user['id'])
-        if not user:
-            return None
-        return user
+        return get_loaders().users.load(current_user['id'])
 
     @jwt_required()
     def resolve_response(self, info):
         current_user = get_jwt_identity()
-        user = User.query.get(current_user['id'])
-        if not user:
-            return ResponseType(status="error", message="User not found")
-        return ResponseType(status="success", message="Profile fetched successfully")
+
+        def respond(user):
+            if not user:
+                return ResponseType(status="error", message="User not found")
+            return ResponseType(status="success", message="Profile fetched successfully")
+
+        return get_loaders().users.load(current_user['id']).then(respond)
 
 
 # Mutation for Refreshing Access Token
@@ -104,7 +118,4 @@ class RefreshToken(graphene.Mutation):
 class Mutation(graphene.ObjectType):
     register = RegisterUser.Field()
     login = LoginUser.Field()
-    refresh_token = RefreshToken.Field()
-
-# Combine Queries and Mutations into the GraphQL Schema
-schema = graphene.Schema(query=Query, mutation=Mutation)
\ No newline at end of file
+    refresh_token = RefreshToken.Field()
\ No newline at end of file
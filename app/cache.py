@@ -0,0 +1,203 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """In-process LRU cache whose entries also expire after `ttl` seconds."""
+
+    def __init__(self, maxsize=1024, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def configure(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clear()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class MemoryBackend:
+    """Shared-tier stand-in that keeps values in this process; used for tests and local runs."""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at < time.time():
+                del self._data[key]
+                return None
+            return json.loads(value)
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (json.dumps(value), time.time() + ttl)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+
+class RedisBackend:
+    def __init__(self, url):
+        from app.pools import get_redis
+        self.client = get_redis(url)
+
+    def get(self, key):
+        value = self.client.get(key)
+        return json.loads(value) if value is not None else None
+
+    def set(self, key, value, ttl):
+        self.client.set(key, json.dumps(value), ex=ttl)
+
+    def delete(self, *keys):
+        if keys:
+            self.client.delete(*keys)
+
+
+def make_backend(name, url=None):
+    if not name:
+        return None
+    if name == 'memory':
+        return MemoryBackend()
+    if name == 'redis':
+        return RedisBackend(url)
+    raise ValueError(f"unknown cache backend: {name}")
+
+
+class SingleFlight:
+    """Collapses concurrent calls for the same key into one execution of `fn`."""
+
+    class _Call:
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = self._Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+
+class TwoTierCache:
+    """Read-through cache: in-process LRU in front of an optional shared backend.
+
+    The local tier is not invalidated across processes, so its TTL should stay
+    short; the shared tier is invalidated explicitly.
+    """
+
+    def __init__(self, namespace, app=None):
+        self.namespace = namespace
+        self.local = None
+        self.shared = None
+        self.shared_ttl = 0
+        self.flight = SingleFlight()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        prefix = self.namespace.upper()
+        self.local = LRUCache(app.config[f'{prefix}_CACHE_SIZE'], app.config[f'{prefix}_CACHE_TTL'])
+        self.shared = make_backend(app.config[f'{prefix}_CACHE_BACKEND'], app.config.get('CACHE_REDIS_URL'))
+        self.shared_ttl = app.config[f'{prefix}_CACHE_SHARED_TTL']
+
+    def _key(self, key):
+        return f"{self.namespace}:{key}"
+
+    def peek(self, key):
+        value = self.local.get(key)
+        if value is None and self.shared:
+            value = self.shared.get(self._key(key))
+            if value is not None:
+                self.local.set(key, value)
+        return value
+
+    def get_or_load(self, key, loader):
+        value = self.local.get(key)
+        if value is not None:
+            return value
+
+        def load():
+            value = self.shared.get(self._key(key)) if self.shared else None
+            if value is None:
+                value = loader()
+                if value is not None and self.shared:
+                    self.shared.set(self._key(key), value, self.shared_ttl)
+            if value is not None:
+                self.local.set(key, value)
+            return value
+
+        return self.flight.do(key, load)
+
+    def invalidate(self, *keys):
+        if self.local is None:
+            return
+        for key in keys:
+            self.local.delete(key)
+        if self.shared:
+            self.shared.delete(*(self._key(key) for key in keys))
+
+
+article_cache = TwoTierCache('article')
+like_count_cache = LRUCache(maxsize=4096, ttl=5)
+search_cache = LRUCache(maxsize=256, ttl=60)
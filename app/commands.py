@@ -0,0 +1,157 @@
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import select, update
+
+from app import bcrypt, db
+from app.importer import import_articles
+from app.models import Article
+
+articles_cli = AppGroup('articles', help="Article maintenance commands.")
+auth_cli = AppGroup('auth', help="Authentication maintenance commands.")
+app_cli = AppGroup('app', help="Application setup and diagnostics.")
+
+
+@articles_cli.command('reindex')
+@click.option('--batch-size', default=500, show_default=True, help="Rows updated per transaction.")
+@click.option('--rate', default=2000, show_default=True, help="Maximum rows per second.")
+@click.option('--after-id', default=0, show_default=True, help="Resume after this article id.")
+def reindex_search_vectors(batch_size, rate, after_id):
+    """Rebuild search_vector in small id-ordered batches, committing each one."""
+    last_id = after_id
+    total = 0
+    while True:
+        started = time.monotonic()
+        batch_ids = select(Article.id).where(Article.id > last_id).order_by(Article.id).limit(batch_size)
+        stmt = (
+            update(Article)
+            .where(Article.id.in_(batch_ids))
+            .values(
+                search_vector=Article.search_vector_expression(Article.title, Article.content),
+                updated_at=Article.updated_at,  # not a content change; keep onupdate from firing
+            )
+            .returning(Article.id)
+        )
+        updated = db.session.execute(stmt, execution_options={'synchronize_session': False}).scalars().all()
+        db.session.commit()
+        if not updated:
+            break
+
+        last_id = max(updated)
+        total += len(updated)
+        click.echo(f"reindexed {total} articles (resume with --after-id {last_id})")
+        time.sleep(max(0.0, len(updated) / rate - (time.monotonic() - started)))
+
+    click.echo(f"done, {total} articles reindexed")
+
+
+@articles_cli.command('import')
+@click.argument('source', type=click.File('r'))
+@click.option('--user-id', type=int, required=True, help="Owner of the imported articles.")
+@click.option('--batch-size', default=None, type=int, help="Rows per INSERT (default ARTICLES_IMPORT_BATCH_SIZE).")
+def import_articles_command(source, user_id, batch_size):
+    """Import newline-delimited JSON articles from SOURCE ('-' for stdin)."""
+    batch_size = batch_size or current_app.config['ARTICLES_IMPORT_BATCH_SIZE']
+    started = time.perf_counter()
+    imported, errors = import_articles(source, user_id, batch_size)
+    for error in errors:
+        click.echo(f"line {error['line']}: {error['error']}", err=True)
+    elapsed = time.perf_counter() - started
+    click.echo(f"imported {imported} articles, {len(errors)} rejected in {elapsed:.1f}s")
+
+
+@auth_cli.command('calibrate-bcrypt')
+@click.option('--target-ms', default=250, show_default=True, help="Wall-clock budget for one hash.")
+@click.option('--samples', default=3, show_default=True)
+def calibrate_bcrypt(target_ms, samples):
+    """Find the highest bcrypt cost whose hash time stays within --target-ms on this machine."""
+    best = 4
+    for rounds in range(4, 17):
+        started = time.perf_counter()
+        for _ in range(samples):
+            bcrypt.generate_password_hash('calibration-password', rounds)
+        elapsed_ms = (time.perf_counter() - started) * 1000 / samples
+        click.echo(f"rounds={rounds:<3} {elapsed_ms:8.1f} ms")
+        if elapsed_ms > target_ms:
+            break
+        best = rounds
+    click.echo(f"recommended BCRYPT_LOG_ROUNDS={best} (current {current_app.config['BCRYPT_LOG_ROUNDS']})")
+
+
+@app_cli.command('create-tables')
+def create_tables():
+    """Create missing tables straight from the models (local setups; deployments run `flask db upgrade`)."""
+    db.create_all()
+    click.echo("tables created")
+
+
+@app_cli.command('create-mongo-indexes')
+def create_mongo_indexes():
+    """Create the MongoDB indexes (workers also create them when they start)."""
+    from app.mongo_models import ArticleLikeCount
+    ArticleLikeCount.ensure_indexes()
+    click.echo("mongo indexes created")
+
+
+def parse_importtime(output):
+    """(module, self_us, cumulative_us) rows from `python -X importtime` output."""
+    rows = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+@app_cli.command('import-profile')
+@click.option('--role', type=click.Choice(['web', 'worker', 'cli']), help="Role to profile (default APP_ROLE).")
+@click.option('--config', 'config_class', default='development', show_default=True)
+@click.option('--top', default=20, show_default=True, help="Packages to list.")
+@click.option('--json', 'as_json', is_flag=True, help="Print the report as JSON, e.g. to track it over time.")
+def import_profile(role, config_class, top, as_json):
+    """Time a cold create_app() in a fresh interpreter and break its import time down by package."""
+    role = role or current_app.config['APP_ROLE']
+    code = (
+        "import time; started = time.perf_counter(); from app import create_app; "
+        f"create_app({config_class!r}, role={role!r}); print(time.perf_counter() - started)"
+    )
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        capture_output=True, text=True, cwd=os.path.dirname(current_app.root_path),
+    )
+    if result.returncode:
+        raise click.ClickException(f"create_app failed:\n{result.stderr[-2000:]}")
+
+    rows = parse_importtime(result.stderr)
+    packages = defaultdict(lambda: {'self_ms': 0.0, 'modules': 0})
+    for name, self_us, _ in rows:
+        package = packages[name.split('.')[0]]
+        package['self_ms'] += self_us / 1000
+        package['modules'] += 1
+    ranked = sorted(packages.items(), key=lambda item: item[1]['self_ms'], reverse=True)[:top]
+    report = {
+        'role': role,
+        'startup_ms': round(float(result.stdout.split()[-1]) * 1000, 1),
+        'import_ms': round(sum(self_us for _, self_us, _ in rows) / 1000, 1),
+        'modules': len(rows),
+        'packages': [dict(package, name=name, self_ms=round(package['self_ms'], 1)) for name, package in ranked],
+    }
+    if as_json:
+        click.echo(json.dumps(report, indent=2))
+        return
+
+    click.echo(
+        f"create_app({config_class!r}, role={role!r}): {report['startup_ms']} ms, "
+        f"{report['modules']} modules imported in {report['import_ms']} ms"
+    )
+    click.echo(f"{'package':<32}{'self ms':>10}{'modules':>9}")
+    for package in report['packages']:
+        click.echo(f"{package['name']:<32}{package['self_ms']:>10}{package['modules']:>9}")
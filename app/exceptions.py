@@ -5,12 +5,38 @@ from flask import jsonify
 class NotFoundException(Exception):
     pass
 
+class BadRequestException(Exception):
+    pass
+
+class ForbiddenException(Exception):
+    pass
+
+class TooManyRequestsException(Exception):
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class ServiceUnavailableException(Exception):
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
 def handle_exception(e):
     response = {'status': 'error', 'message': 'An unexpected error occurred.'}
     status_code = 500
+    if isinstance(e, (TooManyRequestsException, ServiceUnavailableException)):
+        response['message'] = str(e)
+        status_code = 429 if isinstance(e, TooManyRequestsException) else 503
+        return jsonify(response), status_code, {'Retry-After': str(e.retry_after)}
     if isinstance(e, NotFoundException):
         response['message'] = str(e)
         status_code = 404
+    elif isinstance(e, BadRequestException):
+        response['message'] = str(e)
+        status_code = 400
+    elif isinstance(e, ForbiddenException):
+        response['message'] = str(e)
+        status_code = 403
     elif isinstance(e, IntegrityError):
         if 'unique_user_title' in str(e.orig):
             response['message'] =  'You have already created an article with this title before.'
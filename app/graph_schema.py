@@ -0,0 +1,12 @@
+import graphene
+
+from app.article.schema import ArticleQuery
+from app.auth.schema import Query as AuthQuery, Mutation
+
+
+class Query(AuthQuery, ArticleQuery, graphene.ObjectType):
+    pass
+
+
+# Combine Queries and Mutations into the GraphQL Schema
+schema = graphene.Schema(query=Query, mutation=Mutation)
@@ -0,0 +1,333 @@
+import hashlib
+import json
+
+from flask import current_app, request
+from graphene_file_upload.flask import FileUploadGraphQLView
+from graphql import GraphQLError, parse, validate
+from graphql.backend.base import GraphQLBackend, GraphQLDocument
+from graphql.execution import ExecutionResult, execute
+from graphql.language import ast
+from graphql.type import GraphQLList, GraphQLNonNull
+from graphql.type.introspection import SchemaMetaFieldDef, TypeMetaFieldDef, TypeNameMetaFieldDef
+from graphql_server import HttpQueryError
+
+from app.cache import LRUCache, TwoTierCache
+from app.exceptions import TooManyRequestsException
+from app.ratelimit import rate_limiter
+
+persisted_queries = TwoTierCache('persisted_query')
+document_cache = LRUCache(maxsize=512, ttl=3600)
+
+LIST_SIZE_ARGUMENTS = ('first', 'last')
+META_FIELDS = {'__schema': SchemaMetaFieldDef, '__type': TypeMetaFieldDef, '__typename': TypeNameMetaFieldDef}
+INTROSPECTION_ROOTS = ('__schema', '__type')
+# root mutation fields that take a token from the RATE_LIMITS bucket of the same REST route
+RATE_LIMITED_MUTATIONS = {'register': 'register', 'login': 'login'}
+
+
+def query_hash(query):
+    return hashlib.sha256(query.encode('utf-8')).hexdigest()
+
+
+def _unwrap(field_type):
+    is_list = False
+    while isinstance(field_type, (GraphQLList, GraphQLNonNull)):
+        is_list = is_list or isinstance(field_type, GraphQLList)
+        field_type = field_type.of_type
+    return field_type, is_list
+
+
+def _argument_value(node, variables):
+    if isinstance(node, ast.Variable):
+        return variables.get(node.name.value)
+    if isinstance(node, ast.IntValue):
+        return int(node.value)
+    return None
+
+
+def _operation(document_ast, operation_name):
+    for definition in document_ast.definitions:
+        if isinstance(definition, ast.OperationDefinition) and (
+            operation_name is None or (definition.name and definition.name.value == operation_name)
+        ):
+            return definition
+    return None
+
+
+def mutation_fields(document_ast, operation_name=None):
+    """Names of the root fields the operation would run, one per occurrence, if it is a mutation."""
+    operation = _operation(document_ast, operation_name)
+    if operation is None or operation.operation != 'mutation':
+        return []
+    fragments = {
+        definition.name.value: definition
+        for definition in document_ast.definitions
+        if isinstance(definition, ast.FragmentDefinition)
+    }
+    names, pending = [], list(operation.selection_set.selections)
+    while pending:
+        selection = pending.pop()
+        if isinstance(selection, ast.Field):
+            names.append(selection.name.value)
+        elif isinstance(selection, ast.FragmentSpread):
+            if selection.name.value in fragments:
+                pending.extend(fragments[selection.name.value].selection_set.selections)
+        else:
+            pending.extend(selection.selection_set.selections)
+    return names
+
+
+class QueryCost:
+    """Static depth/complexity of one operation, before it is executed.
+
+    Every field costs 1; fields returning a list or a connection multiply the
+    cost of their selections by `first`/`last`, or by `default_list_size` when
+    the client did not bound the page. Introspection lists are sized by the
+    schema itself, and `__schema`/`__type` selections are measured apart from
+    the rest so they can be refused or held to their own limits.
+    """
+
+    def __init__(self, schema, document_ast, default_list_size):
+        self.schema = schema
+        self.default_list_size = default_list_size
+        self.document_ast = document_ast
+        self.fragments = {
+            definition.name.value: definition
+            for definition in document_ast.definitions
+            if isinstance(definition, ast.FragmentDefinition)
+        }
+        self.introspection_sizes = self._introspection_sizes(schema)
+
+    @staticmethod
+    def _introspection_sizes(schema):
+        types = list(schema.get_type_map().values())
+        fields = [field for t in types for field in (getattr(t, 'fields', None) or {}).values()]
+        most_fields = max((len(getattr(t, 'fields', None) or {}) for t in types), default=0)
+        return {
+            'types': len(types),
+            'possibleTypes': len(types),
+            'fields': most_fields,
+            'inputFields': most_fields,
+            'enumValues': max((len(getattr(t, 'values', None) or ()) for t in types), default=0),
+            'interfaces': max((len(getattr(t, 'interfaces', None) or ()) for t in types), default=0),
+            'args': max((len(getattr(field, 'args', None) or {}) for field in fields), default=0),
+            'directives': len(schema.get_directives()),
+        }
+
+    def measure(self, operation_name=None, variables=None):
+        """(depth, complexity) of the operation outside introspection, and (depth, complexity) of its introspection."""
+        introspection = [0, 0]
+        operation = _operation(self.document_ast, operation_name)
+        if operation is None:
+            return (0, 0), (0, 0)
+        variables = dict(self._variable_defaults(operation), **(variables or {}))
+        root_type = {
+            'query': self.schema.get_query_type,
+            'mutation': self.schema.get_mutation_type,
+            'subscription': self.schema.get_subscription_type,
+        }[operation.operation]()
+        cost = self._selection_set(operation.selection_set, root_type, variables, introspection)
+        return cost, tuple(introspection)
+
+    @staticmethod
+    def _variable_defaults(operation):
+        return {
+            definition.variable.name.value: _argument_value(definition.default_value, {})
+            for definition in operation.variable_definitions or ()
+            if definition.default_value is not None
+        }
+
+    def _list_size(self, field, parent_type, variables):
+        if parent_type.name.startswith('__'):
+            return self.introspection_sizes.get(field.name.value, self.default_list_size)
+        for argument in field.arguments or ():
+            if argument.name.value in LIST_SIZE_ARGUMENTS:
+                value = _argument_value(argument.value, variables)
+                if isinstance(value, int):
+                    return max(value, 0)
+        return self.default_list_size
+
+    def _selection_set(self, selection_set, parent_type, variables, introspection):
+        depth, complexity = 0, 0
+        for selection in selection_set.selections if selection_set else ():
+            if isinstance(selection, ast.Field):
+                field_depth, field_complexity = self._field(selection, parent_type, variables, introspection)
+            else:
+                if isinstance(selection, ast.FragmentSpread):
+                    fragment = self.fragments[selection.name.value]
+                else:
+                    fragment = selection
+                fragment_type = parent_type
+                if fragment.type_condition is not None:
+                    fragment_type = self.schema.get_type(fragment.type_condition.name.value)
+                field_depth, field_complexity = self._selection_set(
+                    fragment.selection_set, fragment_type, variables, introspection
+                )
+            depth = max(depth, field_depth)
+            complexity += field_complexity
+        return depth, complexity
+
+    def _field(self, field, parent_type, variables, introspection):
+        name = field.name.value
+        field_def = META_FIELDS.get(name) or parent_type.fields[name]
+        field_type, is_list = _unwrap(field_def.type)
+        if field.selection_set is None:
+            return 1, 1
+        depth, complexity = self._selection_set(field.selection_set, field_type, variables, introspection)
+        # a connection's `edges` list is already paid for by the connection field
+        if field_type.name.endswith('Connection') or (is_list and not parent_type.name.endswith('Connection')):
+            complexity *= self._list_size(field, parent_type, variables)
+        if name in INTROSPECTION_ROOTS:
+            # only valid on the query root, so no enclosing list multiplies it
+            introspection[0] = max(introspection[0], depth + 1)
+            introspection[1] += complexity + 1
+            return 0, 0
+        return depth + 1, complexity + 1
+
+
+class CachedDocumentBackend(GraphQLBackend):
+    """Parses and validates each distinct query once, keyed by its sha256.
+
+    Cached documents skip re-validation and check the operation's cost against
+    GRAPHQL_MAX_DEPTH / GRAPHQL_MAX_COMPLEXITY before executing.
+    """
+
+    def document_from_string(self, schema, document_string):
+        key = (id(schema), query_hash(document_string))
+        document = document_cache.get(key)
+        if document is None:
+            document = self._build(schema, document_string)
+            document_cache.set(key, document)
+        return document
+
+    def _build(self, schema, document_string):
+        document_ast = parse(document_string)
+        errors = validate(schema, document_ast)
+        document = GraphQLDocument(schema, document_string, document_ast, execute=None)
+        if errors:
+            document.execute = lambda **kwargs: ExecutionResult(errors=errors, invalid=True)
+        else:
+            cost = QueryCost(schema, document_ast, current_app.config['GRAPHQL_DEFAULT_LIST_SIZE'])
+            document.execute = lambda **kwargs: self._execute(document, cost, **kwargs)
+        return document
+
+    @staticmethod
+    def _execute(document, cost, operation_name=None, variable_values=None, **kwargs):
+        (depth, complexity), (introspection_depth, introspection_complexity) = cost.measure(
+            operation_name, variable_values
+        )
+        config = current_app.config
+        if introspection_complexity:
+            if not config['GRAPHQL_INTROSPECTION']:
+                return ExecutionResult(errors=[GraphQLError("GraphQL introspection is disabled.")], invalid=True)
+            if introspection_depth > config['GRAPHQL_MAX_INTROSPECTION_DEPTH']:
+                error = GraphQLError(
+                    f"Introspection depth {introspection_depth} exceeds the limit of {config['GRAPHQL_MAX_INTROSPECTION_DEPTH']}."
+                )
+                return ExecutionResult(errors=[error], invalid=True)
+            if introspection_complexity > config['GRAPHQL_MAX_INTROSPECTION_COMPLEXITY']:
+                error = GraphQLError(
+                    f"Introspection complexity {introspection_complexity} exceeds the limit of "
+                    f"{config['GRAPHQL_MAX_INTROSPECTION_COMPLEXITY']}."
+                )
+                return ExecutionResult(errors=[error], invalid=True)
+        if depth > config['GRAPHQL_MAX_DEPTH']:
+            error = GraphQLError(f"Query depth {depth} exceeds the limit of {config['GRAPHQL_MAX_DEPTH']}.")
+            return ExecutionResult(errors=[error], invalid=True)
+        if complexity > config['GRAPHQL_MAX_COMPLEXITY']:
+            error = GraphQLError(
+                f"Query complexity {complexity} exceeds the limit of {config['GRAPHQL_MAX_COMPLEXITY']}."
+            )
+            return ExecutionResult(errors=[error], invalid=True)
+        return execute(
+            document.schema, document.document_ast,
+            operation_name=operation_name, variable_values=variable_values, **kwargs
+        )
+
+
+def graphql_view(app):
+    document_cache.configure(app.config['GRAPHQL_DOCUMENT_CACHE_SIZE'], app.config['GRAPHQL_DOCUMENT_CACHE_TTL'])
+    persisted_queries.init_app(app)
+    from app.graph_schema import schema
+    return GraphQLView.as_view('graphql', schema=schema, graphiql=True)
+
+
+class GraphQLView(FileUploadGraphQLView):
+    """FileUploadGraphQLView with automatic persisted queries and cached, cost-checked documents.
+
+    Clients may send `extensions.persistedQuery.sha256Hash` instead of the query
+    text; unknown hashes answer `PersistedQueryNotFound` so the client retries
+    with both hash and query, which registers it.
+
+    Rate-limited mutations are checked before anything executes: raised from
+    a resolver, the limit would only come back as a GraphQL error on a 200.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('backend', CachedDocumentBackend())
+        super().__init__(**kwargs)
+
+    def parse_body(self):
+        data = super().parse_body()
+        if request.method == 'GET' and not data:
+            data = request.args
+        if isinstance(data, list):
+            data = [self.resolve_persisted_query(entry) for entry in data]
+            for entry in data:
+                self.check_rate_limits(entry)
+            return data
+        data = self.resolve_persisted_query(data)
+        self.check_rate_limits(data)
+        return data
+
+    def check_rate_limits(self, data):
+        query = data.get('query') if isinstance(data, dict) else None
+        if not query:
+            return
+        try:
+            document = self.get_backend().document_from_string(self.schema, query)
+        except GraphQLError:
+            # a syntax error; execution reports it
+            return
+        for name in mutation_fields(document.document_ast, data.get('operationName')):
+            if name not in RATE_LIMITED_MUTATIONS:
+                continue
+            try:
+                rate_limiter.hit(RATE_LIMITED_MUTATIONS[name])
+            except TooManyRequestsException as e:
+                raise HttpQueryError(429, str(e), headers={'Retry-After': str(e.retry_after)})
+
+    @staticmethod
+    def resolve_persisted_query(data):
+        if hasattr(data, 'to_dict'):
+            data = data.to_dict()
+        if not isinstance(data, dict):
+            return data
+
+        query = data.get('query')
+        if query and len(query) > current_app.config['GRAPHQL_MAX_QUERY_LENGTH']:
+            raise HttpQueryError(413, "Query is too large.")
+
+        extensions = data.get('extensions') or {}
+        if isinstance(extensions, str):
+            try:
+                extensions = json.loads(extensions)
+            except ValueError:
+                raise HttpQueryError(400, "Extensions are invalid JSON.")
+        persisted = extensions.get('persistedQuery') if isinstance(extensions, dict) else None
+        if not persisted:
+            return data
+
+        digest = persisted.get('sha256Hash')
+        if persisted.get('version') != 1 or not isinstance(digest, str):
+            raise HttpQueryError(400, "Unsupported persisted query.")
+        if query:
+            if query_hash(query) != digest:
+                raise HttpQueryError(400, "Provided sha256Hash does not match query.")
+            persisted_queries.get_or_load(digest, lambda: query)
+            return data
+
+        query = persisted_queries.peek(digest)
+        if query is None:
+            raise HttpQueryError(200, "PersistedQueryNotFound")
+        return dict(data, query=query)
@@ -0,0 +1,128 @@
+import json
+from datetime import datetime
+
+from sqlalchemy import literal
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import DBAPIError
+
+from app import db
+from app.models import Article, mark_article_stale
+
+TITLE_MAX = Article.__table__.c.title.type.length
+SLUG_MAX = Article.__table__.c.slug.type.length
+HERO_IMAGE_MAX = Article.__table__.c.hero_image.type.length
+DUPLICATE_TITLE = 'You have already created an article with this title before.'
+
+
+def validate_article(data):
+    if not isinstance(data, dict):
+        return None, "expected a JSON object"
+    title, content = data.get('title'), data.get('content')
+    hero_image, is_public = data.get('hero_image') or None, data.get('is_public', False)
+    if not isinstance(title, str) or not title.strip():
+        return None, "title is required"
+    if len(title) > TITLE_MAX:
+        return None, f"title is longer than {TITLE_MAX} characters"
+    if not isinstance(content, str) or not content:
+        return None, "content is required"
+    if hero_image is not None and (not isinstance(hero_image, str) or len(hero_image) > HERO_IMAGE_MAX):
+        return None, f"hero_image must be a string of at most {HERO_IMAGE_MAX} characters"
+    if not isinstance(is_public, bool):
+        return None, "is_public must be a boolean"
+    # postgres text can't hold NUL
+    if any('\x00' in value for value in (title, content, hero_image or '')):
+        return None, "text must not contain NUL characters"
+    slug = Article.build_slug(title)
+    if len(slug) > SLUG_MAX:
+        # transliteration can make the slug longer than the title
+        return None, f"title makes a slug longer than {SLUG_MAX} characters"
+    return {
+        'title': title,
+        'slug': slug,
+        'content': content,
+        'excerpt': Article.build_excerpt(content),
+        'hero_image': hero_image,
+        'is_public': is_public,
+    }, None
+
+
+def insert_batch(rows, user_id):
+    """One multi-row INSERT ... ON CONFLICT DO NOTHING; returns the titles that were inserted."""
+    created_at = datetime.now()
+    rows = [
+        dict(row, user_id=user_id, created_at=created_at,
+             search_vector=Article.search_vector_expression(literal(row['title']), literal(row['content'])))
+        for row in rows
+    ]
+    insert = postgresql.insert if db.session.get_bind().dialect.name == 'postgresql' else sqlite.insert
+    stmt = (
+        insert(Article)
+        .values(rows)
+        # unique_user_title
+        .on_conflict_do_nothing(index_elements=['user_id', 'title'])
+        .returning(Article.title)
+    )
+    return set(db.session.execute(stmt).scalars())
+
+
+def insert_rows(entries, user_id):
+    """Insert (line, row) entries in a savepoint; returns {line: error} for the rows that were not inserted."""
+    try:
+        with db.session.begin_nested():
+            inserted = insert_batch([row for _, row in entries], user_id)
+    except DBAPIError as e:
+        if len(entries) == 1:
+            reason = str(e.orig).splitlines()[0] if str(e.orig) else type(e.orig).__name__
+            return {entries[0][0]: f"rejected by the database: {reason}"}
+        # one bad row fails the whole statement; insert the rows one at a time to single it out
+        failed = {}
+        for entry in entries:
+            failed.update(insert_rows([entry], user_id))
+        return failed
+    failed, seen = {}, set()
+    for line, row in entries:
+        if row['title'] in inserted and row['title'] not in seen:
+            seen.add(row['title'])
+        else:
+            failed[line] = DUPLICATE_TITLE
+    return failed
+
+
+def import_articles(records, user_id, batch_size):
+    """Validate and insert `records` (iterable of dicts or JSON lines) in batches.
+
+    Bad rows are reported by their 1-based position and never abort the
+    batch, whether validation or the database rejects them.
+    """
+    imported, errors = 0, []
+    pending = []
+
+    def flush():
+        nonlocal imported
+        failed = insert_rows(pending, user_id)
+        mark_article_stale(db.session)
+        db.session.commit()
+        imported += len(pending) - len(failed)
+        errors.extend({'line': line, 'error': error} for line, error in failed.items())
+        pending.clear()
+
+    for line, record in enumerate(records, 1):
+        if isinstance(record, (str, bytes)):
+            if not record.strip():
+                continue
+            try:
+                record = json.loads(record)
+            except ValueError:
+                errors.append({'line': line, 'error': "invalid JSON"})
+                continue
+        row, error = validate_article(record)
+        if error:
+            errors.append({'line': line, 'error': error})
+            continue
+        pending.append((line, row))
+        if len(pending) >= batch_size:
+            flush()
+    if pending:
+        flush()
+    errors.sort(key=lambda error: error['line'])
+    return imported, errors
@@ -0,0 +1,114 @@
+import logging
+import random
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# stats for the sampled request running in this context; None costs one lookup per query
+current_stats = ContextVar('query_stats', default=None)
+
+
+class RequestQueryStats:
+    def __init__(self, slow_query_ms):
+        self.started = time.perf_counter()
+        self.slow_query_ms = slow_query_ms
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.mongo_count = 0
+        self.mongo_time = 0.0
+        self.shapes = Counter()
+
+    def record_sql(self, statement, duration):
+        self.sql_count += 1
+        self.sql_time += duration
+        self.shapes[statement] += 1
+        if duration * 1000 >= self.slow_query_ms:
+            logger.warning("slow query (%.1f ms) on %s: %s", duration * 1000, request.path, statement[:500])
+
+    def record_mongo(self, shape, duration):
+        self.mongo_count += 1
+        self.mongo_time += duration
+        self.shapes[shape] += 1
+        if duration * 1000 >= self.slow_query_ms:
+            logger.warning("slow mongo command (%.1f ms) on %s: %s", duration * 1000, request.path, shape)
+
+    def repeated_shapes(self, threshold):
+        return [(shape, count) for shape, count in self.shapes.items() if count >= threshold]
+
+    def server_timing(self):
+        total = (time.perf_counter() - self.started) * 1000
+        return ', '.join((
+            f'db;dur={self.sql_time * 1000:.1f};desc="{self.sql_count} queries"',
+            f'mongo;dur={self.mongo_time * 1000:.1f};desc="{self.mongo_count} commands"',
+            f'total;dur={total:.1f}',
+        ))
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_stats.get() is not None:
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_stats.get()
+    if stats is not None and conn.info.get('query_started'):
+        stats.record_sql(statement, time.perf_counter() - conn.info['query_started'].pop())
+
+
+class QueryInstrumentation:
+    """Counts and times SQL statements and Mongo commands per sampled request.
+
+    Adds a Server-Timing header, logs slow queries, and warns when one
+    statement shape repeats N_PLUS_ONE_THRESHOLD times in a request.
+    """
+
+    def __init__(self):
+        self.sample_rate = 1.0
+        self.slow_query_ms = 200
+        self.n_plus_one_threshold = 5
+        self._listening = False
+
+    def init_app(self, app):
+        self.sample_rate = app.config['QUERY_SAMPLE_RATE']
+        self.slow_query_ms = app.config['SLOW_QUERY_MS']
+        self.n_plus_one_threshold = app.config['N_PLUS_ONE_THRESHOLD']
+        if not self._listening:
+            event.listen(Engine, 'before_cursor_execute', before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', after_cursor_execute)
+            self._listening = True
+        app.before_request(self.start)
+        app.after_request(self.finish)
+        app.teardown_request(self.reset)
+
+    def start(self):
+        if self.sample_rate >= 1 or random.random() < self.sample_rate:
+            g.query_stats_token = current_stats.set(RequestQueryStats(self.slow_query_ms))
+
+    def finish(self, response):
+        stats = current_stats.get()
+        if stats is None:
+            return response
+        response.headers['Server-Timing'] = stats.server_timing()
+        for shape, count in stats.repeated_shapes(self.n_plus_one_threshold):
+            logger.warning(
+                "probable N+1 on %s %s: %d x %s", request.method, request.path, count, shape[:500]
+            )
+        return response
+
+    def reset(self, exc=None):
+        token = g.pop('query_stats_token', None)
+        if token is not None:
+            try:
+                current_stats.reset(token)
+            except ValueError:
+                # torn down from another context (streamed responses)
+                current_stats.set(None)
+
+
+query_instrumentation = QueryInstrumentation()
@@ -0,0 +1,173 @@
+import atexit
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryStore:
+    """Per-process pending deltas."""
+
+    def __init__(self):
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def add(self, article_id, delta):
+        with self._lock:
+            self._pending[article_id] = self._pending.get(article_id, 0) + delta
+            return len(self._pending)
+
+    def take(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        return pending
+
+    def pending(self):
+        with self._lock:
+            return dict(self._pending)
+
+    def ack(self):
+        pass
+
+    def restore(self, deltas):
+        with self._lock:
+            for article_id, delta in deltas.items():
+                self._pending[article_id] = self._pending.get(article_id, 0) + delta
+
+
+class RedisStore:
+    """Pending deltas in a redis hash shared by every web process.
+
+    A flush renames the pending hash to a flushing hash and only deletes it
+    once the deltas are handed off, so a failed or crashed flush is retried.
+    """
+    PENDING = 'like_counts:pending'
+    FLUSHING = 'like_counts:flushing'
+    LOCK = 'like_counts:flush_lock'
+
+    def __init__(self, url, lock_timeout=30):
+        from app.pools import get_redis
+        self.client = get_redis(url)
+        self.lock_timeout = lock_timeout
+
+    def add(self, article_id, delta):
+        pipe = self.client.pipeline()
+        pipe.hincrby(self.PENDING, article_id, delta)
+        pipe.hlen(self.PENDING)
+        return pipe.execute()[1]
+
+    def take(self):
+        if not self.client.set(self.LOCK, 1, nx=True, ex=self.lock_timeout):
+            return {}
+        if not self.client.exists(self.FLUSHING) and self.client.exists(self.PENDING):
+            self.client.rename(self.PENDING, self.FLUSHING)
+        pending = self.client.hgetall(self.FLUSHING)
+        if not pending:
+            self.client.delete(self.LOCK)
+        return {int(article_id): int(delta) for article_id, delta in pending.items()}
+
+    def pending(self):
+        # both hashes: a flush that failed, or is still publishing, leaves its deltas in the flushing one
+        pipe = self.client.pipeline()
+        pipe.hgetall(self.PENDING)
+        pipe.hgetall(self.FLUSHING)
+        deltas = {}
+        for hash_ in pipe.execute():
+            for article_id, delta in hash_.items():
+                deltas[int(article_id)] = deltas.get(int(article_id), 0) + int(delta)
+        return deltas
+
+    def ack(self):
+        self.client.delete(self.FLUSHING, self.LOCK)
+
+    def restore(self, deltas):
+        # the flushing hash stays in place and is picked up by the next flush
+        self.client.delete(self.LOCK)
+
+
+def make_store(name, url=None):
+    if name == 'memory':
+        return MemoryStore()
+    if name == 'redis':
+        return RedisStore(url)
+    raise ValueError(f"unknown like buffer backend: {name}")
+
+
+def publish_like_counts(deltas):
+    from app.tasks import update_like_counts
+    update_like_counts.delay({str(article_id): delta for article_id, delta in deltas.items()})
+
+
+class LikeCountBuffer:
+    """Coalesces like/unlike deltas and hands them to one Celery task per flush.
+
+    Flushes happen every `flush_interval` seconds, as soon as `max_pending`
+    articles have pending deltas, and at interpreter shutdown.
+    """
+
+    def __init__(self, store=None, publish=None, max_pending=500, flush_interval=2.0):
+        self.store = store or MemoryStore()
+        self.publish = publish or publish_like_counts
+        self.max_pending = max_pending
+        self.flush_interval = flush_interval
+        self._flush_lock = threading.Lock()
+        self._flusher_lock = threading.Lock()
+        self._flusher = None
+        self._stopped = threading.Event()
+        self._atexit_registered = False
+
+    def init_app(self, app):
+        self.store = make_store(app.config['LIKE_BUFFER_BACKEND'], app.config.get('CACHE_REDIS_URL'))
+        self.max_pending = app.config['LIKE_BUFFER_MAX_PENDING']
+        self.flush_interval = app.config['LIKE_BUFFER_FLUSH_INTERVAL']
+        if not self._atexit_registered:
+            atexit.register(self.shutdown)
+            self._atexit_registered = True
+
+    def add(self, article_id, delta):
+        pending = self.store.add(article_id, delta)
+        self._ensure_flusher()
+        if pending >= self.max_pending:
+            self.flush()
+
+    def flush(self):
+        with self._flush_lock:
+            deltas = self.store.take()
+            if not deltas:
+                return 0
+            changed = {article_id: delta for article_id, delta in deltas.items() if delta}
+            try:
+                if changed:
+                    self.publish(changed)
+            except Exception as e:
+                logger.error("Error flushing like counts, will retry: %s", str(e))
+                self.store.restore(deltas)
+                return 0
+            self.store.ack()
+            return len(changed)
+
+    def pending(self):
+        """{article_id: delta} not yet handed to Celery; a MemoryStore only knows this process's."""
+        return self.store.pending()
+
+    def shutdown(self):
+        self._stopped.set()
+        self.flush()
+
+    def _ensure_flusher(self):
+        if self._flusher is not None and self._flusher.is_alive():
+            return
+        with self._flusher_lock:
+            if self._flusher is None or not self._flusher.is_alive():
+                self._flusher = threading.Thread(target=self._run, name='like-count-flusher', daemon=True)
+                self._flusher.start()
+
+    def _run(self):
+        while not self._stopped.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error("Like count flusher error: %s", str(e))
+
+
+like_buffer = LikeCountBuffer()
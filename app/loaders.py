@@ -0,0 +1,74 @@
+from collections import defaultdict
+
+from flask import g
+from graphql_relay.connection.arrayconnection import get_offset_with_default
+from promise import Promise
+from promise.dataloader import DataLoader
+from sqlalchemy import select
+
+from app import db
+from app.models import Article, User
+from app.mongo_models import ArticleLikeCount
+
+
+class UserLoader(DataLoader):
+    def batch_load_fn(self, user_ids):
+        users = {user.id: user for user in User.query.filter(User.id.in_(user_ids))}
+        return Promise.resolve([users.get(user_id) for user_id in user_ids])
+
+
+class PublicArticlesByUserLoader(DataLoader):
+    """Keys are (user_id, limit): each user's newest `limit` public articles, or all of them for None."""
+
+    def batch_load_fn(self, keys):
+        articles = defaultdict(list)
+        by_limit = defaultdict(set)
+        for user_id, limit in keys:
+            by_limit[limit].add(user_id)
+        for limit, user_ids in by_limit.items():
+            for article in self.query(user_ids, limit):
+                articles[article.user_id, limit].append(article)
+        return Promise.resolve([articles[key] for key in keys])
+
+    @staticmethod
+    def query(user_ids, limit):
+        newest_first = (Article.created_at.desc(), Article.id.desc())
+        query = Article.query.filter(Article.user_id.in_(user_ids), Article.is_public == True)
+        if limit is not None:
+            # the limit applies per user, so it's a window over each user's articles rather than a LIMIT
+            position = db.func.row_number().over(partition_by=Article.user_id, order_by=newest_first).label('position')
+            ranked = (
+                select(Article.id, position)
+                .where(Article.user_id.in_(user_ids), Article.is_public == True)
+                .subquery()
+            )
+            query = Article.query.join(ranked, Article.id == ranked.c.id).filter(ranked.c.position <= limit)
+        return query.order_by(*newest_first)
+
+
+def connection_limit(args):
+    """Rows a connection field needs for `first` (after `after`), with one more for hasNextPage; None for all."""
+    first = args.get('first')
+    if first is None or args.get('last') is not None or args.get('before') is not None:
+        return None
+    return get_offset_with_default(args.get('after'), -1) + 1 + first + 1
+
+
+class LikeCountLoader(DataLoader):
+    def batch_load_fn(self, article_ids):
+        counts = ArticleLikeCount.get_like_counts(article_ids)
+        return Promise.resolve([counts.get(article_id, 0) for article_id in article_ids])
+
+
+class Loaders:
+    def __init__(self):
+        self.users = UserLoader()
+        self.articles_by_user = PublicArticlesByUserLoader()
+        self.like_counts = LikeCountLoader()
+
+
+def get_loaders():
+    """DataLoaders scoped to the current request, so batching and dedupe never leak across users."""
+    if 'graphql_loaders' not in g:
+        g.graphql_loaders = Loaders()
+    return g.graphql_loaders
@@ -3,12 +3,16 @@ from slugify import slugify
 import secrets
 import string
 
-from sqlalchemy import event, select, UniqueConstraint
+from sqlalchemy import and_, case, delete, event, literal_column, select, update, UniqueConstraint
 from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import Session, load_only, object_session
 from sqlalchemy.orm.attributes import get_history
 
 from app import db
-from app.exceptions import NotFoundException
+from app.cache import article_cache, search_cache
+from app.exceptions import ForbiddenException, NotFoundException
+
+EXCERPT_LENGTH = 280
 
 
 class User(db.Model):
@@ -40,6 +44,27 @@ class User(db.Model):
         
         return user
 
+    @classmethod
+    async def get_user_data_async(cls, session, user_id):
+        user = await session.get(cls, user_id)
+        if not user:
+            raise NotFoundException("user not registered.")
+
+        return {
+            'id': user.id,
+            'name': user.name,
+            'email': user.email,
+            'is_admin': user.is_admin
+        }
+
+    @classmethod
+    async def get_user_by_email_async(cls, session, email):
+        user = (await session.execute(select(cls).filter_by(email=email))).scalars().first()
+        if not user:
+            raise NotFoundException("user not registered.")
+
+        return user
+
     @classmethod
     def add(cls, name, email, password, is_admin=False):
         new_user = cls(
@@ -52,6 +77,14 @@ class User(db.Model):
         db.session.commit()
         return new_user
 
+    def update_password(self, password):
+        self.password = password
+        db.session.commit()
+
+    async def update_password_async(self, session, password):
+        self.password = password
+        await session.commit()
+
 
 class Article(db.Model):
     __tablename__ = 'flask_article'
@@ -59,6 +92,7 @@ class Article(db.Model):
     title = db.Column(db.String(150), nullable=False)
     slug = db.Column(db.String(180), unique=True, nullable=False)
     content = db.Column(db.Text, nullable=False)
+    excerpt = db.Column(db.String(300), nullable=True)
     hero_image = db.Column(db.String(200), nullable=True)
     is_public = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.now)
@@ -70,6 +104,8 @@ class Article(db.Model):
     __table_args__ = (
         UniqueConstraint('user_id', 'title', name='unique_user_title'),
         db.Index('ix_article_search_vector', 'search_vector', postgresql_using='gin'),
+        db.Index('ix_article_public_created_id', 'is_public', 'created_at', 'id'),
+        db.Index('ix_article_user_public_created_id', 'user_id', 'is_public', 'created_at', 'id'),
     )
 
     def __init__(self, *args, **kwargs):
@@ -78,10 +114,21 @@ class Article(db.Model):
             self.generate_slug()
 
 
-    def generate_slug(self):
-        base_str = slugify(self.title)
+    @staticmethod
+    def build_slug(title):
+        base_str = slugify(title)
         random_str = ''.join(secrets.choice(string.ascii_letters + string.digits) for _ in range(12))
-        self.slug = f"{base_str}-{random_str}"
+        return f"{base_str}-{random_str}"
+
+    def generate_slug(self):
+        self.slug = self.build_slug(self.title)
+
+    @staticmethod
+    def build_excerpt(content, length=EXCERPT_LENGTH):
+        text = ' '.join(content.split())
+        if len(text) <= length:
+            return text
+        return text[:length].rsplit(' ', 1)[0] + '…'
 
     def save(self):
         if not self.id:
@@ -96,6 +143,60 @@ class Article(db.Model):
         stmt = select(cls.user_id).filter_by(id=article_id)
         return db.session.execute(stmt).scalar_one_or_none()
 
+    @classmethod
+    def get_visibility(cls, article_ids):
+        """(article_id, is_public, user_id) rows for `article_ids`, in one query."""
+        stmt = select(cls.id, cls.is_public, cls.user_id).where(cls.id.in_(list(article_ids)))
+        return db.session.execute(stmt).all()
+
+    @property
+    def modified_at(self):
+        return self.updated_at or self.created_at
+
+    @classmethod
+    def validators_stmt(cls, slug):
+        return select(cls.id, cls.is_public, cls.user_id, db.func.coalesce(cls.updated_at, cls.created_at)).where(cls.slug == slug)
+
+    @classmethod
+    def get_validators(cls, slug):
+        return db.session.execute(cls.validators_stmt(slug)).one_or_none()
+
+    @classmethod
+    async def get_validators_async(cls, session, slug):
+        return (await session.execute(cls.validators_stmt(slug))).one_or_none()
+
+    @classmethod
+    def list_validators_stmt(cls, **filters):
+        # newest modification and row count; any insert, update or delete changes one of them
+        return (
+            select(db.func.max(db.func.coalesce(cls.updated_at, cls.created_at)), db.func.count())
+            .where(*(getattr(cls, name) == value for name, value in filters.items()))
+        )
+
+    @classmethod
+    def get_list_validators(cls, **filters):
+        return db.session.execute(cls.list_validators_stmt(**filters)).one()
+
+    @classmethod
+    async def get_list_validators_async(cls, session, **filters):
+        return (await session.execute(cls.list_validators_stmt(**filters))).one()
+
+    @classmethod
+    async def get_by_slug_async(cls, session, slug):
+        return (await session.execute(select(cls).filter_by(slug=slug))).scalar_one_or_none()
+
+    @classmethod
+    def load_fields(cls, fields):
+        # id and created_at back the keyset cursors, so they are always loaded
+        names = {'id', 'created_at', *fields}
+        return load_only(*(getattr(cls, name) for name in names))
+
+    @classmethod
+    def iter_batched(cls, batch_size, **filters):
+        # server-side cursor; only one batch of rows is buffered at a time
+        stmt = select(cls).filter_by(**filters).order_by(cls.id).execution_options(yield_per=batch_size)
+        return db.session.execute(stmt).scalars()
+
     @classmethod
     def add(cls, title, content, hero_image, is_public, user_id):
         new_article = cls(
@@ -109,41 +210,149 @@ class Article(db.Model):
         return new_article
 
     @classmethod
-    def update(cls, article_id, title=None, content=None, hero_image=None, is_public=None):
-        article = cls.query.get(article_id)
-        if not article:
+    def raise_for_unmatched(cls, article_id):
+        # only reached when a conditional write matched no row
+        if cls.get_user_id(article_id) is None:
             raise NotFoundException("article not found.")
+        raise ForbiddenException("Article unauthorized")
+
+    @classmethod
+    def update(cls, article_id, user_id, title=None, content=None, hero_image=None, is_public=None):
+        """Ownership-checked UPDATE ... RETURNING in a single statement.
+
+        Mirrors save(): the slug rotates only when the title really changes and
+        the search vector is rebuilt only when title or content changes.
+        """
+        values = {}
         if title is not None:
-            article.title = title
+            values['title'] = title
+            values['slug'] = case((cls.title == title, cls.slug), else_=cls.build_slug(title))
         if content is not None:
-            article.content = content
+            values['content'] = content
+            values['excerpt'] = cls.build_excerpt(content)
         if hero_image is not None:
-            article.hero_image = hero_image
+            values['hero_image'] = hero_image
         if is_public is not None:
-            article.is_public = is_public
-        
-        article.save()
+            values['is_public'] = is_public
+        if title is not None or content is not None:
+            new_title = title if title is not None else cls.title
+            new_content = content if content is not None else cls.content
+            unchanged = and_(cls.title == new_title, cls.content == new_content)
+            values['search_vector'] = case(
+                (unchanged, cls.search_vector),
+                else_=cls.search_vector_expression(new_title, new_content)
+            )
+
+        if not values:
+            if cls.get_user_id(article_id) != user_id:
+                cls.raise_for_unmatched(article_id)
+            return
 
+        stmt = update(cls).where(cls.id == article_id, cls.user_id == user_id).values(**values)
+        stale_slugs = set()
+        if title is None:
+            stmt = stmt.returning(cls.slug)
+        elif db.session.get_bind().dialect.name == 'postgresql':
+            # self-join so RETURNING also reports the pre-rotation slug
+            old = cls.__table__.alias('old')
+            stmt = stmt.where(old.c.id == cls.id).returning(cls.slug, old.c.slug)
+        else:
+            # other dialects can't RETURNING from a joined table; read the old slug first
+            stmt = stmt.returning(cls.slug)
+            stale_slugs.add(db.session.execute(select(cls.slug).filter_by(id=article_id)).scalar())
+
+        row = db.session.execute(stmt, execution_options={'synchronize_session': False}).one_or_none()
+        if row is None:
+            db.session.rollback()
+            cls.raise_for_unmatched(article_id)
+        mark_article_stale(db.session, stale_slugs.union(row))
+        db.session.commit()
 
     @classmethod
-    def delete(cls, article_id):
-        article = cls.query.get(article_id)
-        if not article:
-            raise NotFoundException("article not found.")
-        db.session.delete(article)
+    def delete(cls, article_id, user_id):
+        stmt = delete(cls).where(cls.id == article_id, cls.user_id == user_id).returning(cls.slug)
+        slug = db.session.execute(stmt, execution_options={'synchronize_session': False}).scalar_one_or_none()
+        if slug is None:
+            db.session.rollback()
+            cls.raise_for_unmatched(article_id)
+        mark_article_stale(db.session, {slug})
         db.session.commit()
 
+    @staticmethod
+    def search_vector_expression(title, content):
+        # title matches rank above body matches
+        return db.func.setweight(db.func.to_tsvector('english', title), literal_column("'A'")).op('||')(
+            db.func.setweight(db.func.to_tsvector('english', content), literal_column("'B'"))
+        )
+
     @staticmethod
     def generate_search_vector(mapper, connection, target):
-        target.search_vector = db.func.to_tsvector('english', target.title + ' ' + target.content)
+        target.search_vector = Article.search_vector_expression(target.title, target.content)
+
+    @staticmethod
+    def refresh_excerpt(mapper, connection, target):
+        if target.excerpt is None or get_history(target, 'content').has_changes():
+            target.excerpt = Article.build_excerpt(target.content)
+
+    @staticmethod
+    def refresh_search_vector(mapper, connection, target):
+        # skip the to_tsvector work when only flags/images/etc. changed
+        if target.text_changed:
+            Article.generate_search_vector(mapper, connection, target)
 
     @property
     def title_changed(self):
         history = get_history(self, 'title')
         return history.has_changes()
 
+    @property
+    def text_changed(self):
+        return self.title_changed or get_history(self, 'content').has_changes()
+
 event.listen(Article, 'before_insert', Article.generate_search_vector)
-event.listen(Article, 'before_update', Article.generate_search_vector)
+event.listen(Article, 'before_update', Article.refresh_search_vector)
+event.listen(Article, 'before_insert', Article.refresh_excerpt)
+event.listen(Article, 'before_update', Article.refresh_excerpt)
+
+
+def mark_article_stale(session, slugs=()):
+    """Evict cached copies of changed articles now and again once the session commits."""
+    article_cache.invalidate(*slugs)
+    session.info.setdefault('stale_article_slugs', set()).update(slugs)
+    session.info['search_cache_stale'] = True
+
+def invalidate_article_cache(mapper, connection, target):
+    # old slug is still in the history when generate_slug rotated it
+    history = get_history(target, 'slug')
+    slugs = {target.slug, *history.deleted}
+    session = object_session(target)
+    if session is not None:
+        mark_article_stale(session, slugs)
+    else:
+        article_cache.invalidate(*slugs)
+
+def mark_search_cache_stale(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info['search_cache_stale'] = True
+
+def clear_stale_caches(session):
+    # a read between flush and commit could have re-cached the old row
+    slugs = session.info.pop('stale_article_slugs', None)
+    if slugs:
+        article_cache.invalidate(*slugs)
+    if session.info.pop('search_cache_stale', None):
+        search_cache.clear()
+
+def discard_stale_caches(session, previous_transaction):
+    session.info.pop('stale_article_slugs', None)
+    session.info.pop('search_cache_stale', None)
+
+event.listen(Article, 'after_insert', mark_search_cache_stale)
+event.listen(Article, 'after_update', invalidate_article_cache)
+event.listen(Article, 'after_delete', invalidate_article_cache)
+event.listen(Session, 'after_commit', clear_stale_caches)
+event.listen(Session, 'after_soft_rollback', discard_stale_caches)
 
 
 class Like(db.Model):
@@ -155,6 +364,8 @@ class Like(db.Model):
 
     __table_args__ = (
         UniqueConstraint('user_id', 'article_id', name='unique_user_article_like'),
+        # the trending rebuild scans the recent likes
+        db.Index('ix_like_created_at', 'created_at'),
     )
 
     @classmethod
@@ -171,5 +382,26 @@ class Like(db.Model):
         like_obj = cls.query.filter_by(user_id=user_id, article_id=article_id).first()
         if not like_obj:
             raise NotFoundException("like not found.")
+        liked_at = like_obj.created_at
         db.session.delete(like_obj)
         db.session.commit()
+        return liked_at
+
+    @classmethod
+    def counts_by_article(cls, article_ids=None):
+        """{article_id: like count} from one grouped query, for `article_ids` or every liked article."""
+        stmt = select(cls.article_id, db.func.count()).group_by(cls.article_id)
+        if article_ids is not None:
+            stmt = stmt.where(cls.article_id.in_(article_ids))
+        return dict(db.session.execute(stmt).all())
+
+    @classmethod
+    def iter_public_since(cls, since, batch_size):
+        """(article_id, created_at) of every like on a public article since `since`, streamed `batch_size` rows at a time."""
+        stmt = (
+            select(cls.article_id, cls.created_at)
+            .join(Article, Article.id == cls.article_id)
+            .where(cls.created_at >= since, Article.is_public == True)
+            .execution_options(yield_per=batch_size)
+        )
+        return db.session.execute(stmt)
@@ -1,21 +1,119 @@
+import random
+
 from flask_pymongo import PyMongo
+from pymongo import ASCENDING, UpdateOne
 
 from app import mongo
+from app.cache import like_count_cache
 
 class ArticleLikeCount:
+    """Like counts kept as `shards` counter documents per article, summed on read.
+
+    Increments land on a random shard so a hot article's writes don't all
+    contend on one document. Documents written before sharding (no `shard`
+    field) are summed like any other, and so are shards beyond the current
+    count after `shards` is lowered.
+    """
+    shards = 8
+
     def __init__(self, article_id):
         self.article_id = article_id
         if mongo is None:
             raise RuntimeError("MongoDB is not initialized.")
         self.collection = mongo.db.article_like_counts
-    
+
+    @classmethod
+    def configure(cls, shards):
+        cls.shards = max(1, shards)
+
+    @classmethod
+    def ensure_indexes(cls):
+        mongo.db.article_like_counts.create_index([('article_id', ASCENDING), ('shard', ASCENDING)])
+
+    @classmethod
+    def _increment(cls, article_id, delta, shard=None):
+        shard = random.randrange(cls.shards) if shard is None else shard
+        return UpdateOne({'article_id': article_id, 'shard': shard}, {'$inc': {'count': delta}}, upsert=True)
+
     def get_like_count(self):
-        like_count = self.collection.find_one({'article_id': self.article_id})
-        return like_count['count'] if like_count else 0
+        return self.sum_counts([self.article_id]).get(self.article_id, 0)
     
     def update(self, count):
         self.collection.update_one(
-            {'article_id': self.article_id},
+            {'article_id': self.article_id, 'shard': random.randrange(self.shards)},
             {'$inc': {'count': count}},
             upsert=True
-        )
\ No newline at end of file
+        )
+
+    @staticmethod
+    def _cached_counts(article_ids):
+        counts = {}
+        missing = []
+        for article_id in set(article_ids):
+            count = like_count_cache.get(article_id)
+            if count is None:
+                missing.append(article_id)
+            else:
+                counts[article_id] = count
+        return counts, missing
+
+    @staticmethod
+    def _sum_pipeline(article_ids=None):
+        match = [{'$match': {'article_id': {'$in': list(article_ids)}}}] if article_ids is not None else []
+        return match + [{'$group': {'_id': '$article_id', 'count': {'$sum': '$count'}}}]
+
+    @staticmethod
+    def _cache_fetched(missing, docs):
+        # missing documents count as 0
+        fetched = dict.fromkeys(missing, 0)
+        for doc in docs:
+            fetched[doc['_id']] = doc['count']
+        for article_id, count in fetched.items():
+            like_count_cache.set(article_id, count)
+        return fetched
+
+    @classmethod
+    def get_like_counts(cls, article_ids):
+        # one $in query for every id not already cached
+        counts, missing = cls._cached_counts(article_ids)
+        if missing:
+            if mongo is None:
+                raise RuntimeError("MongoDB is not initialized.")
+            cursor = mongo.db.article_like_counts.aggregate(cls._sum_pipeline(missing))
+            counts.update(cls._cache_fetched(missing, cursor))
+        return counts
+
+    @classmethod
+    def sum_counts(cls, article_ids=None):
+        """{article_id: summed count} straight from mongo, for `article_ids` or every article with a counter."""
+        if mongo is None:
+            raise RuntimeError("MongoDB is not initialized.")
+        cursor = mongo.db.article_like_counts.aggregate(cls._sum_pipeline(article_ids), allowDiskUse=True)
+        return {doc['_id']: doc['count'] for doc in cursor}
+
+    @classmethod
+    async def get_like_counts_async(cls, article_ids):
+        from app.async_db import async_mongo
+        counts, missing = cls._cached_counts(article_ids)
+        if missing:
+            cursor = await async_mongo.db.article_like_counts.aggregate(cls._sum_pipeline(missing))
+            counts.update(cls._cache_fetched(missing, await cursor.to_list()))
+        return counts
+
+    @classmethod
+    def bulk_update(cls, deltas):
+        if mongo is None:
+            raise RuntimeError("MongoDB is not initialized.")
+        operations = [cls._increment(article_id, delta) for article_id, delta in deltas.items()]
+        if operations:
+            mongo.db.article_like_counts.bulk_write(operations, ordered=False)
+
+    @classmethod
+    def correct(cls, corrections, batch_size=500):
+        """Add each article's correction to its shard 0, `batch_size` articles per bulk write."""
+        if mongo is None:
+            raise RuntimeError("MongoDB is not initialized.")
+        items = list(corrections.items())
+        for start in range(0, len(items), batch_size):
+            operations = [cls._increment(article_id, delta, shard=0) for article_id, delta in items[start:start + batch_size]]
+            mongo.db.article_like_counts.bulk_write(operations, ordered=False)
@@ -0,0 +1,98 @@
+import threading
+
+from pymongo import monitoring
+
+from app.instrumentation import current_stats
+from app.pools import PoolStats
+
+
+class MongoPoolListener(monitoring.ConnectionPoolListener):
+    """Per-server pymongo pool counters, fed by pymongo's CMAP events."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.servers = {}
+
+    def _server(self, address):
+        key = '%s:%s' % address
+        with self._lock:
+            server = self.servers.get(key)
+            if server is None:
+                server = self.servers[key] = {'stats': PoolStats(), 'checked_out': 0, 'open': 0}
+            return server
+
+    def _adjust(self, address, field, delta):
+        server = self._server(address)
+        with self._lock:
+            server[field] += delta
+
+    def connection_checked_out(self, event):
+        self._server(event.address)['stats'].record_checkout(getattr(event, 'duration', 0.0))
+        self._adjust(event.address, 'checked_out', 1)
+
+    def connection_checked_in(self, event):
+        self._adjust(event.address, 'checked_out', -1)
+
+    def connection_check_out_failed(self, event):
+        if event.reason == monitoring.ConnectionCheckOutFailedReason.TIMEOUT:
+            self._server(event.address)['stats'].record_timeout()
+
+    def connection_created(self, event):
+        self._adjust(event.address, 'open', 1)
+
+    def connection_closed(self, event):
+        self._adjust(event.address, 'open', -1)
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def describe(self):
+        with self._lock:
+            servers = dict(self.servers)
+        return {
+            key: dict(server['stats'].as_dict(), checked_out=server['checked_out'], open=server['open'])
+            for key, server in servers.items()
+        }
+
+
+mongo_pool_listener = MongoPoolListener()
+
+
+class QueryCommandListener(monitoring.CommandListener):
+    """Feeds pymongo command timings into the current request's stats."""
+
+    def __init__(self):
+        # the collection is only on the started event; keyed by pymongo's request id
+        self._shapes = {}
+
+    def started(self, event):
+        if current_stats.get() is not None:
+            collection = event.command.get(event.command_name)
+            self._shapes[event.request_id] = f"{event.database_name}.{collection} {event.command_name}"
+
+    def succeeded(self, event):
+        shape = self._shapes.pop(event.request_id, None)
+        stats = current_stats.get()
+        if stats is not None and shape is not None:
+            stats.record_mongo(shape, event.duration_micros / 1e6)
+
+    def failed(self, event):
+        self.succeeded(event)
+
+
+mongo_command_listener = QueryCommandListener()
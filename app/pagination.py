@@ -0,0 +1,86 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from flask import current_app, request
+from sqlalchemy import tuple_
+
+from app.exceptions import BadRequestException
+from app.models import Article
+
+
+def encode_cursor(direction, created_at, article_id):
+    payload = json.dumps([direction, created_at.isoformat(), article_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        direction, created_at, article_id = json.loads(base64.urlsafe_b64decode(padded))
+        if direction not in ('next', 'prev'):
+            raise ValueError(direction)
+        return direction, datetime.fromisoformat(created_at), int(article_id)
+    except (ValueError, TypeError, binascii.Error):
+        raise BadRequestException("invalid cursor.")
+
+
+def get_page_limit():
+    default_limit = current_app.config['ARTICLES_PAGE_SIZE']
+    max_limit = current_app.config['ARTICLES_MAX_PAGE_SIZE']
+    limit = request.args.get('limit', default_limit, type=int)
+    return max(1, min(limit, max_limit))
+
+
+def keyset_window(query, cursor=None, limit=None):
+    """Apply the cursor position, ordering and limit to a Query or Select.
+
+    Returns the windowed query with the direction and limit that `build_page`
+    needs once its rows are fetched.
+    """
+    limit = limit or get_page_limit()
+    key = tuple_(Article.created_at, Article.id)
+
+    direction = 'next'
+    if cursor:
+        direction, created_at, article_id = decode_cursor(cursor)
+        position = tuple_(created_at, article_id)
+        query = query.filter(key < position if direction == 'next' else key > position)
+
+    if direction == 'next':
+        query = query.order_by(Article.created_at.desc(), Article.id.desc())
+    else:
+        query = query.order_by(Article.created_at.asc(), Article.id.asc())
+    return query.limit(limit + 1), direction, limit
+
+
+def build_page(items, direction, cursor, limit):
+    has_more = len(items) > limit
+    items = items[:limit]
+    if direction == 'prev':
+        items.reverse()
+
+    if direction == 'next':
+        has_next, has_prev = has_more, bool(cursor)
+    else:
+        has_next, has_prev = True, has_more
+
+    page = {'limit': limit, 'next': None, 'prev': None}
+    if items:
+        first, last = items[0], items[-1]
+        if has_next:
+            page['next'] = encode_cursor('next', last.created_at, last.id)
+        if has_prev:
+            page['prev'] = encode_cursor('prev', first.created_at, first.id)
+    return items, page
+
+
+def paginate_articles(query, cursor=None, limit=None):
+    """Keyset pagination on (created_at, id), newest first.
+
+    Every page is a range scan on the composite index from the cursor
+    position, so page N costs the same as page 1.
+    """
+    query, direction, limit = keyset_window(query, cursor, limit)
+    return build_page(query.all(), direction, cursor, limit)
@@ -0,0 +1,93 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+from app import bcrypt
+
+
+class PasswordHasher:
+    """Runs bcrypt off the request thread on a bounded pool.
+
+    Under eventlet/gevent the work goes to the hub's native thread pool so the
+    event loop keeps serving other clients while a hash is computed.
+    """
+
+    def __init__(self, workers=2, max_pending=64, async_mode='threading'):
+        self.async_mode = async_mode
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bcrypt')
+        self._slots = threading.BoundedSemaphore(max_pending)
+
+    def init_app(self, app, async_mode=None):
+        self._executor.shutdown(wait=False)
+        self._executor = ThreadPoolExecutor(
+            max_workers=app.config['PASSWORD_HASH_WORKERS'], thread_name_prefix='bcrypt'
+        )
+        self._slots = threading.BoundedSemaphore(app.config['PASSWORD_HASH_MAX_PENDING'])
+        self.async_mode = async_mode or 'threading'
+
+    def run(self, fn, *args):
+        with self._slots:
+            if self.async_mode == 'eventlet':
+                from eventlet import tpool
+                return tpool.execute(fn, *args)
+            if self.async_mode == 'gevent':
+                import gevent
+                return gevent.get_hub().threadpool.apply(fn, args)
+            return self._executor.submit(fn, *args).result()
+
+    async def run_async(self, fn, *args):
+        # same bounded pool; the event loop keeps serving while the hash is computed
+        if not self._slots.acquire(blocking=False):
+            await asyncio.get_running_loop().run_in_executor(None, self._slots.acquire)
+        try:
+            return await asyncio.wrap_future(self._executor.submit(fn, *args))
+        finally:
+            self._slots.release()
+
+
+password_hasher = PasswordHasher()
+
+
+def hash_password(password, rounds=None):
+    rounds = rounds or current_app.config['BCRYPT_LOG_ROUNDS']
+    return password_hasher.run(bcrypt.generate_password_hash, password, rounds).decode('utf-8')
+
+
+async def hash_password_async(password, rounds=None):
+    rounds = rounds or current_app.config['BCRYPT_LOG_ROUNDS']
+    return (await password_hasher.run_async(bcrypt.generate_password_hash, password, rounds)).decode('utf-8')
+
+
+def check_password(pw_hash, password):
+    return password_hasher.run(bcrypt.check_password_hash, pw_hash, password)
+
+
+def hash_rounds(pw_hash):
+    # $2b$<rounds>$<salt+hash>
+    try:
+        return int(pw_hash.split('$')[2])
+    except (IndexError, ValueError):
+        return None
+
+
+def needs_rehash(pw_hash):
+    return hash_rounds(pw_hash) != current_app.config['BCRYPT_LOG_ROUNDS']
+
+
+def verify_and_rehash(user, password):
+    """Check `password` for `user`, upgrading the stored hash to the configured cost on success."""
+    if not check_password(user.password, password):
+        return False
+    if needs_rehash(user.password):
+        user.update_password(hash_password(password))
+    return True
+
+
+async def verify_and_rehash_async(session, user, password):
+    if not await password_hasher.run_async(bcrypt.check_password_hash, user.password, password):
+        return False
+    if needs_rehash(user.password):
+        await user.update_password_async(session, await hash_password_async(password))
+    return True
@@ -0,0 +1,186 @@
+import sys
+import threading
+import time
+from functools import lru_cache
+
+from sqlalchemy import event, exc as sa_exc
+from sqlalchemy.pool import QueuePool
+
+
+class PoolStats:
+    """Thread-safe counters for one connection pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.overflow_events = 0
+        self.timeouts = 0
+
+    def record_checkout(self, wait):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+
+    def record_overflow(self):
+        with self._lock:
+            self.overflow_events += 1
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                'checkouts': self.checkouts,
+                'wait_avg_ms': round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                'wait_max_ms': round(self.wait_max * 1000, 3),
+                'overflow_events': self.overflow_events,
+                'timeouts': self.timeouts,
+            }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records checkout wait time, overflow connections and timeouts."""
+
+    # log under sqlalchemy.pool like the stock pools, not under the app's logger
+    _sqla_logger_namespace = 'sqlalchemy.pool.impl.InstrumentedQueuePool'
+
+    @property
+    def stats(self):
+        # recreate() builds a fresh pool; its counters start over with it
+        if '_stats' not in self.__dict__:
+            self._stats = PoolStats()
+        return self._stats
+
+    def _do_get(self):
+        started = time.perf_counter()
+        overflow = self._overflow
+        try:
+            record = super()._do_get()
+        except sa_exc.TimeoutError:
+            self.stats.record_timeout()
+            raise
+        self.stats.record_checkout(time.perf_counter() - started)
+        if self._overflow > max(overflow, 0):
+            self.stats.record_overflow()
+        return record
+
+    def describe(self):
+        return dict(
+            self.stats.as_dict(),
+            size=self.size(),
+            checked_out=self.checkedout(),
+            checked_in=self.checkedin(),
+            overflow=max(self.overflow(), 0),
+            max_overflow=self._max_overflow,
+        )
+
+
+def configure_engine_options(config):
+    """Use the instrumented pool unless the database is in-memory SQLite (which needs StaticPool)."""
+    options = dict(config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    uri = config.get('SQLALCHEMY_DATABASE_URI') or ''
+    if not (uri.startswith('sqlite') and (':memory:' in uri or uri.rstrip('/') == 'sqlite:')):
+        options.setdefault('poolclass', InstrumentedQueuePool)
+    config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+
+def install_statement_timeout(engine, timeout_ms):
+    if not timeout_ms or engine.dialect.name != 'postgresql':
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_statement_timeout(dbapi_connection, connection_record):
+        with dbapi_connection.cursor() as cursor:
+            cursor.execute(f"SET statement_timeout = {int(timeout_ms)}")
+
+
+def describe_engine(engine):
+    pool = engine.pool
+    if isinstance(pool, InstrumentedQueuePool):
+        return pool.describe()
+    return {'pool': type(pool).__name__, 'status': pool.status()}
+
+
+_redis_pools = {}
+_redis_lock = threading.Lock()
+redis_pool_options = {'max_connections': 50, 'timeout': 5}
+
+
+@lru_cache(maxsize=None)
+def _instrumented_redis_pool_class():
+    import redis
+
+    class InstrumentedBlockingConnectionPool(redis.BlockingConnectionPool):
+        """BlockingConnectionPool that records checkout wait time and timeouts."""
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.stats = PoolStats()
+
+        def get_connection(self, *args, **kwargs):
+            started = time.perf_counter()
+            try:
+                connection = super().get_connection(*args, **kwargs)
+            except redis.ConnectionError as e:
+                if str(e) == "No connection available.":
+                    self.stats.record_timeout()
+                raise
+            self.stats.record_checkout(time.perf_counter() - started)
+            return connection
+
+        def describe(self):
+            idle = sum(1 for connection in list(self.pool.queue) if connection is not None)
+            return dict(
+                self.stats.as_dict(),
+                max_connections=self.max_connections,
+                open=len(self._connections),
+                checked_out=len(self._connections) - idle,
+            )
+
+    return InstrumentedBlockingConnectionPool
+
+
+def get_redis(url):
+    """A client on the shared, instrumented pool for `url`; every redis user in the app goes through here."""
+    import redis
+    with _redis_lock:
+        pool = _redis_pools.get(url)
+        if pool is None:
+            pool = _redis_pools[url] = _instrumented_redis_pool_class().from_url(url, **redis_pool_options)
+    return redis.Redis(connection_pool=pool)
+
+
+def configure_redis_pools(config):
+    redis_pool_options.update(
+        max_connections=config['REDIS_MAX_CONNECTIONS'],
+        timeout=config['REDIS_POOL_TIMEOUT'],
+        socket_timeout=config['REDIS_SOCKET_TIMEOUT'],
+        health_check_interval=config['REDIS_HEALTH_CHECK_INTERVAL'],
+    )
+
+
+def redacted(url):
+    from sqlalchemy.engine import make_url
+    try:
+        return make_url(url).render_as_string(hide_password=True)
+    except Exception:
+        return url.split('@')[-1]
+
+
+def describe_pools(db):
+    # pymongo is only loaded in processes that enable mongo
+    mongo_pool_listener = getattr(sys.modules.get('app.mongo_monitoring'), 'mongo_pool_listener', None)
+    with _redis_lock:
+        redis_pools = dict(_redis_pools)
+    return {
+        'sqlalchemy': {
+            bind or 'default': describe_engine(engine) for bind, engine in db.engines.items()
+        },
+        'mongo': mongo_pool_listener.describe() if mongo_pool_listener else {},
+        'redis': {redacted(url): pool.describe() for url, pool in redis_pools.items()},
+    }
@@ -0,0 +1,145 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, g, request
+
+from app.exceptions import TooManyRequestsException
+
+
+class MemoryBuckets:
+    """Per-process token buckets; the least recently used are dropped past `maxsize` (a dropped bucket is full)."""
+
+    def __init__(self, maxsize=100000):
+        self.maxsize = maxsize
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, refill_rate):
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * refill_rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        return allowed, tokens
+
+
+class RedisBuckets:
+    """Token buckets in redis hashes shared by every web process, refilled atomically by a script."""
+
+    SCRIPT = """
+    local capacity = tonumber(ARGV[1])
+    local rate = tonumber(ARGV[2])
+    local now_parts = redis.call('TIME')
+    local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+    local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+    local tokens = tonumber(bucket[1]) or capacity
+    local updated = tonumber(bucket[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+    local allowed = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+        allowed = 1
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+    redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+    return {allowed, tostring(tokens)}
+    """
+
+    def __init__(self, url):
+        from app.pools import get_redis
+        self.client = get_redis(url)
+        self.script = self.client.register_script(self.SCRIPT)
+
+    def take(self, key, capacity, refill_rate):
+        allowed, tokens = self.script(keys=[f"ratelimit:{key}"], args=[capacity, refill_rate])
+        return bool(allowed), float(tokens)
+
+
+def make_buckets(name, url=None):
+    if name == 'memory':
+        return MemoryBuckets()
+    if name == 'redis':
+        return RedisBuckets(url)
+    raise ValueError(f"unknown rate limit backend: {name}")
+
+
+class RateLimiter:
+    """Token-bucket limits per route, configured in RATE_LIMITS.
+
+    Each route has one or more rules: `limit` requests per `period` seconds,
+    counted per client IP or per authenticated user (`'key': 'identity'`,
+    falling back to the IP for anonymous requests; behind a reverse proxy
+    the IP is the client's only when PROXY_FIX_X_FOR trusts its hops). The
+    tightest rule's state goes out in RateLimit-* headers; a rejected request
+    gets a 429 with Retry-After.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.rules = {}
+        self.buckets = MemoryBuckets()
+
+    def init_app(self, app):
+        self.enabled = app.config['RATE_LIMIT_ENABLED']
+        self.rules = app.config['RATE_LIMITS']
+        self.buckets = make_buckets(app.config['RATE_LIMIT_BACKEND'], app.config.get('CACHE_REDIS_URL'))
+        app.after_request(self.add_headers)
+
+    def client_key(self, rule):
+        if rule.get('key') == 'identity':
+            from app.utils import request_user_id
+            user_id = request_user_id()
+            if user_id is not None:
+                return f"user:{user_id}"
+        return f"ip:{request.remote_addr}"
+
+    def hit(self, name):
+        """Take a token from every bucket of route `name`, raising TooManyRequestsException when one is empty."""
+        if not self.enabled or name not in self.rules:
+            return
+        tightest = None
+        for rule in self.rules[name]:
+            capacity, refill_rate = rule['limit'], rule['limit'] / rule['period']
+            allowed, tokens = self.buckets.take(f"{name}:{self.client_key(rule)}", capacity, refill_rate)
+            state = {
+                'limit': capacity,
+                'remaining': int(tokens),
+                'reset': math.ceil((capacity - tokens) / refill_rate),
+                'retry_after': 0 if allowed else math.ceil((1 - tokens) / refill_rate),
+            }
+            if tightest is None or state['remaining'] < tightest['remaining']:
+                tightest = state
+            if not allowed:
+                g.rate_limit = state
+                raise TooManyRequestsException("rate limit exceeded, retry later", state['retry_after'])
+        g.rate_limit = tightest
+
+    def add_headers(self, response):
+        state = g.get('rate_limit')
+        if state:
+            response.headers['RateLimit-Limit'] = str(state['limit'])
+            response.headers['RateLimit-Remaining'] = str(state['remaining'])
+            response.headers['RateLimit-Reset'] = str(state['reset'])
+        return response
+
+
+rate_limiter = RateLimiter()
+
+
+def rate_limited(name):
+    """Apply the RATE_LIMITS rules for `name` before the view (and any auth or body parsing) runs."""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            rate_limiter.hit(name)
+            return current_app.ensure_sync(fn)(*args, **kwargs)
+        return wrapper
+    return decorator
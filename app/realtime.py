@@ -0,0 +1,184 @@
+import logging
+import queue
+import threading
+from collections import defaultdict
+
+import socketio as socketio_pkg
+from flask import current_app, session
+from flask_jwt_extended import decode_token
+from flask_socketio import join_room, leave_room
+
+from app import socketio
+from app.models import Article
+
+logger = logging.getLogger(__name__)
+
+TASKS_ROOM = 'tasks'
+
+
+def article_room(article_id):
+    return f'article:{article_id}'
+
+
+def user_room(user_id):
+    return f'user:{user_id}'
+
+
+class InMemoryManager(socketio_pkg.PubSubManager):
+    """Message queue stand-in that fans out between servers in this process.
+
+    Behaves like the redis/kombu managers for tests and local runs: every
+    server on the same channel sees the others' emits and room changes.
+    """
+    name = 'memory'
+    _subscribers = defaultdict(list)
+    _lock = threading.Lock()
+
+    def __init__(self, channel='flask-socketio', write_only=False, logger=None, json=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger, json=json)
+        self.queue = queue.Queue()
+        if not write_only:
+            with self._lock:
+                self._subscribers[channel].append(self.queue)
+
+    def _publish(self, data):
+        message = self.json.dumps(data)
+        with self._lock:
+            subscribers = list(self._subscribers[self.channel])
+        for subscriber in subscribers:
+            subscriber.put(message)
+
+    def _listen(self):
+        while True:
+            yield self.queue.get()
+
+
+def message_queue_options(config):
+    """Keyword arguments for `socketio.init_app` selecting the SOCKETIO_MESSAGE_QUEUE backend."""
+    url, channel = config['SOCKETIO_MESSAGE_QUEUE'], config['SOCKETIO_CHANNEL']
+    if not url:
+        return {}
+    if url.startswith('memory://'):
+        return {'client_manager': InMemoryManager(channel=channel)}
+    return {'message_queue': url, 'channel': channel}
+
+
+class LikeEventTicker:
+    """Coalesces like/unlike deltas and emits them once per tick.
+
+    Each tick sends one `like_count` event per changed public article to its
+    room and one `article_likes` event per author to their user room, however
+    many likes arrived in between. Drafts only reach their author, through
+    `article_likes`, even if the article room still has members from before
+    it was unpublished.
+    """
+
+    def __init__(self, tick_interval=1.0):
+        self.tick_interval = tick_interval
+        self.app = None
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._task = None
+
+    def init_app(self, app):
+        self.app = app
+        self.tick_interval = app.config['SOCKETIO_TICK_INTERVAL']
+
+    def add(self, article_id, delta):
+        if self.app is None:
+            # socketio isn't enabled in this process
+            return
+        with self._lock:
+            self._pending[article_id] = self._pending.get(article_id, 0) + delta
+            if self._task is None:
+                self._task = socketio.start_background_task(self._run)
+
+    def tick(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        changed = {article_id: delta for article_id, delta in pending.items() if delta}
+        if not changed:
+            return 0
+
+        by_owner = defaultdict(dict)
+        for article_id, is_public, user_id in Article.get_visibility(changed):
+            if is_public:
+                socketio.emit('like_count', {'article_id': article_id, 'delta': changed[article_id]}, to=article_room(article_id))
+            by_owner[user_id][article_id] = changed[article_id]
+        for user_id, deltas in by_owner.items():
+            payload = [{'article_id': article_id, 'delta': delta} for article_id, delta in deltas.items()]
+            socketio.emit('article_likes', payload, to=user_room(user_id))
+        return len(changed)
+
+    def _run(self):
+        while True:
+            socketio.sleep(self.tick_interval)
+            try:
+                with self.app.app_context():
+                    self.tick()
+            except Exception as e:
+                logger.error("Like event tick failed: %s", str(e))
+
+
+like_events = LikeEventTicker()
+
+
+def current_socket_user():
+    return session.get('socket_user_id')
+
+
+@socketio.on('connect')
+def connect(auth=None):
+    token = (auth or {}).get('token')
+    if not token:
+        return
+    try:
+        identity = decode_token(token)[current_app.config['JWT_IDENTITY_CLAIM']]
+    except Exception:
+        return False
+    session['socket_user_id'] = identity['id']
+    join_room(user_room(identity['id']))
+
+
+@socketio.on('subscribe')
+def subscribe(data):
+    room = resolve_room(data)
+    if room is None:
+        return {'status': 'error', 'message': "Unknown or forbidden room"}
+    join_room(room)
+    return {'status': 'success', 'room': room}
+
+
+@socketio.on('unsubscribe')
+def unsubscribe(data):
+    room = resolve_room(data, joining=False)
+    if room is None:
+        return {'status': 'error', 'message': "Unknown or forbidden room"}
+    leave_room(room)
+    return {'status': 'success', 'room': room}
+
+
+def resolve_room(data, joining=True):
+    """Map a subscribe payload to a room name.
+
+    User rooms are only open to their owner, and an article's room to anyone
+    while it is public but only to its author while it is a draft; leaving a
+    room is always allowed.
+    """
+    data = data or {}
+    if data.get('channel') == TASKS_ROOM:
+        return TASKS_ROOM
+    if isinstance(data.get('article_id'), int):
+        if joining:
+            visibility = Article.get_visibility([data['article_id']])
+            if not visibility:
+                return None
+            _, is_public, user_id = visibility[0]
+            if not is_public and user_id != current_socket_user():
+                return None
+        return article_room(data['article_id'])
+    if 'user_id' in data:
+        user_id = current_socket_user()
+        if user_id is not None and data['user_id'] == user_id:
+            return user_room(user_id)
+    return None
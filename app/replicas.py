@@ -0,0 +1,227 @@
+import itertools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, text
+from sqlalchemy.sql import Select
+
+from app.cache import MemoryBackend, make_backend
+
+logger = logging.getLogger(__name__)
+
+REPLICA_BIND_PREFIX = 'replica_'
+SAFE_METHODS = frozenset(('GET', 'HEAD', 'OPTIONS'))
+LAG_QUERIES = {
+    # seconds since the last replayed transaction; 0 on a primary or an idle, caught-up replica.
+    # other dialects only get a liveness check
+    'postgresql': (
+        "SELECT CASE WHEN NOT pg_is_in_recovery() "
+        "OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+        "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+    ),
+}
+
+
+def configure_replica_binds(config):
+    """Add a `replica_<n>` bind per SQLALCHEMY_REPLICA_URIS entry, with the primary's engine options."""
+    binds = dict(config.get('SQLALCHEMY_BINDS') or {})
+    for index, uri in enumerate(config['SQLALCHEMY_REPLICA_URIS']):
+        binds[f'{REPLICA_BIND_PREFIX}{index}'] = dict(config['SQLALCHEMY_ENGINE_OPTIONS'], url=uri)
+    config['SQLALCHEMY_BINDS'] = binds
+
+
+def is_read(clause):
+    # anything else (DML, textual SQL, SELECT ... FOR UPDATE, a bare connection) needs the primary
+    return isinstance(clause, Select) and clause._for_update_arg is None
+
+
+def replica_reads(fn):
+    """Marks a view that only reads even though its method isn't safe (e.g. a POSTed search)."""
+    fn.replica_reads = True
+    return fn
+
+
+class Replica:
+    def __init__(self, key):
+        self.key = key
+        self.healthy = True
+        self.lag = 0.0
+        self.checked_at = 0.0
+        self.error = None
+
+    def describe(self):
+        return {'healthy': self.healthy, 'lag_seconds': self.lag, 'error': self.error}
+
+
+class ReplicaRouter:
+    """Sends read-only statements to a healthy replica and everything else to the primary.
+
+    Reads are routed only inside a request that is safe (GET/HEAD/OPTIONS or
+    marked with `replica_reads`); a request sticks to the primary once it has
+    written, and a user who committed a write reads from the primary for
+    DB_REPLICA_STICKY_SECONDS. Replicas that fail the probe a background
+    thread runs every DB_REPLICA_HEALTH_INTERVAL seconds, error with a
+    disconnect, or lag more than DB_REPLICA_MAX_LAG_SECONDS are skipped until
+    they recover; requests only ever route on the last result.
+    """
+
+    def __init__(self):
+        self.replicas = []
+        self.sticky_seconds = 5
+        self.max_lag = 10
+        self.health_interval = 5
+        self.sticky = MemoryBackend()
+        self._engines = {}
+        self._next = itertools.count()
+        self._probe_lock = threading.Lock()
+        self._prober_lock = threading.Lock()
+        self._prober = None
+        self._stopped = threading.Event()
+
+    def init_app(self, app, db):
+        self.stop()
+        self.replicas = [Replica(key) for key in db.engines if key and key.startswith(REPLICA_BIND_PREFIX)]
+        self._engines = {replica.key: db.engines[replica.key] for replica in self.replicas}
+        self.sticky_seconds = app.config['DB_REPLICA_STICKY_SECONDS']
+        self.max_lag = app.config['DB_REPLICA_MAX_LAG_SECONDS']
+        self.health_interval = app.config['DB_REPLICA_HEALTH_INTERVAL']
+        self.sticky = make_backend(app.config['DB_REPLICA_STICKY_BACKEND'], app.config.get('CACHE_REDIS_URL')) or MemoryBackend()
+        for replica in self.replicas:
+            event.listen(db.engines[replica.key], 'handle_error', self._disconnect_listener(replica))
+
+    def _disconnect_listener(self, replica):
+        def handle_error(context):
+            if context.is_disconnect:
+                self._mark(replica, False, error=str(context.original_exception))
+        return handle_error
+
+    def _mark(self, replica, healthy, lag=0.0, error=None):
+        if replica.healthy and not healthy:
+            logger.warning("replica %s taken out of rotation: %s", replica.key, error)
+        elif healthy and not replica.healthy:
+            logger.info("replica %s back in rotation", replica.key)
+        replica.healthy, replica.lag, replica.error = healthy, lag, error
+        replica.checked_at = time.monotonic()
+
+    def probe(self, replica):
+        try:
+            with self._engines[replica.key].connect() as connection:
+                query = LAG_QUERIES.get(connection.dialect.name, 'SELECT 0')
+                lag = float(connection.execute(text(query)).scalar() or 0)
+        except Exception as e:
+            self._mark(replica, False, error=str(e))
+            return
+        if lag > self.max_lag:
+            self._mark(replica, False, lag, error=f"lagging {lag:.1f}s behind the primary")
+        else:
+            self._mark(replica, True, lag)
+
+    def refresh(self):
+        with self._probe_lock:
+            for replica in self.replicas:
+                self.probe(replica)
+
+    def pick(self, engines):
+        self._ensure_prober()
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        return engines[healthy[next(self._next) % len(healthy)].key]
+
+    def stop(self):
+        with self._prober_lock:
+            self._stopped.set()
+            self._prober = None
+
+    def _ensure_prober(self):
+        if self._prober is not None and self._prober.is_alive():
+            return
+        with self._prober_lock:
+            if self._prober is None or not self._prober.is_alive():
+                self._stopped = threading.Event()
+                self._prober = threading.Thread(target=self._run, args=(self._stopped,), name='replica-prober', daemon=True)
+                self._prober.start()
+
+    def _run(self, stopped):
+        while not stopped.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error("Replica probe error: %s", str(e))
+            stopped.wait(self.health_interval)
+
+    def _sticky_key(self, user_id):
+        return f"db_sticky:{user_id}"
+
+    def current_user_id(self):
+        from app.utils import request_user_id
+        return request_user_id()
+
+    def stick(self, user_id):
+        if user_id is not None and self.sticky_seconds > 0:
+            self.sticky.set(self._sticky_key(user_id), 1, self.sticky_seconds)
+
+    def is_sticky(self, user_id):
+        return user_id is not None and self.sticky.get(self._sticky_key(user_id)) is not None
+
+    def request_allows_replica(self):
+        if not self.replicas or not has_request_context() or g.get('db_primary_only'):
+            return False
+        if request.method not in SAFE_METHODS:
+            view = current_app.view_functions.get(request.endpoint)
+            if not getattr(view, 'replica_reads', False):
+                return False
+        if 'db_sticky' not in g:
+            g.db_sticky = self.is_sticky(self.current_user_id())
+        return not g.db_sticky
+
+    def describe(self):
+        return {replica.key: replica.describe() for replica in self.replicas}
+
+
+replica_router = ReplicaRouter()
+
+
+@contextmanager
+def use_primary():
+    """Route every read in this request to the primary, e.g. right before a read-modify-write."""
+    previous = g.get('db_primary_only', False)
+    g.db_primary_only = True
+    try:
+        yield
+    finally:
+        g.db_primary_only = previous
+
+
+class RoutingSession(Session):
+    """Flask-SQLAlchemy session that lets replica_router pick the engine for default-bind reads."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if bind is not None or not replica_router.replicas or engine is not self._db.engines.get(None):
+            return engine
+        if not is_read(clause) or self._flushing:
+            self.info['db_wrote'] = True
+            return engine
+        if self.info.get('db_wrote') or not replica_router.request_allows_replica():
+            return engine
+        return replica_router.pick(self._db.engines) or engine
+
+
+def stick_writer(session):
+    # the rest of this request, and this user's requests for a while, read what was just written
+    if session.info.pop('db_wrote', None) and has_request_context():
+        g.db_primary_only = True
+        replica_router.stick(replica_router.current_user_id())
+
+
+def forget_write(session, previous_transaction):
+    session.info.pop('db_wrote', None)
+
+
+event.listen(RoutingSession, 'after_commit', stick_writer)
+event.listen(RoutingSession, 'after_soft_rollback', forget_write)
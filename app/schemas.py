@@ -1,3 +1,5 @@
+from functools import lru_cache
+
 from marshmallow_sqlalchemy import SQLAlchemyAutoSchema
 from marshmallow import fields
 
@@ -20,7 +22,35 @@ class ArticleSchema(SQLAlchemyAutoSchema):
 
     def get_search_vector(self, obj):
         return str(obj.search_vector)
-    
+
+    def embed_like_counts(self, data):
+        from app.mongo_models import ArticleLikeCount
+        items = data if isinstance(data, list) else [data]
+        counts = ArticleLikeCount.get_like_counts([item['id'] for item in items])
+        for item in items:
+            item['like_count'] = counts.get(item['id'], 0)
+        return data
+
+    async def embed_like_counts_async(self, data):
+        from app.mongo_models import ArticleLikeCount
+        items = data if isinstance(data, list) else [data]
+        counts = await ArticleLikeCount.get_like_counts_async([item['id'] for item in items])
+        for item in items:
+            item['like_count'] = counts.get(item['id'], 0)
+        return data
+
+
+ARTICLE_FIELDS = frozenset(ArticleSchema().fields)
+ARTICLE_VIEWS = {
+    'summary': ('created_at', 'excerpt', 'hero_image', 'id', 'is_public', 'slug', 'title', 'updated_at'),
+    'search': tuple(sorted(ARTICLE_FIELDS - {'content', 'search_vector'})),
+}
+
+@lru_cache(maxsize=128)
+def article_list_schema(fields=None):
+    # one schema instance per projection; building schemas per request is slow
+    return ArticleSchema(many=True, only=fields)
+
 
 class LikeSchema(SQLAlchemyAutoSchema):
     class Meta:
@@ -0,0 +1,62 @@
+from flask import current_app
+from sqlalchemy import select
+
+from app import db
+from app.cache import search_cache
+from app.models import Article
+from app.replicas import use_primary
+
+
+def normalize_query(query):
+    return ' '.join(query.lower().split())
+
+
+def ranked_ids_query(tsquery):
+    rank = db.func.ts_rank_cd(Article.search_vector, tsquery)
+    return (
+        select(Article.id)
+        .where(Article.is_public == True, Article.search_vector.op('@@')(tsquery))
+        .order_by(rank.desc(), Article.id.desc())
+    )
+
+
+def search_public_articles(query, limit, offset=0, fields=()):
+    """Return one page of (article, snippet) pairs ranked by ts_rank_cd, and the next offset.
+
+    The top SEARCH_CACHE_TOP_N ids per normalized query are cached, so paging
+    within them only loads the requested rows.
+    """
+    query = normalize_query(query)
+    tsquery = db.func.websearch_to_tsquery('english', query)
+    top_n = current_app.config['SEARCH_CACHE_TOP_N']
+
+    ids = search_cache.get(query)
+    if ids is None:
+        # cached until the next article commit clears it, so it must not come from a lagging replica
+        with use_primary():
+            ids = db.session.execute(ranked_ids_query(tsquery).limit(top_n)).scalars().all()
+        search_cache.set(query, ids)
+
+    if offset + limit < len(ids) or len(ids) < top_n:
+        page_ids = ids[offset:offset + limit + 1]
+    else:
+        stmt = ranked_ids_query(tsquery).offset(offset).limit(limit + 1)
+        page_ids = db.session.execute(stmt).scalars().all()
+
+    has_more = len(page_ids) > limit
+    page_ids = page_ids[:limit]
+    if not page_ids:
+        return [], None
+
+    snippet = db.func.ts_headline(
+        'english', Article.content, tsquery, current_app.config['SEARCH_HEADLINE_OPTIONS']
+    )
+    rows = (
+        db.session.query(Article, snippet)
+        .options(Article.load_fields(fields))
+        .filter(Article.id.in_(page_ids), Article.is_public == True)
+        .all()
+    )
+    position = {article_id: index for index, article_id in enumerate(page_ids)}
+    rows.sort(key=lambda row: position[row[0].id])
+    return rows, offset + limit if has_more else None
@@ -0,0 +1,173 @@
+import codecs
+import json
+import math
+from functools import lru_cache
+
+from flask import current_app
+from flask.json.provider import DefaultJSONProvider
+from flask_pymongo import BSONProvider
+from marshmallow import fields as ma_fields
+from sqlalchemy.engine import Row
+
+from app.schemas import ArticleSchema, LikeSchema, UserSchema
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - falls back to the stdlib encoder
+    orjson = None
+
+
+def _json_ascii_escape(error):
+    # same \uXXXX (surrogate pair) escapes the stdlib encoder emits with ensure_ascii
+    escaped = []
+    for char in error.object[error.start:error.end]:
+        code = ord(char)
+        if code > 0xFFFF:
+            code -= 0x10000
+            escaped.append('\\u%04x\\u%04x' % (0xD800 | (code >> 10), 0xDC00 | (code & 0x3FF)))
+        else:
+            escaped.append('\\u%04x' % code)
+    return ''.join(escaped), error.end
+
+codecs.register_error('json_ascii_escape', _json_ascii_escape)
+
+
+def _identity(value):
+    return value
+
+def _isoformat(value):
+    return value.isoformat() if value is not None else None
+
+
+class FastSerializer:
+    """Precompiled field accessors for one marshmallow schema.
+
+    Produces the same dicts as `schema.dump` for plain column fields, but reads
+    values by position from `Row` tuples (or by attribute from ORM objects)
+    without going through marshmallow's per-field machinery.
+    """
+
+    def __init__(self, schema_class):
+        self.schema = schema_class()
+        self.model = schema_class.Meta.model
+        self.field_names = tuple(self.schema.dump_fields)
+
+    @lru_cache(maxsize=128)
+    def plan(self, fields=None):
+        plan = []
+        for name in fields or self.field_names:
+            field = self.schema.dump_fields[name]
+            attribute = field.attribute or name
+            if isinstance(field, ma_fields.Method):
+                method = getattr(self.schema, field.serialize_method_name)
+                plan.append((field.data_key or name, attribute, method, True))
+                continue
+            convert = _isoformat if isinstance(field, ma_fields.DateTime) else _identity
+            plan.append((field.data_key or name, attribute, convert, False))
+        return tuple(plan)
+
+    def columns(self, fields=None, extra=()):
+        """Columns to select so rows line up with `plan(fields)`; `extra` columns go at the end."""
+        columns = [getattr(self.model, attribute) for _, attribute, _, _ in self.plan(fields)]
+        return columns + [column for column in extra if not any(column is c for c in columns)]
+
+    def dump(self, items, fields=None):
+        if items and isinstance(items[0], Row):
+            return self.dump_rows(items, fields)
+        return self.dump_objects(items, fields)
+
+    def dump_rows(self, rows, fields=None):
+        plan = [
+            (key, index, convert, takes_obj)
+            for index, (key, _, convert, takes_obj) in enumerate(self.plan(fields))
+        ]
+        return [
+            {key: convert(row) if takes_obj else convert(row[index]) for key, index, convert, takes_obj in plan}
+            for row in rows
+        ]
+
+    def dump_objects(self, objects, fields=None):
+        plan = self.plan(fields)
+        return [
+            {key: convert(obj) if takes_obj else convert(getattr(obj, attribute))
+             for key, attribute, convert, takes_obj in plan}
+            for obj in objects
+        ]
+
+
+article_serializer = FastSerializer(ArticleSchema)
+user_serializer = FastSerializer(UserSchema)
+like_serializer = FastSerializer(LikeSchema)
+
+
+# what bson.json_util.dumps ends up calling, minus its recursive BSON conversion
+# pass, which leaves plain JSON types alone
+_bson_encoder = json.JSONEncoder()
+
+
+def _is_plain_json(obj):
+    """Whether `obj` only holds dicts with str keys, lists, tuples, strs, ints, bools, None and finite floats."""
+    if isinstance(obj, dict):
+        return all(isinstance(key, str) and _is_plain_json(value) for key, value in obj.items())
+    if isinstance(obj, (list, tuple)):
+        return all(_is_plain_json(item) for item in obj)
+    if isinstance(obj, float):
+        return math.isfinite(obj)
+    return obj is None or isinstance(obj, (str, int))
+
+
+def _floats_match_stdlib(obj):
+    """Whether orjson writes every float in `obj` the way the stdlib encoder does.
+
+    Both write the shortest round-tripping digits, but orjson leaves out the
+    exponent sign (1e16 for 1e+16), keeps 0.00001 positional and turns NaN
+    and Infinity into null.
+    """
+    if isinstance(obj, float):
+        return obj == 0 or 1e-4 <= abs(obj) < 1e16
+    if isinstance(obj, dict):
+        return all(_floats_match_stdlib(value) for value in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return all(_floats_match_stdlib(item) for item in obj)
+    return True
+
+
+def _orjson_dumps(provider, obj):
+    """Encode like DefaultJSONProvider.response, byte for byte, or return None if orjson can't."""
+    if not _floats_match_stdlib(obj):
+        return None
+    indent = (provider.compact is None and current_app.debug) or provider.compact is False
+    # dates and dataclasses go through the provider's `default`, which writes HTTP dates
+    option = orjson.OPT_APPEND_NEWLINE | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+    if provider.sort_keys:
+        option |= orjson.OPT_SORT_KEYS
+    if indent:
+        option |= orjson.OPT_INDENT_2
+    try:
+        body = orjson.dumps(obj, default=provider.default, option=option)
+    except orjson.JSONEncodeError:
+        # non-str keys, which the stdlib encoder converts, or types neither encoder knows
+        return None
+    if provider.ensure_ascii:
+        if not body.isascii():
+            body = body.decode('utf-8').encode('ascii', 'json_ascii_escape')
+        if b'\x7f' in body:
+            body = body.replace(b'\x7f', b'\\u007f')
+    return body
+
+
+def json_response(obj):
+    """Same body as `jsonify(obj)` under the app's JSON provider, produced faster."""
+    provider = current_app.json
+    if isinstance(provider, BSONProvider):
+        if not _is_plain_json(obj):
+            # datetimes, ObjectIds, NaN... become extended JSON
+            return provider.response(obj)
+        body = _bson_encoder.encode(obj)
+    elif isinstance(provider, DefaultJSONProvider) and orjson is not None:
+        body = _orjson_dumps(provider, obj)
+        if body is None:
+            return provider.response(obj)
+    else:
+        return provider.response(obj)
+    return current_app.response_class(body, mimetype='application/json')
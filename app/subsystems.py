@@ -0,0 +1,44 @@
+import threading
+
+import click
+from flask import current_app
+from werkzeug.utils import import_string
+
+CLI_SUBSYSTEMS = ('cli', 'migrate')
+
+
+def enabled_subsystems(config, role):
+    """Subsystems this process starts: APP_SUBSYSTEMS if set, else the role's ROLE_SUBSYSTEMS entry.
+
+    Under the `flask` command the CLI ones are added, so `flask db ...` keeps
+    working whichever role the app is created with.
+    """
+    if role not in config['ROLE_SUBSYSTEMS']:
+        raise ValueError(f"unknown app role: {role}")
+    subsystems = set(config['APP_SUBSYSTEMS'] or config['ROLE_SUBSYSTEMS'][role])
+    if click.get_current_context(silent=True) is not None:
+        subsystems.update(CLI_SUBSYSTEMS)
+    return frozenset(subsystems)
+
+
+def subsystem_enabled(name, app=None):
+    return name in (app or current_app).config['SUBSYSTEMS']
+
+
+class LazyView:
+    """Builds a view on its first request, so its imports stay off the startup path.
+
+    `factory` is an import path to a callable taking the app and returning the view.
+    """
+
+    def __init__(self, factory):
+        self.factory = factory
+        self._view = None
+        self._lock = threading.Lock()
+
+    def __call__(self, *args, **kwargs):
+        if self._view is None:
+            with self._lock:
+                if self._view is None:
+                    self._view = import_string(self.factory)(current_app._get_current_object())
+        return self._view(*args, **kwargs)
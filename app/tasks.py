@@ -1,8 +1,14 @@
 import logging
 import time
 
+from flask import current_app
+from pymongo.errors import BulkWriteError
+
 from app import celery, create_app
+from app.like_buffer import like_buffer
+from app.models import Like
 from app.mongo_models import ArticleLikeCount
+from app.trending import trending
 
 logger = logging.getLogger(__name__)
 
@@ -27,4 +33,97 @@ def update_like_count(article_id, value):
         article_likes.update(value)
         logger.info("Like count for article %s updated", article_id)
     except Exception as e:
-        logger.error("Error updating like count: %s", str(e))
\ No newline at end of file
+        logger.error("Error updating like count: %s", str(e))
+
+@celery.task(bind=True, acks_late=True, max_retries=10, default_retry_delay=5)
+def update_like_counts(self, deltas):
+    # deltas arrive as {article_id: delta} with JSON string keys
+    try:
+        ArticleLikeCount.bulk_update({int(article_id): value for article_id, value in deltas.items()})
+        logger.info("Like counts for %s articles updated", len(deltas))
+    except BulkWriteError as e:
+        # the unordered write applied everything but these; retrying the rest would count it twice
+        articles = list(deltas)
+        failed = {articles[error['index']]: deltas[articles[error['index']]] for error in e.details['writeErrors']}
+        logger.error("Error updating like counts for %s of %s articles: %s", len(failed), len(deltas), str(e))
+        if not failed:
+            return
+        raise self.retry(args=(failed,), exc=e)
+    except Exception as e:
+        logger.error("Error updating like counts: %s", str(e))
+        raise self.retry(exc=e)
+
+
+def like_count_drift(article_ids=None):
+    """(articles compared, {article_id: flask_like count minus the mongo count} for those that differ).
+
+    Deltas still in the like buffer are on their way to mongo and count as
+    already applied. Only a redis buffer is visible here: with the memory
+    backend each web process holds its own deltas, and what this sees is the
+    worker's buffer, which is always empty.
+    """
+    expected = Like.counts_by_article(article_ids)
+    actual = ArticleLikeCount.sum_counts(article_ids)
+    wanted = set(article_ids) if article_ids is not None else None
+    for article_id, delta in like_buffer.pending().items():
+        if wanted is None or article_id in wanted:
+            actual[article_id] = actual.get(article_id, 0) + delta
+    compared = set(expected) | set(actual)
+    drift = {}
+    for article_id in compared:
+        difference = expected.get(article_id, 0) - actual.get(article_id, 0)
+        if difference:
+            drift[article_id] = difference
+    return len(compared), drift
+
+@celery.task()
+def reconcile_like_counts(dry_run=False):
+    """Recount likes from flask_like and schedule the correction of the mongo counters that drifted.
+
+    Deltas already handed to Celery (queued, running or waiting on a retry)
+    are in neither store, so drift is measured again by
+    `correct_like_count_drift` LIKE_COUNT_RECONCILE_SETTLE_SECONDS later and
+    only what is unchanged in both passes is corrected. The settle time must
+    outlast a flush plus update_like_counts' retries; with a memory like
+    buffer, whose deltas the reconciler can't see, it is the only safeguard.
+    """
+    compared, drift = like_count_drift()
+    settle = current_app.config['LIKE_COUNT_RECONCILE_SETTLE_SECONDS']
+    if drift and settle:
+        correct_like_count_drift.apply_async(
+            ({str(article_id): delta for article_id, delta in drift.items()}, compared, dry_run), countdown=settle
+        )
+        logger.info("Like count reconciliation: %s of %s articles drifted, confirming in %ss", len(drift), compared, settle)
+        return {'articles_compared': compared, 'articles_drifted': len(drift), 'confirm_in': settle}
+    return _correct_like_counts(drift, compared, dry_run)
+
+@celery.task()
+def correct_like_count_drift(drift, compared, dry_run=False):
+    # drift arrives as {article_id: delta} with JSON string keys
+    drift = {int(article_id): delta for article_id, delta in drift.items()}
+    _, confirmed = like_count_drift(list(drift))
+    drift = {article_id: delta for article_id, delta in confirmed.items() if drift.get(article_id) == delta}
+    return _correct_like_counts(drift, compared, dry_run)
+
+def _correct_like_counts(drift, compared, dry_run):
+    if drift and not dry_run:
+        ArticleLikeCount.correct(drift, current_app.config['LIKE_COUNT_RECONCILE_BATCH_SIZE'])
+    worst = sorted(drift.items(), key=lambda item: abs(item[1]), reverse=True)[:10]
+    report = {
+        'articles_compared': compared,
+        'articles_drifted': len(drift),
+        'corrected': 0 if dry_run else len(drift),
+        'total_drift': sum(abs(delta) for delta in drift.values()),
+        'max_drift': abs(worst[0][1]) if worst else 0,
+        'worst': {str(article_id): delta for article_id, delta in worst},
+    }
+    log = logger.warning if drift else logger.info
+    log("Like count reconciliation: %s", report)
+    return report
+
+@celery.task()
+def refresh_trending_articles():
+    started = time.monotonic()
+    ranked = trending.rebuild()
+    logger.info("Trending articles rebuilt: %s articles ranked in %.2fs", ranked, time.monotonic() - started)
+    return ranked
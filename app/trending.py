@@ -0,0 +1,236 @@
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+from app.cache import SingleFlight
+from app.like_buffer import LikeCountBuffer
+
+logger = logging.getLogger(__name__)
+
+# every like in the window weighs at least 1, so a lower score is float residue left by unlikes
+MIN_SCORE = 0.5
+
+
+class MemoryRanking:
+    """Per-process scores; each process rebuilds its own in the background, as the job's only reaches its own process."""
+    rebuilds_locally = True
+
+    def __init__(self):
+        self._scores = {}
+        self._meta = None
+        self._lock = threading.Lock()
+
+    def replace(self, scores, meta):
+        with self._lock:
+            self._scores = dict(scores)
+            self._meta = dict(meta)
+
+    def meta(self):
+        with self._lock:
+            return dict(self._meta) if self._meta else None
+
+    def incr_many(self, weights):
+        with self._lock:
+            for article_id, weight in weights.items():
+                score = self._scores.get(article_id, 0.0) + weight
+                if score >= MIN_SCORE:
+                    self._scores[article_id] = score
+                else:
+                    self._scores.pop(article_id, None)
+
+    def top(self, size):
+        with self._lock:
+            meta = dict(self._meta) if self._meta else None
+            ranked = sorted(self._scores.items(), key=lambda item: (item[1], item[0]), reverse=True)[:size]
+        return meta, ranked
+
+
+class RedisRanking:
+    """Scores in a redis sorted set shared by the job and every web process; a rebuild swaps it in with RENAME."""
+    SCORES = 'trending:scores'
+    META = 'trending:meta'
+    rebuilds_locally = False
+
+    def __init__(self, url):
+        from app.pools import get_redis
+        self.client = get_redis(url)
+
+    def replace(self, scores, meta):
+        staging = f"{self.SCORES}:staging"
+        pipe = self.client.pipeline()
+        pipe.delete(staging)
+        if scores:
+            pipe.zadd(staging, scores)
+            pipe.rename(staging, self.SCORES)
+        else:
+            pipe.delete(self.SCORES)
+        pipe.delete(self.META)
+        pipe.hset(self.META, mapping=meta)
+        pipe.execute()
+
+    @staticmethod
+    def _decode_meta(meta):
+        return {key.decode(): float(value) for key, value in meta.items()} if meta else None
+
+    def meta(self):
+        return self._decode_meta(self.client.hgetall(self.META))
+
+    def incr_many(self, weights):
+        pipe = self.client.pipeline()
+        for article_id, weight in weights.items():
+            pipe.zincrby(self.SCORES, weight, article_id)
+        pipe.zremrangebyscore(self.SCORES, '-inf', f'({MIN_SCORE}')
+        pipe.execute()
+
+    def top(self, size):
+        pipe = self.client.pipeline()
+        pipe.hgetall(self.META)
+        pipe.zrevrange(self.SCORES, 0, size - 1, withscores=True)
+        meta, ranked = pipe.execute()
+        return self._decode_meta(meta), [(int(article_id), score) for article_id, score in ranked]
+
+
+def make_ranking(name, url=None):
+    if name == 'memory':
+        return MemoryRanking()
+    if name == 'redis':
+        return RedisRanking(url)
+    raise ValueError(f"unknown trending backend: {name}")
+
+
+class TrendingArticles:
+    """Public articles ranked by likes that decay with a TRENDING_HALF_LIFE_HOURS half-life.
+
+    `rebuild` (the scheduled Celery job) scores every like from the last
+    TRENDING_WINDOW_HOURS into the ranking store. Scores are kept relative to
+    the rebuild's `epoch`, a like at time t weighing 2 ** ((t - epoch) / half
+    life), so older scores never need rescaling: a new like is one increment
+    and the order stays the one the decay gives. Likes that age out of the
+    window between rebuilds are dropped at the next one.
+
+    Each process serves pages from a local snapshot of the top TRENDING_SIZE
+    ids, re-read from the store every TRENDING_LOCAL_TTL seconds; until a
+    rebuild has run the pages are empty, with no `generated_at`. With the
+    memory backend each process also rebuilds its own ranking in a background
+    thread once it is older than TRENDING_REFRESH_INTERVAL.
+
+    `record` weighs a like against the snapshot's epoch and buffers the
+    increment; they reach the store once every TRENDING_FLUSH_INTERVAL
+    seconds, and those weighed against an older epoch are dropped.
+    """
+
+    def __init__(self):
+        self.store = MemoryRanking()
+        self.window = 48 * 3600
+        self.half_life = 6 * 3600
+        self.size = 1000
+        self.local_ttl = 5
+        self.batch_size = 5000
+        self.refresh_interval = 600
+        self._app = None
+        self._snapshot = None
+        self._snapshot_at = 0.0
+        self._flight = SingleFlight()
+        self._increments = LikeCountBuffer(publish=self._apply_increments, flush_interval=1.0)
+        self._rebuild_lock = threading.Lock()
+        self._rebuilder = None
+
+    def init_app(self, app):
+        self._app = app
+        self.store = make_ranking(app.config['TRENDING_BACKEND'], app.config.get('CACHE_REDIS_URL'))
+        self.window = app.config['TRENDING_WINDOW_HOURS'] * 3600
+        self.half_life = app.config['TRENDING_HALF_LIFE_HOURS'] * 3600
+        self.size = app.config['TRENDING_SIZE']
+        self.local_ttl = app.config['TRENDING_LOCAL_TTL']
+        self.batch_size = app.config['TRENDING_BATCH_SIZE']
+        self.refresh_interval = app.config['TRENDING_REFRESH_INTERVAL']
+        self._increments.flush_interval = app.config['TRENDING_FLUSH_INTERVAL']
+        self._snapshot = None
+
+    def weight(self, liked_at, epoch):
+        return 2 ** ((liked_at.timestamp() - epoch) / self.half_life)
+
+    def rebuild(self):
+        """Recompute every score from flask_like; returns the number of articles ranked."""
+        from app.models import Like
+        now = datetime.now()
+        since = now - timedelta(seconds=self.window)
+        epoch = since.timestamp()
+        scores = {}
+        for article_id, liked_at in Like.iter_public_since(since, self.batch_size):
+            scores[article_id] = scores.get(article_id, 0.0) + self.weight(liked_at, epoch)
+        self.store.replace(scores, {'epoch': epoch, 'generated_at': now.timestamp()})
+        self._snapshot = None
+        return len(scores)
+
+    def record(self, article_id, liked_at=None, delta=1):
+        """Apply one like (delta 1) or unlike (delta -1, with the like's created_at) between rebuilds."""
+        epoch = self.snapshot()['epoch']
+        if epoch is None:
+            return
+        liked_at = liked_at or datetime.now()
+        if liked_at.timestamp() < epoch:
+            # outside the window the last rebuild scored
+            return
+        self._increments.add((epoch, article_id), delta * self.weight(liked_at, epoch))
+
+    def _apply_increments(self, increments):
+        meta = self.store.meta()
+        epoch = meta['epoch'] if meta else None
+        weights = {article_id: weight for (weighed_at, article_id), weight in increments.items() if weighed_at == epoch}
+        if weights:
+            self.store.incr_many(weights)
+
+    def snapshot(self):
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - self._snapshot_at < self.local_ttl:
+            return snapshot
+        return self._flight.do('snapshot', self._load_snapshot)
+
+    def _load_snapshot(self):
+        meta, ranked = self.store.top(self.size)
+        if self.store.rebuilds_locally and self._is_stale(meta):
+            self._rebuild_in_background()
+        if meta is None:
+            snapshot = {'generated_at': None, 'epoch': None, 'ids': [], 'scores': []}
+        else:
+            decay = 2 ** (-(time.time() - meta['epoch']) / self.half_life)
+            snapshot = {
+                'generated_at': datetime.fromtimestamp(meta['generated_at']).isoformat(),
+                'epoch': meta['epoch'],
+                'ids': [article_id for article_id, _ in ranked],
+                # the decayed like count as of this snapshot
+                'scores': [round(score * decay, 3) for _, score in ranked],
+            }
+        self._snapshot, self._snapshot_at = snapshot, time.monotonic()
+        return snapshot
+
+    def _is_stale(self, meta):
+        if meta is None:
+            return True
+        return bool(self.refresh_interval) and time.time() - meta['generated_at'] > self.refresh_interval
+
+    def _rebuild_in_background(self):
+        with self._rebuild_lock:
+            if self._rebuilder is not None and self._rebuilder.is_alive():
+                return
+            self._rebuilder = threading.Thread(target=self._run_rebuild, name='trending-rebuild', daemon=True)
+            self._rebuilder.start()
+
+    def _run_rebuild(self):
+        try:
+            with self._app.app_context():
+                self.rebuild()
+        except Exception as e:
+            logger.error("Trending rebuild failed: %s", str(e))
+
+    def page(self, offset, limit):
+        """(ids, scores) ranked `offset` to `offset + limit`, the next offset or None, and when they were computed."""
+        snapshot = self.snapshot()
+        end = offset + limit
+        next_offset = end if end < len(snapshot['ids']) else None
+        return snapshot['ids'][offset:end], snapshot['scores'][offset:end], next_offset, snapshot['generated_at']
+
+
+trending = TrendingArticles()
@@ -1,37 +1,67 @@
+import hashlib
+from datetime import timezone
 from functools import wraps
 
-from flask import jsonify
-from flask_jwt_extended import get_jwt_identity
-from sqlalchemy.exc import IntegrityError
-import graphene
-
-from app.models import Article
-from app.exceptions import NotFoundException
-
-def article_ownership_required(f):
-    @wraps(f)
-    def decorated_function(article_id, *args, **kwargs):
-        user_id = get_jwt_identity()['id']
-        article_user_id = Article.get_user_id(article_id)
-        
-        if article_user_id and user_id != article_user_id:
-            return jsonify({'error': 'Article unauthorized'}), 403
-        
-        return f(article_id, *args, **kwargs)
-    return decorated_function
-
-def success_response(message, data=None, status_code=200):
+from flask import current_app, g, jsonify, request
+from flask_jwt_extended import get_jwt_identity, jwt_required, verify_jwt_in_request
+
+from app.exceptions import ForbiddenException
+from app.serializers import json_response
+
+
+def admin_required(fn):
+    @wraps(fn)
+    @jwt_required()
+    def wrapper(*args, **kwargs):
+        if not get_jwt_identity().get('is_admin'):
+            raise ForbiddenException("admin access required.")
+        return fn(*args, **kwargs)
+    return wrapper
+
+def request_user_id():
+    """Id of the user whose valid access token came with this request, even on views that don't require one."""
+    if 'request_user_id' not in g:
+        try:
+            verify_jwt_in_request(optional=True)
+            identity = get_jwt_identity()
+        except Exception:
+            # a missing or invalid token only means the request isn't tied to a user
+            identity = None
+        g.request_user_id = identity.get('id') if isinstance(identity, dict) else identity
+    return g.request_user_id
+
+def success_response(message, data=None, status_code=200, meta=None):
     response = {'status': 'success', 'message': str(message)}
     if data:
         response.update({'data': data})
+    if meta:
+        response.update({'meta': meta})
+    if current_app.config['FAST_SERIALIZER']:
+        return json_response(response), status_code
     return jsonify(response), status_code
 
 def error_response(message, status_code):
     return jsonify({'status': 'error', 'message': str(message)}), status_code
 
 
-# Response type for success or error messages
-class ResponseType(graphene.ObjectType):
-    status = graphene.String()
-    message = graphene.String()
-    data = graphene.String()  # Optional: Adjust based on what type of data you expect to return.
+def make_etag(*parts):
+    return hashlib.sha1(':'.join(map(str, parts)).encode('utf-8')).hexdigest()[:24]
+
+def add_validators(response, etag, last_modified=None):
+    response.set_etag(etag)
+    if last_modified is not None:
+        # naive timestamps are local time
+        response.last_modified = last_modified.astimezone(timezone.utc)
+    return response
+
+def not_modified_response(etag, last_modified=None):
+    """A 304 if the request's validators still match, otherwise None. If-None-Match wins over If-Modified-Since."""
+    if request.if_none_match:
+        matched = request.if_none_match.contains(etag)
+    elif request.if_modified_since and last_modified is not None:
+        matched = last_modified.astimezone(timezone.utc).replace(microsecond=0) <= request.if_modified_since
+    else:
+        return None
+    if not matched:
+        return None
+    return add_validators(current_app.response_class(status=304), etag, last_modified)
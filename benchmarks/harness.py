@@ -0,0 +1,153 @@
+"""Boots create_app against local stand-ins and seeds a reproducible data set.
+
+SQLite (default) or a local Postgres via --database-uri; mongomock for Mongo
+unless --mongo-uri is given (pip install -r requirements-dev.txt); Celery
+runs tasks eagerly, so like flushes go through update_like_counts and
+ArticleLikeCount.bulk_update as in production. On SQLite the Postgres
+text-search functions used on write are replaced by pass-throughs, so search
+is only benchmarked against Postgres.
+"""
+import inspect
+import os
+import random
+import tempfile
+
+
+def configure_environment(database_uri=None, bcrypt_rounds=4):
+    # settings/config.py reads these at import time
+    if database_uri is None:
+        database_uri = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='flog-bench-'), 'bench.sqlite')
+    os.environ['SQLALCHEMY_DATABASE_URI'] = database_uri
+    os.environ['BCRYPT_LOG_ROUNDS'] = str(bcrypt_rounds)
+    os.environ.setdefault('QUERY_SAMPLE_RATE', '1')
+    # latencies are reported per scenario; per-query slow logs would only add noise
+    os.environ.setdefault('SLOW_QUERY_MS', '60000')
+    # every benchmark client shares one IP and a few users
+    os.environ.setdefault('RATE_LIMIT_ENABLED', '0')
+    return database_uri
+
+
+def install_sqlite_shims():
+    from sqlalchemy import event
+    from sqlalchemy.dialects.postgresql import TSVECTOR
+    from sqlalchemy.engine import Engine
+    from sqlalchemy.ext.compiler import compiles
+
+    @compiles(TSVECTOR, 'sqlite')
+    def compile_tsvector(type_, compiler, **kw):
+        return 'TEXT'
+
+    @event.listens_for(Engine, 'connect')
+    def register_functions(dbapi_connection, connection_record):
+        if type(dbapi_connection).__module__.startswith('sqlite3'):
+            dbapi_connection.create_function('to_tsvector', 2, lambda config, text: text)
+            dbapi_connection.create_function('setweight', 2, lambda vector, weight: vector)
+
+
+def install_mongomock_compat():
+    # pymongo >= 4.11 passes `sort` to the bulk builder, which mongomock 4.3 doesn't accept;
+    # the app never sorts a bulk update, so it is only dropped when unset
+    from mongomock.collection import BulkOperationBuilder
+    for name in ('add_update', 'add_replace'):
+        method = getattr(BulkOperationBuilder, name)
+        if 'sort' in inspect.signature(method).parameters:
+            continue
+
+        def without_sort(self, *args, sort=None, _method=method, **kwargs):
+            if sort is not None:
+                raise NotImplementedError("mongomock can't sort a bulk update")
+            return _method(self, *args, **kwargs)
+        setattr(BulkOperationBuilder, name, without_sort)
+
+
+def boot(database_uri=None, mongo_uri=None, bcrypt_rounds=4):
+    database_uri = configure_environment(database_uri, bcrypt_rounds)
+    if database_uri.startswith('sqlite'):
+        install_sqlite_shims()
+
+    from app import celery, create_app, db, mongo
+
+    app = create_app('development')
+    app.debug = False
+    app.config.update(
+        DEVELOPMENT=False,
+        JWT_SECRET_KEY='benchmark-secret-key-benchmark-secret-key',
+        JWT_VERIFY_SUB=False,
+        LIKE_BUFFER_FLUSH_INTERVAL=0.5,
+    )
+    celery.conf.update(task_always_eager=True, task_eager_propagates=True)
+
+    if mongo_uri is None:
+        import mongomock
+        install_mongomock_compat()
+        mongo.cx = mongomock.MongoClient()
+        mongo.db = mongo.cx['flog']
+    else:
+        import pymongo
+        mongo.cx = pymongo.MongoClient(mongo_uri)
+        mongo.db = mongo.cx.get_default_database()
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    return app
+
+
+def seed(app, users=20, articles=2000, likes=5000, seed=1):
+    """Create `users` users and `articles` public articles spread across them, plus like counts."""
+    from app import db, mongo
+    from app.importer import import_articles
+    from app.models import User
+    from app.passwords import hash_password
+
+    rng = random.Random(seed)
+    with app.app_context():
+        password = hash_password('benchmark')
+        db.session.add_all(
+            User(name=f"user {i}", email=f"user{i}@bench.local", password=password)
+            for i in range(users)
+        )
+        db.session.commit()
+        user_ids = [user.id for user in User.query.order_by(User.id)]
+
+        batch_size = app.config['ARTICLES_IMPORT_BATCH_SIZE']
+        for index, user_id in enumerate(user_ids):
+            records = [
+                {
+                    'title': f"Article {n} about {rng.choice(WORDS)} and {rng.choice(WORDS)}",
+                    'content': ' '.join(rng.choice(WORDS) for _ in range(rng.randint(80, 400))),
+                    'is_public': True,
+                }
+                for n in range(index, articles, users)
+            ]
+            import_articles(records, user_id, batch_size)
+
+        from app.models import Article
+        from app.mongo_models import ArticleLikeCount
+        rows = db.session.execute(db.select(Article.id, Article.slug).order_by(Article.id)).all()
+        counts = {}
+        for article_id, _ in rng.choices(rows, k=likes):
+            counts[article_id] = counts.get(article_id, 0) + 1
+        mongo.db.article_like_counts.delete_many({})
+        ArticleLikeCount.bulk_update(counts)
+    return {
+        'user_ids': user_ids,
+        'article_ids': [article_id for article_id, _ in rows],
+        'slugs': [slug for _, slug in rows],
+    }
+
+
+def login_tokens(app, user_ids):
+    from flask_jwt_extended import create_access_token
+    with app.app_context():
+        return {
+            user_id: create_access_token(identity={'id': user_id, 'is_admin': False})
+            for user_id in user_ids
+        }
+
+
+WORDS = (
+    "flask postgres mongo redis celery socket graph query index cache latency throughput "
+    "article author draft publish like comment search ranking cursor keyset pagination "
+    "python async pool worker broker queue stream batch export import token bcrypt"
+).split()
@@ -0,0 +1,123 @@
+"""Broker messages and Mongo writes per N likes, one task per like versus the coalescing buffer.
+
+Both paths run against benchmarks.harness: likes arrive at --rate per second,
+the buffer flushes on its own timer and size triggers, and the counts are of
+the Celery tasks that actually ran and the Mongo writes they issued.
+
+    python -m benchmarks.like_writes --likes 10000 --articles 200 --rate 5000
+"""
+import argparse
+import random
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from benchmarks import harness
+
+
+@contextmanager
+def counting(collection_class, counts):
+    # wrap the driver's write methods so every call made through ArticleLikeCount is counted
+    originals = {name: getattr(collection_class, name) for name in ('update_one', 'bulk_write')}
+
+    def wrap(name, method):
+        def counted(self, *args, **kwargs):
+            counts[name] += 1
+            if name == 'bulk_write':
+                counts['bulk_operations'] += len(args[0])
+            return method(self, *args, **kwargs)
+        return counted
+
+    for name, method in originals.items():
+        setattr(collection_class, name, wrap(name, method))
+    try:
+        yield counts
+    finally:
+        for name, method in originals.items():
+            setattr(collection_class, name, method)
+
+
+def paced(likes, rate):
+    started = time.monotonic()
+    for index, like in enumerate(likes):
+        if rate and index % 100 == 0:
+            delay = started + index / rate - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        yield like
+
+
+def run(app, likes, rate, send, drain=None):
+    from app import mongo
+    from celery.signals import task_prerun
+
+    counts = Counter()
+
+    def count_task(sender=None, **kwargs):
+        counts['tasks'] += 1
+
+    task_prerun.connect(count_task, weak=False)
+    started = time.monotonic()
+    try:
+        with app.app_context(), counting(type(mongo.db.article_like_counts), counts):
+            for article_id, delta in paced(likes, rate):
+                send(article_id, delta)
+            counts['drained'] = drain() if drain else 0
+    finally:
+        task_prerun.disconnect(count_task)
+    counts['seconds'] = round(time.monotonic() - started, 2)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--likes', type=int, default=10000)
+    parser.add_argument('--articles', type=int, default=200)
+    parser.add_argument('--rate', type=float, default=5000, help="likes per second; 0 sends them as fast as possible")
+    parser.add_argument('--max-pending', type=int, default=500)
+    parser.add_argument('--flush-interval', type=float, default=0.5)
+    parser.add_argument('--mongo-uri', help="defaults to mongomock")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    app = harness.boot(mongo_uri=args.mongo_uri)
+    from app import mongo
+    from app.like_buffer import like_buffer
+    from app.mongo_models import ArticleLikeCount
+    from app.tasks import update_like_count
+
+    rng = random.Random(args.seed)
+    # skewed towards a few hot articles, with roughly one unlike per ten likes
+    weights = [1 / (rank + 1) for rank in range(args.articles)]
+    article_ids = rng.choices(range(1, args.articles + 1), weights=weights, k=args.likes)
+    likes = [(article_id, -1 if rng.random() < 0.1 else 1) for article_id in article_ids]
+    expected = sum(delta for _, delta in likes)
+
+    def per_like(article_id, delta):
+        update_like_count.delay(article_id, delta)
+
+    def buffered(article_id, delta):
+        like_buffer.add(article_id, delta)
+
+    like_buffer.max_pending = args.max_pending
+    like_buffer.flush_interval = args.flush_interval
+
+    results = {}
+    # the final flush is what shutdown does with the deltas still pending when the process exits
+    for name, send, drain in (('before', per_like, None), ('after', buffered, like_buffer.flush)):
+        mongo.db.article_like_counts.delete_many({})
+        results[name] = run(app, likes, args.rate, send, drain)
+        with app.app_context():
+            total = sum(ArticleLikeCount.sum_counts().values())
+        if total != expected:
+            raise SystemExit(f"{name}: mongo holds {total} likes, expected {expected}")
+
+    print(f"{'':<18}{'before':>10}{'after':>10}")
+    for key in ('tasks', 'update_one', 'bulk_write', 'bulk_operations', 'seconds'):
+        print(f"{key:<18}{results['before'][key]:>10}{results['after'][key]:>10}")
+    print(f"\n{args.likes} likes at {args.rate or 'max'}/s; flush every {args.flush_interval}s or at "
+          f"{args.max_pending} pending articles; {results['after']['drained']} articles flushed at exit")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""Password-check throughput and latency at a fixed client concurrency.
+
+Compares bcrypt called inline on each request thread against the bounded
+PasswordHasher pool used by the login endpoints.
+
+    python -m benchmarks.login_throughput --concurrency 32 --logins 256 --rounds 12
+"""
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app import bcrypt
+from app.passwords import PasswordHasher
+
+
+def run(check, pw_hash, concurrency, logins):
+    def login(_):
+        started = time.perf_counter()
+        assert check(pw_hash, 'correct horse')
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as clients:
+        latencies = sorted(clients.map(login, range(logins)))
+    elapsed = time.perf_counter() - started
+    return {
+        'logins_per_s': logins / elapsed,
+        'p50_ms': statistics.median(latencies) * 1000,
+        'p99_ms': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--logins', type=int, default=256)
+    parser.add_argument('--rounds', type=int, default=12)
+    parser.add_argument('--workers', type=int, default=4, help="PasswordHasher pool size")
+    args = parser.parse_args()
+
+    pw_hash = bcrypt.generate_password_hash('correct horse', args.rounds)
+    hasher = PasswordHasher(workers=args.workers, max_pending=args.concurrency)
+    results = {
+        'inline': run(bcrypt.check_password_hash, pw_hash, args.concurrency, args.logins),
+        'pool': run(lambda *a: hasher.run(bcrypt.check_password_hash, *a), pw_hash, args.concurrency, args.logins),
+    }
+    print(f"{'':<8}{'logins/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for name, stats in results.items():
+        print(f"{name:<8}{stats['logins_per_s']:>10.1f}{stats['p50_ms']:>10.1f}{stats['p99_ms']:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""Marshmallow + jsonify vs the fast serializer for article list envelopes.
+
+    python -m benchmarks.serialization --rows 1000 10000
+"""
+import argparse
+import os
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault('SQLALCHEMY_DATABASE_URI', 'sqlite://')
+
+from flask import jsonify
+
+from app import create_app
+from app.models import Article
+from app.schemas import article_list_schema
+from app.serializers import article_serializer, json_response
+
+
+def make_articles(count):
+    started = datetime(2024, 1, 1)
+    return [
+        Article(
+            id=i, title=f"Article number {i}", slug=f"article-number-{i}", content="lorem ipsum " * 200,
+            excerpt="lorem ipsum " * 20, hero_image=None, is_public=True, user_id=1,
+            created_at=started + timedelta(minutes=i), updated_at=None,
+        )
+        for i in range(count)
+    ]
+
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings), body
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    app = create_app('development')
+    app.debug = False
+    with app.app_context():
+        print(f"{'rows':>7}{'marshmallow ms':>16}{'fast ms':>10}{'speedup':>9}  identical")
+        for count in args.rows:
+            articles = make_articles(count)
+            columns = article_serializer.columns()
+            rows = [tuple(getattr(article, column.key) for column in columns) for article in articles]
+
+            def slow():
+                data = article_list_schema(None).dump(articles)
+                return jsonify({'status': 'success', 'message': 'fetched', 'data': data}).get_data()
+
+            def fast():
+                data = article_serializer.dump_rows(rows)
+                return json_response({'status': 'success', 'message': 'fetched', 'data': data}).get_data()
+
+            slow_time, slow_body = best_of(slow, args.repeat)
+            fast_time, fast_body = best_of(fast, args.repeat)
+            print(f"{count:>7}{slow_time * 1000:>16.1f}{fast_time * 1000:>10.1f}"
+                  f"{slow_time / fast_time:>8.1f}x  {slow_body == fast_body}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,272 @@
+"""End-to-end latency, throughput and queries-per-request for the REST, GraphQL and socket paths.
+
+Drives the app through the WSGI stack at a fixed client concurrency against
+the stand-ins in benchmarks.harness, writes the results as JSON and, given a
+baseline, exits non-zero when a scenario regresses.
+
+    python -m benchmarks.suite --output bench.json
+    python -m benchmarks.suite --baseline benchmarks/baseline.json --output bench.json
+    python -m benchmarks.suite --output benchmarks/baseline.json   # refresh the baseline
+
+The committed baseline was recorded with the default parameters on SQLite and
+mongomock. Query counts and errors compare anywhere; latency and throughput
+only against a baseline refreshed on the same machine.
+"""
+import argparse
+import itertools
+import json
+import platform
+import random
+import re
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks import harness
+
+SERVER_TIMING_COUNT = re.compile(r'(db|mongo);dur=[\d.]+;desc="(\d+) ')
+
+GRAPHQL_ARTICLES = '''
+query Articles($first: Int) {
+  articles(first: $first) { edges { node { title slug likeCount author { name } } } }
+}'''
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class Scenario:
+    """One endpoint mix; `request(client, worker, iteration)` returns a response."""
+
+    def __init__(self, name, request, postgres_only=False):
+        self.name = name
+        self.request = request
+        self.postgres_only = postgres_only
+
+
+def build_scenarios(data, tokens, page_size):
+    user_ids = data['user_ids']
+    slugs, article_ids = data['slugs'], data['article_ids']
+
+    def auth(user_id):
+        return {'Authorization': f'Bearer {tokens[user_id]}'}
+
+    def list_articles(client, worker, i):
+        return client.get(f'/api/articles/?limit={page_size}')
+
+    def list_with_like_counts(client, worker, i):
+        return client.get(f'/api/articles/?limit={page_size}&include=like_count')
+
+    def get_by_slug(client, worker, i):
+        rng = random.Random(worker * 1_000_003 + i)
+        return client.get(f'/api/articles/{rng.choice(slugs)}/', headers=auth(user_ids[worker % len(user_ids)]))
+
+    def search(client, worker, i):
+        rng = random.Random(worker * 1_000_003 + i)
+        query = ' '.join(rng.sample(harness.WORDS, 2))
+        return client.post('/api/articles/search/', json={'q': query, 'limit': page_size})
+
+    def like_unlike(client, worker, i):
+        # each worker owns one user, so its like/unlike pairs never collide with another worker's
+        user_id = user_ids[worker % len(user_ids)]
+        article_id = article_ids[(i // 2) % len(article_ids)]
+        action = 'like' if i % 2 == 0 else 'unlike'
+        return client.get(f'/api/articles/{article_id}/{action}/', headers=auth(user_id))
+
+    def login(client, worker, i):
+        user_index = (worker + i) % len(user_ids)
+        return client.post('/api/auth/login/', json={'email': f'user{user_index}@bench.local', 'password': 'benchmark'})
+
+    def profile(client, worker, i):
+        return client.get('/api/auth/profile/', headers=auth(user_ids[(worker + i) % len(user_ids)]))
+
+    def graphql(client, worker, i):
+        return client.post('/graphql/auth', json={'query': GRAPHQL_ARTICLES, 'variables': {'first': page_size}})
+
+    return [
+        Scenario('articles_list', list_articles),
+        Scenario('articles_list_like_counts', list_with_like_counts),
+        Scenario('article_by_slug', get_by_slug),
+        Scenario('articles_search', search, postgres_only=True),
+        Scenario('article_like_unlike', like_unlike),
+        Scenario('auth_login', login),
+        Scenario('auth_profile', profile),
+        Scenario('graphql_articles', graphql),
+    ]
+
+
+def run_scenario(app, scenario, concurrency, requests, warmup):
+    counter = itertools.count()
+    lock = threading.Lock()
+    latencies, sql_counts, mongo_counts = [], [], []
+    errors = 0
+
+    def worker(index):
+        nonlocal errors
+        client = app.test_client()
+        # warm-up calls share the worker's iteration sequence so like/unlike pairs stay aligned
+        warmup_calls = warmup + warmup % 2
+        for i in range(warmup_calls):
+            scenario.request(client, index, i)
+        i = warmup_calls
+        while next(counter) < requests:
+            started = time.perf_counter()
+            response = scenario.request(client, index, i)
+            elapsed = time.perf_counter() - started
+            i += 1
+            counts = dict(SERVER_TIMING_COUNT.findall(response.headers.get('Server-Timing', '')))
+            with lock:
+                if response.status_code >= 400:
+                    errors += 1
+                latencies.append(elapsed)
+                sql_counts.append(int(counts.get('db', 0)))
+                mongo_counts.append(int(counts.get('mongo', 0)))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput_rps': round(len(latencies) / elapsed, 2),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+        'queries_per_request': round(statistics.fmean(sql_counts), 2) if sql_counts else 0.0,
+        'mongo_per_request': round(statistics.fmean(mongo_counts), 2) if mongo_counts else 0.0,
+    }
+
+
+def run_socket_scenario(app, subscribers, ticks, articles):
+    """Cost of one coalesced like tick fanned out to `subscribers` clients in an article room."""
+    from app import socketio
+    from app.realtime import like_events
+
+    clients = [socketio.test_client(app) for _ in range(subscribers)]
+    for client in clients:
+        client.emit('subscribe', {'article_id': articles[0]})
+    latencies = []
+    with app.app_context():
+        for tick in range(ticks):
+            with like_events._lock:
+                for offset, article_id in enumerate(articles[:50]):
+                    like_events._pending[article_id] = like_events._pending.get(article_id, 0) + offset + 1
+            started = time.perf_counter()
+            like_events.tick()
+            latencies.append(time.perf_counter() - started)
+    received = sum(len(client.get_received()) for client in clients)
+    for client in clients:
+        client.disconnect()
+    latencies.sort()
+    return {
+        'requests': ticks,
+        'errors': 0 if received == subscribers * ticks else 1,
+        'throughput_rps': round(ticks / sum(latencies), 2) if latencies else 0.0,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+        'events_delivered': received,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Regressions against `baseline`: slower p95, lower throughput, more queries, or new errors."""
+    regressions = []
+    for name, current in results['scenarios'].items():
+        previous = baseline.get('scenarios', {}).get(name)
+        if not previous:
+            continue
+        if current['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {previous['p95_ms']} -> {current['p95_ms']} ms")
+        if current['throughput_rps'] < previous['throughput_rps'] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {previous['throughput_rps']} -> {current['throughput_rps']} rps")
+        # query counts are deterministic, so any increase is a regression
+        for key in ('queries_per_request', 'mongo_per_request'):
+            if key in previous and current.get(key, 0) > previous[key] + 0.01:
+                regressions.append(f"{name}: {key} {previous[key]} -> {current[key]}")
+        if current['errors'] > previous['errors']:
+            regressions.append(f"{name}: errors {previous['errors']} -> {current['errors']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--database-uri', help="defaults to a fresh SQLite file")
+    parser.add_argument('--mongo-uri', help="defaults to mongomock")
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--articles', type=int, default=2000)
+    parser.add_argument('--likes', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=400, help="measured requests per scenario")
+    parser.add_argument('--warmup', type=int, default=5, help="unmeasured requests per worker")
+    parser.add_argument('--page-size', type=int, default=20)
+    parser.add_argument('--subscribers', type=int, default=100, help="socket clients in the benchmarked room")
+    parser.add_argument('--scenarios', nargs='+', help="run only these scenarios")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', default='bench.json')
+    parser.add_argument('--baseline', help="JSON from a previous run to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed p95/throughput drift")
+    args = parser.parse_args()
+
+    app = harness.boot(args.database_uri, args.mongo_uri)
+    is_postgres = app.config['SQLALCHEMY_DATABASE_URI'].startswith('postgres')
+    data = harness.seed(app, args.users, args.articles, args.likes, args.seed)
+    tokens = harness.login_tokens(app, data['user_ids'])
+
+    results = {
+        'environment': {
+            'python': platform.python_version(),
+            'database': 'postgresql' if is_postgres else 'sqlite',
+            'mongo': 'mongodb' if args.mongo_uri else 'mongomock',
+        },
+        'parameters': {
+            key: getattr(args, key)
+            for key in ('users', 'articles', 'likes', 'concurrency', 'requests', 'page_size', 'subscribers', 'seed')
+        },
+        'scenarios': {},
+    }
+    print(f"{'scenario':<28}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'sql/req':>9}{'mongo/req':>11}{'errors':>8}")
+    for scenario in build_scenarios(data, tokens, args.page_size):
+        if args.scenarios and scenario.name not in args.scenarios:
+            continue
+        if scenario.postgres_only and not is_postgres:
+            print(f"{scenario.name:<28}  skipped (needs Postgres full-text search)")
+            continue
+        stats = run_scenario(app, scenario, args.concurrency, args.requests, args.warmup)
+        results['scenarios'][scenario.name] = stats
+        print(f"{scenario.name:<28}{stats['throughput_rps']:>10}{stats['p50_ms']:>10}{stats['p95_ms']:>10}"
+              f"{stats['p99_ms']:>10}{stats['queries_per_request']:>9}{stats['mongo_per_request']:>11}{stats['errors']:>8}")
+
+    if not args.scenarios or 'socket_like_tick' in args.scenarios:
+        stats = run_socket_scenario(app, args.subscribers, max(10, args.requests // 10), data['article_ids'])
+        results['scenarios']['socket_like_tick'] = stats
+        print(f"{'socket_like_tick':<28}{stats['throughput_rps']:>10}{stats['p50_ms']:>10}{stats['p95_ms']:>10}"
+              f"{stats['p99_ms']:>10}{'':>9}{'':>11}{stats['errors']:>8}")
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    print(f"results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\nREGRESSIONS against {args.baseline}:", file=sys.stderr)
+            for regression in regressions:
+                print(f"  {regression}", file=sys.stderr)
+            sys.exit(1)
+        print(f"no regressions against {args.baseline}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,7 @@
 from app import create_app, celery
 
-app=create_app(config_class='development')
+# the worker only needs celery, mongo and the database
+app=create_app(config_class='development', role='worker')
 
 celery = celery  # Ensure this is the same Celery instance used in the app
 
@@ -1,11 +1,8 @@
-from app import create_app, socketio
+from app import create_app
 
+# tables come from `flask db upgrade` (or `flask app create-tables` locally), not from importing this module
 app = create_app(config_class='development')
 
-from app.models import *
-
-with app.app_context():
-    db.create_all()
-
 if __name__ == '__main__':
+    from app import socketio
     socketio.run(app, debug=True, port=8000)
@@ -0,0 +1,28 @@
+"""add article keyset pagination indexes
+
+Revision ID: 7b2e91c4d0a3
+Revises: 304404fc9685
+Create Date: 2026-10-18 10:12:40.511203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7b2e91c4d0a3'
+down_revision = '304404fc9685'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('flask_article', schema=None) as batch_op:
+        batch_op.create_index('ix_article_public_created_id', ['is_public', 'created_at', 'id'], unique=False)
+        batch_op.create_index('ix_article_user_public_created_id', ['user_id', 'is_public', 'created_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('flask_article', schema=None) as batch_op:
+        batch_op.drop_index('ix_article_user_public_created_id')
+        batch_op.drop_index('ix_article_public_created_id')
@@ -0,0 +1,32 @@
+"""add article excerpt
+
+Revision ID: c4f08a6e2b17
+Revises: 7b2e91c4d0a3
+Create Date: 2026-10-18 14:02:11.846120
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4f08a6e2b17'
+down_revision = '7b2e91c4d0a3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('flask_article', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('excerpt', sa.String(length=300), nullable=True))
+
+    # approximate backfill; rows get the word-boundary excerpt on their next content edit
+    op.execute(
+        "UPDATE flask_article SET excerpt = left(regexp_replace(content, '\\s+', ' ', 'g'), 280) "
+        "WHERE excerpt IS NULL"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('flask_article', schema=None) as batch_op:
+        batch_op.drop_column('excerpt')
@@ -0,0 +1,26 @@
+"""add like created_at index
+
+Revision ID: e5a3d19b7c42
+Revises: c4f08a6e2b17
+Create Date: 2026-10-18 16:40:27.318904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a3d19b7c42'
+down_revision = 'c4f08a6e2b17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('flask_like', schema=None) as batch_op:
+        batch_op.create_index('ix_like_created_at', ['created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('flask_like', schema=None) as batch_op:
+        batch_op.drop_index('ix_like_created_at')
@@ -3,16 +3,140 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+
+def engine_options(pool_size, max_overflow):
+    return {
+        'pool_size': int(os.getenv('DB_POOL_SIZE', pool_size)),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', max_overflow)),
+        'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', 10)),
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': True,
+    }
+
+
+def mongo_pool_options(max_pool_size):
+    return {
+        'maxPoolSize': int(os.getenv('MONGO_MAX_POOL_SIZE', max_pool_size)),
+        'minPoolSize': int(os.getenv('MONGO_MIN_POOL_SIZE', 0)),
+        'maxIdleTimeMS': int(os.getenv('MONGO_MAX_IDLE_TIME_MS', 300000)),
+        'waitQueueTimeoutMS': int(os.getenv('MONGO_WAIT_QUEUE_TIMEOUT_MS', 5000)),
+        'serverSelectionTimeoutMS': int(os.getenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000)),
+    }
+
+
 class Config:
+    APP_ROLE = os.getenv('APP_ROLE', 'web')  # 'web', 'worker' or 'cli'
+    ROLE_SUBSYSTEMS = {
+        'web': ('rest', 'graphql', 'socketio', 'celery', 'mongo', 'cli'),
+        'worker': ('celery', 'mongo'),
+        'cli': ('cli', 'migrate'),
+    }
+    APP_SUBSYSTEMS = [name for name in os.getenv('APP_SUBSYSTEMS', '').split(',') if name]  # overrides the role's set
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     CELERY_ACCEPT_CONTENT = ['json']
     CELERY_TASK_SERIALIZER = 'json'
     CELERY_RESULT_SERIALIZER = 'json'
     CELERY_TIMEZONE = 'UTC'
+    BCRYPT_LOG_ROUNDS = int(os.getenv('BCRYPT_LOG_ROUNDS', 12))  # tune with `flask auth calibrate-bcrypt`
+    PASSWORD_HASH_WORKERS = os.cpu_count() or 2
+    PASSWORD_HASH_MAX_PENDING = 64
+    FAST_SERIALIZER = os.getenv('FAST_SERIALIZER', '').lower() in ('1', 'true', 'yes')
+    ASYNC_MODE = os.getenv('ASYNC_MODE', '').lower() in ('1', 'true', 'yes')  # serve with a threaded WSGI server (main.py, gunicorn --threads)
+    ASYNC_DATABASE_URI = os.getenv('ASYNC_DATABASE_URI')  # derived from SQLALCHEMY_DATABASE_URI when unset
+    ASYNC_ENGINE_OPTIONS = {}
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(pool_size=5, max_overflow=10)
+    DB_STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', 30000))  # postgres only; 0 disables
+    SQLALCHEMY_REPLICA_URIS = [uri for uri in os.getenv('SQLALCHEMY_REPLICA_URIS', '').split(',') if uri]
+    DB_REPLICA_STICKY_SECONDS = int(os.getenv('DB_REPLICA_STICKY_SECONDS', 5))  # reads after a user's write stay on the primary
+    DB_REPLICA_STICKY_BACKEND = os.getenv('DB_REPLICA_STICKY_BACKEND', 'memory')  # 'redis' when running several web processes
+    DB_REPLICA_MAX_LAG_SECONDS = 10
+    DB_REPLICA_HEALTH_INTERVAL = 5
+    MONGO_POOL_OPTIONS = mongo_pool_options(max_pool_size=50)
+    REDIS_MAX_CONNECTIONS = int(os.getenv('REDIS_MAX_CONNECTIONS', 50))
+    REDIS_POOL_TIMEOUT = 5
+    REDIS_SOCKET_TIMEOUT = 5
+    REDIS_HEALTH_CHECK_INTERVAL = 30
+    QUERY_INSTRUMENTATION = os.getenv('QUERY_INSTRUMENTATION', '1').lower() in ('1', 'true', 'yes')
+    QUERY_SAMPLE_RATE = float(os.getenv('QUERY_SAMPLE_RATE', 1.0))
+    SLOW_QUERY_MS = int(os.getenv('SLOW_QUERY_MS', 200))
+    N_PLUS_ONE_THRESHOLD = 5
+    RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', '1').lower() in ('1', 'true', 'yes')
+    RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'memory')  # 'redis' to share buckets across processes
+    # reverse proxies in front of the app; their X-Forwarded-For hops are trusted for the client IP the limits key on
+    PROXY_FIX_X_FOR = int(os.getenv('PROXY_FIX_X_FOR', 0))
+    RATE_LIMITS = {
+        # `limit` requests per `period` seconds, per client IP or per logged-in user ('identity')
+        'login': [{'limit': 10, 'period': 60, 'key': 'ip'}],
+        'register': [{'limit': 5, 'period': 600, 'key': 'ip'}],
+        'search': [{'limit': 60, 'period': 60, 'key': 'identity'}],
+        'like': [{'limit': 60, 'period': 60, 'key': 'identity'}, {'limit': 300, 'period': 60, 'key': 'ip'}],
+    }
+    ADMISSION_CONTROL = os.getenv('ADMISSION_CONTROL', '1').lower() in ('1', 'true', 'yes')
+    ADMISSION_INITIAL_LIMIT = int(os.getenv('ADMISSION_INITIAL_LIMIT', 32))
+    ADMISSION_MIN_LIMIT = 4
+    ADMISSION_MAX_LIMIT = 256
+    ADMISSION_MAX_QUEUE_MS = int(os.getenv('ADMISSION_MAX_QUEUE_MS', 500))  # shed with a 503 past this
+    ADMISSION_TARGET_QUEUE_MS = 50  # the limit shrinks when requests wait longer than this
+    ADMISSION_DECREASE_FACTOR = 0.9
+    ADMISSION_RETRY_AFTER = 1
+    # only when a proxy in front overwrites X-Request-Start; otherwise any client could claim it queued for ages
+    ADMISSION_TRUST_REQUEST_START = os.getenv('ADMISSION_TRUST_REQUEST_START', '').lower() in ('1', 'true', 'yes')
+    CELERY_BROKER_POOL_LIMIT = int(os.getenv('CELERY_BROKER_POOL_LIMIT', 10))
+    CELERY_BROKER_CONNECTION_TIMEOUT = 4
+    ARTICLES_PAGE_SIZE = 20
+    ARTICLES_MAX_PAGE_SIZE = 100
+    ARTICLES_EXPORT_BATCH_SIZE = 1000
+    ARTICLES_IMPORT_BATCH_SIZE = 500
+    ARTICLE_CACHE_SIZE = 1024
+    ARTICLE_CACHE_TTL = 30
+    ARTICLE_CACHE_BACKEND = os.getenv('ARTICLE_CACHE_BACKEND')  # None, 'memory' or 'redis'
+    ARTICLE_CACHE_SHARED_TTL = 300
+    CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL', 'redis://localhost:6379/1')
+    # 'memory' or 'redis'; only redis deltas are visible to the like count reconciliation, see below
+    LIKE_BUFFER_BACKEND = os.getenv('LIKE_BUFFER_BACKEND', 'memory')
+    LIKE_BUFFER_MAX_PENDING = 500
+    LIKE_BUFFER_FLUSH_INTERVAL = 2.0
+    LIKE_COUNT_CACHE_SIZE = 4096
+    LIKE_COUNT_CACHE_TTL = 5
+    LIKE_COUNT_SHARDS = int(os.getenv('LIKE_COUNT_SHARDS', 8))  # counter documents per article
+    LIKE_COUNT_RECONCILE_INTERVAL = int(os.getenv('LIKE_COUNT_RECONCILE_INTERVAL', 3600))  # seconds; 0 unschedules it
+    # drift must survive this long to be corrected: longer than a flush plus update_like_counts' 10 retries 5s apart.
+    # The reconciler also discounts deltas still in a redis like buffer; a memory buffer's are only covered by this wait
+    LIKE_COUNT_RECONCILE_SETTLE_SECONDS = int(os.getenv('LIKE_COUNT_RECONCILE_SETTLE_SECONDS', 120))
+    LIKE_COUNT_RECONCILE_BATCH_SIZE = 500
+    TRENDING_BACKEND = os.getenv('TRENDING_BACKEND', 'memory')  # 'redis' to share one ranking, rebuilt by the worker
+    TRENDING_WINDOW_HOURS = 48  # likes older than this don't count
+    TRENDING_HALF_LIFE_HOURS = 6  # a like's weight halves every half-life
+    TRENDING_SIZE = 1000  # articles kept in the ranking
+    TRENDING_REFRESH_INTERVAL = int(os.getenv('TRENDING_REFRESH_INTERVAL', 600))  # seconds between rebuilds; 0 unschedules it
+    TRENDING_LOCAL_TTL = 5
+    TRENDING_FLUSH_INTERVAL = 1.0  # seconds likes' score increments are buffered before reaching the store
+    TRENDING_BATCH_SIZE = 5000
+    SEARCH_CACHE_SIZE = 256
+    SEARCH_CACHE_TTL = 60
+    SEARCH_CACHE_TOP_N = 200
+    SEARCH_HEADLINE_OPTIONS = 'MaxWords=35, MinWords=15, MaxFragments=2'
+    SOCKETIO_MESSAGE_QUEUE = os.getenv('SOCKETIO_MESSAGE_QUEUE')  # None, 'memory://', redis:// or any kombu url
+    SOCKETIO_CHANNEL = 'flask-socketio'
+    SOCKETIO_TICK_INTERVAL = 1.0
+    GRAPHQL_DOCUMENT_CACHE_SIZE = 512
+    GRAPHQL_DOCUMENT_CACHE_TTL = 3600
+    GRAPHQL_MAX_QUERY_LENGTH = 10000
+    GRAPHQL_MAX_DEPTH = 12
+    GRAPHQL_MAX_COMPLEXITY = 5000
+    GRAPHQL_DEFAULT_LIST_SIZE = 100
+    GRAPHQL_INTROSPECTION = os.getenv('GRAPHQL_INTROSPECTION', '0').lower() in ('1', 'true', 'yes')
+    GRAPHQL_MAX_INTROSPECTION_DEPTH = 15  # GraphiQL's schema query nests type references 13 deep
+    GRAPHQL_MAX_INTROSPECTION_COMPLEXITY = 100000  # the same query costs about 70000 against this schema
+    PERSISTED_QUERY_CACHE_SIZE = 1024
+    PERSISTED_QUERY_CACHE_TTL = 3600
+    PERSISTED_QUERY_CACHE_BACKEND = os.getenv('PERSISTED_QUERY_CACHE_BACKEND')  # None, 'memory' or 'redis'
+    PERSISTED_QUERY_CACHE_SHARED_TTL = 7 * 24 * 3600
 
 class DevelopmentConfig(Config):
     DEBUG = True
     DEVELOPMENT = True
+    GRAPHQL_INTROSPECTION = True
     SECRET_KEY = os.getenv('SECRET_KEY', 'your_secret_key')
     SQLALCHEMY_DATABASE_URI = os.getenv('SQLALCHEMY_DATABASE_URI')
     CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', 'redis://localhost:6379/0')
@@ -24,6 +148,9 @@ class ProductionConfig(Config):
     DEBUG = False
     SECRET_KEY = os.getenv('SECRET_KEY')
     SQLALCHEMY_DATABASE_URI = os.getenv('SQLALCHEMY_DATABASE_URI')
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(pool_size=10, max_overflow=20)
+    MONGO_POOL_OPTIONS = mongo_pool_options(max_pool_size=100)
+    QUERY_SAMPLE_RATE = float(os.getenv('QUERY_SAMPLE_RATE', 0.05))
     CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL')
     CELERY_RESULT_BACKEND = os.getenv('CELERY_RESULT_BACKEND')
     MONGO_URI = os.getenv('MONGO_URI')
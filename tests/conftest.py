@@ -0,0 +1,125 @@
+"""One app per test, on a fresh SQLite file and mongomock (pip install -r requirements-dev.txt).
+
+Modules change settings by overriding the `app_config` fixture; they are
+passed to create_app, so nothing is read from or written to os.environ.
+"""
+import pytest
+from sqlalchemy import event
+
+from benchmarks.harness import install_mongomock_compat, install_sqlite_shims
+
+install_sqlite_shims()
+install_mongomock_compat()
+
+PASSWORD = 'correct horse'
+
+
+@pytest.fixture
+def app_config():
+    return {}
+
+
+@pytest.fixture
+def app(tmp_path, app_config):
+    import mongomock
+    from app import celery, create_app, db, mongo
+
+    config = {
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'primary.sqlite'}",
+        'SQLALCHEMY_REPLICA_URIS': [],
+        'DEVELOPMENT': False,
+        'BCRYPT_LOG_ROUNDS': 4,
+        'JWT_SECRET_KEY': 'test-secret-key-test-secret-key-test',
+        'JWT_VERIFY_SUB': False,
+        'RATE_LIMIT_ENABLED': False,
+        'ADMISSION_CONTROL': False,
+        'QUERY_SAMPLE_RATE': 1.0,
+        'SLOW_QUERY_MS': 60000,
+        'FAST_SERIALIZER': False,
+        'ASYNC_MODE': False,
+    }
+    config.update(app_config)
+    app = create_app('development', config=config)
+    app.debug = False
+    celery.conf.update(task_always_eager=True, task_eager_propagates=True)
+    mongo.cx = mongomock.MongoClient()
+    # mongomock clients share one in-memory server
+    mongo.cx.drop_database('flog')
+    mongo.db = mongo.cx['flog']
+
+    from app.cache import like_count_cache, search_cache
+    like_count_cache.clear()
+    search_cache.clear()
+    with app.app_context():
+        # replicas are copies of the primary; `db` remembers their bind keys from earlier apps
+        db.create_all(bind_key=None)
+    yield app
+    from app.replicas import replica_router
+    replica_router.stop()
+    with app.app_context():
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def statements(app):
+    """SQL sent to the primary while the test runs."""
+    from app import db
+
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    yield executed
+    event.remove(engine, 'before_cursor_execute', record)
+
+
+@pytest.fixture
+def users(app):
+    """Two users, returned as (id, Authorization headers) pairs."""
+    from flask_jwt_extended import create_access_token
+    from app import db
+    from app.models import User
+    from app.passwords import hash_password
+
+    with app.app_context():
+        created = [
+            User(name=f"user {index}", email=f"user{index}@example.com", password=hash_password(PASSWORD))
+            for index in range(2)
+        ]
+        db.session.add_all(created)
+        db.session.commit()
+        return [
+            (user.id, {'Authorization': f"Bearer {create_access_token(identity={'id': user.id, 'is_admin': False})}"})
+            for user in created
+        ]
+
+
+@pytest.fixture
+def make_articles(app):
+    """Insert `count` articles for `user_id` through the importer and return their ids, oldest first."""
+    from app.importer import import_articles
+    from app.models import Article
+
+    def make(user_id, count, is_public=True, title='Article'):
+        records = [
+            {'title': f"{title} {index}", 'content': f"content of {title.lower()} {index}", 'is_public': is_public}
+            for index in range(count)
+        ]
+        with app.app_context():
+            import_articles(records, user_id, app.config['ARTICLES_IMPORT_BATCH_SIZE'])
+            return [
+                article.id for article in
+                Article.query.filter(Article.user_id == user_id, Article.title.like(f"{title} %")).order_by(Article.id)
+            ]
+    return make
@@ -0,0 +1,122 @@
+import threading
+import time
+
+import pytest
+
+
+@pytest.fixture
+def app_config():
+    return {'ARTICLE_CACHE_BACKEND': 'memory'}
+
+
+@pytest.fixture
+def article(app, users, make_articles):
+    from app import db
+    from app.models import Article
+
+    author_id, _ = users[0]
+    article_id = make_articles(author_id, 1)[0]
+    with app.app_context():
+        return article_id, db.session.get(Article, article_id).slug
+
+
+def read(client, slug, headers):
+    response = client.get(f'/api/articles/{slug}/', headers=headers)
+    return response.status_code, (response.get_json().get('data') or {}).get('content')
+
+
+def write_behind_the_cache(app, article_id, content):
+    from app import db
+    from app.models import Article
+    with app.app_context():
+        db.session.execute(db.update(Article).where(Article.id == article_id).values(content=content))
+        db.session.commit()
+
+
+def test_reads_are_served_from_the_cache(app, client, users, article):
+    from app.cache import article_cache
+
+    article_id, slug = article
+    reader = users[1][1]
+    assert read(client, slug, reader) == (200, 'content of article 0')
+    write_behind_the_cache(app, article_id, 'changed behind the cache')
+    assert read(client, slug, reader) == (200, 'content of article 0')
+
+    # the shared tier refills the local one
+    article_cache.local.clear()
+    assert article_cache.peek(slug)['data']['content'] == 'content of article 0'
+
+
+def test_updates_evict_both_tiers(client, users, article):
+    from app.cache import article_cache
+
+    article_id, slug = article
+    author, reader = users[0][1], users[1][1]
+    read(client, slug, reader)
+    assert client.put(f'/api/articles/{article_id}/', json={'content': 'edited'}, headers=author).status_code == 200
+    assert article_cache.local.get(slug) is None
+    assert article_cache.shared.get(f'article:{slug}') is None
+    assert read(client, slug, reader) == (200, 'edited')
+
+
+def test_new_title_evicts_the_old_slug(app, client, users, article):
+    from app import db
+    from app.models import Article
+
+    article_id, slug = article
+    author, reader = users[0][1], users[1][1]
+    read(client, slug, reader)
+    assert client.put(f'/api/articles/{article_id}/', json={'title': 'Renamed'}, headers=author).status_code == 200
+    with app.app_context():
+        new_slug = db.session.get(Article, article_id).slug
+    assert new_slug != slug
+    assert read(client, slug, reader)[0] == 404
+    assert read(client, new_slug, reader) == (200, 'content of article 0')
+
+
+def test_unpublish_and_delete_evict(client, users, article):
+    article_id, slug = article
+    author, reader = users[0][1], users[1][1]
+    read(client, slug, reader)
+    assert client.put(f'/api/articles/{article_id}/private/', headers=author).status_code == 200
+    assert read(client, slug, reader)[0] == 401
+    assert read(client, slug, author) == (200, 'content of article 0')
+    assert client.delete(f'/api/articles/{article_id}/', headers=author).status_code == 200
+    assert read(client, slug, author)[0] == 404
+
+
+def test_rejected_write_keeps_the_cache(client, users, article):
+    from app.cache import article_cache
+
+    article_id, slug = article
+    reader = users[1][1]
+    read(client, slug, reader)
+    assert client.put(f'/api/articles/{article_id}/', json={'content': 'not yours'}, headers=reader).status_code == 403
+    assert article_cache.local.get(slug) is not None
+
+
+def test_concurrent_misses_load_once():
+    from app.cache import SingleFlight
+
+    flight, started, release = SingleFlight(), threading.Event(), threading.Event()
+    calls, results = [], []
+
+    def load():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return 'loaded'
+
+    leader = threading.Thread(target=lambda: results.append(flight.do('key', load)))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(flight.do('key', load))) for _ in range(4)]
+    for follower in followers:
+        follower.start()
+    # let the followers reach the in-flight call before it returns
+    time.sleep(0.1)
+    release.set()
+    for thread in [leader, *followers]:
+        thread.join(5)
+    assert len(calls) == 1
+    assert results == ['loaded'] * 5
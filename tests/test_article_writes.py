@@ -0,0 +1,51 @@
+import pytest
+
+
+@pytest.fixture
+def article_id(users, make_articles):
+    return make_articles(users[0][0], 1)[0]
+
+
+def content_of(app, article_id):
+    from app import db
+    from app.models import Article
+    with app.app_context():
+        article = db.session.get(Article, article_id)
+        return article and article.content
+
+
+WRITES = [
+    ('put', '/api/articles/{}/', {'content': 'hijacked'}),
+    ('put', '/api/articles/{}/private/', None),
+    ('delete', '/api/articles/{}/', None),
+]
+
+
+@pytest.mark.parametrize('method, url, body', WRITES)
+def test_writes_to_another_users_article_are_forbidden(app, client, users, article_id, method, url, body):
+    response = getattr(client, method)(url.format(article_id), json=body, headers=users[1][1])
+    assert response.status_code == 403
+    assert response.get_json()['message'] == 'Article unauthorized'
+    assert content_of(app, article_id) == 'content of article 0'
+
+
+@pytest.mark.parametrize('method, url, body', WRITES)
+def test_writes_to_a_missing_article_are_not_found(client, users, article_id, method, url, body):
+    response = getattr(client, method)(url.format(article_id + 1), json=body, headers=users[0][1])
+    assert response.status_code == 404
+
+
+def test_owner_writes_take_one_statement(app, client, users, article_id, statements):
+    author = users[0][1]
+    assert client.put(f'/api/articles/{article_id}/', json={'content': 'edited'}, headers=author).status_code == 200
+    assert [statement.split()[0] for statement in statements] == ['UPDATE']
+    assert content_of(app, article_id) == 'edited'
+    statements.clear()
+    assert client.delete(f'/api/articles/{article_id}/', headers=author).status_code == 200
+    assert [statement.split()[0] for statement in statements] == ['DELETE']
+    assert content_of(app, article_id) is None
+
+
+def test_empty_update_still_checks_ownership(client, users, article_id):
+    assert client.put(f'/api/articles/{article_id}/', json={}, headers=users[1][1]).status_code == 403
+    assert client.put(f'/api/articles/{article_id}/', json={}, headers=users[0][1]).status_code == 200
@@ -0,0 +1,58 @@
+import pytest
+
+
+@pytest.fixture
+def app_config():
+    return {'ASYNC_MODE': True}
+
+
+@pytest.fixture
+def page_queries(monkeypatch):
+    from app.article import async_routes
+
+    calls = []
+    fetch_page = async_routes.fetch_page
+
+    async def counted(stmt, cursor):
+        calls.append(cursor)
+        return await fetch_page(stmt, cursor)
+
+    monkeypatch.setattr(async_routes, 'fetch_page', counted)
+    return calls
+
+
+def test_async_list_pages_like_the_sync_view(client, users, make_articles):
+    (author_id, _), _ = users
+    article_ids = make_articles(author_id, 5)
+
+    response = client.get('/api/articles/?limit=3')
+    assert response.status_code == 200
+    body = response.get_json()
+    assert [article['id'] for article in body['data']] == article_ids[::-1][:3]
+    response = client.get('/api/articles/', query_string={'limit': 3, 'cursor': body['meta']['next']})
+    assert [article['id'] for article in response.get_json()['data']] == article_ids[::-1][3:]
+
+
+def test_async_list_answers_304_before_the_page_query(client, users, make_articles, page_queries):
+    (author_id, _), _ = users
+    make_articles(author_id, 2)
+    etag = client.get('/api/articles/').headers['ETag']
+    assert len(page_queries) == 1
+
+    assert client.get('/api/articles/', headers={'If-None-Match': etag}).status_code == 304
+    assert len(page_queries) == 1
+
+
+def test_async_article_by_slug_is_cached(app, client, users, make_articles):
+    from app import db
+    from app.cache import article_cache
+    from app.models import Article
+
+    (author_id, headers), _ = users
+    article_id = make_articles(author_id, 1)[0]
+    with app.app_context():
+        slug = db.session.get(Article, article_id).slug
+    response = client.get(f'/api/articles/{slug}/', headers=headers)
+    assert response.status_code == 200
+    assert response.get_json()['data']['id'] == article_id
+    assert article_cache.peek(slug)['data']['id'] == article_id
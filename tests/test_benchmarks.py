@@ -0,0 +1,55 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from benchmarks import harness, suite
+
+
+@pytest.fixture
+def seeded(app):
+    data = harness.seed(app, users=3, articles=12, likes=20)
+    return data, harness.login_tokens(app, data['user_ids'])
+
+
+def test_percentile():
+    values = [1, 2, 3, 4, 5, 6, 7, 8, 9, 10]
+    assert [suite.percentile(values, fraction) for fraction in (0, 0.5, 0.95, 1)] == [1, 5, 10, 10]
+    assert suite.percentile([], 0.5) == 0.0
+
+
+def test_compare_flags_regressions_beyond_the_tolerance():
+    previous = {'p95_ms': 10.0, 'throughput_rps': 100.0, 'queries_per_request': 2.0, 'mongo_per_request': 0.0, 'errors': 0}
+    baseline = {'scenarios': {'list': previous, 'gone': previous}}
+    within = dict(previous, p95_ms=12.0, throughput_rps=80.0)
+    assert suite.compare({'scenarios': {'list': within, 'new': dict(within, errors=3)}}, baseline, 0.25) == []
+
+    worse = dict(previous, p95_ms=13.0, throughput_rps=70.0, queries_per_request=3.0, errors=1)
+    assert suite.compare({'scenarios': {'list': worse}}, baseline, 0.25) == [
+        "list: p95 10.0 -> 13.0 ms",
+        "list: throughput 100.0 -> 70.0 rps",
+        "list: queries_per_request 2.0 -> 3.0",
+        "list: errors 0 -> 1",
+    ]
+
+
+def test_baseline_covers_every_scenario_that_runs_on_sqlite():
+    baseline = json.loads((Path(suite.__file__).parent / 'baseline.json').read_text())
+    scenarios = suite.build_scenarios({'user_ids': [], 'slugs': [], 'article_ids': []}, {}, 20)
+    names = {scenario.name for scenario in scenarios if not scenario.postgres_only}
+    assert set(baseline['scenarios']) == names | {'socket_like_tick'}
+
+
+def test_scenarios_run_without_errors(app, seeded):
+    data, tokens = seeded
+    for scenario in suite.build_scenarios(data, tokens, page_size=5):
+        if scenario.postgres_only:
+            continue
+        stats = suite.run_scenario(app, scenario, concurrency=2, requests=6, warmup=1)
+        assert (scenario.name, stats['requests'], stats['errors']) == (scenario.name, 6, 0)
+
+
+def test_socket_tick_reaches_every_subscriber(app, seeded):
+    data, _ = seeded
+    stats = suite.run_socket_scenario(app, subscribers=3, ticks=2, articles=data['article_ids'])
+    assert (stats['errors'], stats['events_delivered']) == (0, 6)
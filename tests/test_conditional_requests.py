@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta, timezone
+
+
+def slug_of(app, article_id):
+    from app import db
+    from app.models import Article
+    with app.app_context():
+        return db.session.get(Article, article_id).slug
+
+
+def test_article_etag_and_last_modified_answer_304(app, client, users, make_articles):
+    (author_id, headers), _ = users
+    slug = slug_of(app, make_articles(author_id, 1)[0])
+
+    response = client.get(f'/api/articles/{slug}/', headers=headers)
+    assert response.status_code == 200
+    etag, last_modified = response.headers['ETag'], response.headers['Last-Modified']
+
+    assert client.get(f'/api/articles/{slug}/', headers=dict(headers, **{'If-None-Match': etag})).status_code == 304
+    assert client.get(f'/api/articles/{slug}/', headers=dict(headers, **{'If-Modified-Since': last_modified})).status_code == 304
+    response = client.get(f'/api/articles/{slug}/', headers=dict(headers, **{'If-None-Match': '"other"'}))
+    assert response.status_code == 200
+
+
+def test_article_etag_changes_when_it_is_updated(app, client, users, make_articles):
+    (author_id, headers), _ = users
+    article_id = make_articles(author_id, 1)[0]
+    slug = slug_of(app, article_id)
+    etag = client.get(f'/api/articles/{slug}/', headers=headers).headers['ETag']
+
+    assert client.put(f'/api/articles/{article_id}/', json={'content': 'edited'}, headers=headers).status_code == 200
+    response = client.get(f'/api/articles/{slug}/', headers=dict(headers, **{'If-None-Match': etag}))
+    assert response.status_code == 200
+    assert response.get_json()['data']['content'] == 'edited'
+    assert response.headers['ETag'] != etag
+
+
+def test_private_article_is_not_revalidated_for_other_users(app, client, users, make_articles):
+    (author_id, author), (_, reader) = users
+    slug = slug_of(app, make_articles(author_id, 1, is_public=False)[0])
+    etag = client.get(f'/api/articles/{slug}/', headers=author).headers['ETag']
+    assert client.get(f'/api/articles/{slug}/', headers=dict(reader, **{'If-None-Match': etag})).status_code == 401
+
+
+def test_list_sends_only_an_etag_that_changes_when_a_row_goes_away(client, users, make_articles):
+    (author_id, headers), _ = users
+    article_ids = make_articles(author_id, 3)
+
+    response = client.get('/api/articles/')
+    assert response.status_code == 200
+    assert 'Last-Modified' not in response.headers
+    etag = response.headers['ETag']
+    assert client.get('/api/articles/', headers={'If-None-Match': etag}).status_code == 304
+
+    # the newest timestamp is unchanged, only the count moves
+    assert client.put(f'/api/articles/{article_ids[0]}/private/', headers=headers).status_code == 200
+    assert client.get('/api/articles/', headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_list_ignores_if_modified_since(client, users, make_articles):
+    (author_id, headers), _ = users
+    article_ids = make_articles(author_id, 2)
+    since = (datetime.now(timezone.utc) + timedelta(minutes=1)).strftime('%a, %d %b %Y %H:%M:%S GMT')
+    assert client.delete(f'/api/articles/{article_ids[0]}/', headers=headers).status_code == 200
+    response = client.get('/api/articles/', headers={'If-Modified-Since': since})
+    assert response.status_code == 200
+    assert [article['id'] for article in response.get_json()['data']] == [article_ids[1]]
+
+
+def test_list_with_like_counts_is_never_revalidated(client, users, make_articles):
+    (author_id, _), _ = users
+    make_articles(author_id, 1)
+    response = client.get('/api/articles/?include=like_count')
+    assert response.status_code == 200
+    assert 'ETag' not in response.headers
@@ -0,0 +1,38 @@
+import json
+
+import pytest
+
+
+@pytest.fixture
+def app_config():
+    # smaller than the exports below, so they span several batches
+    return {'ARTICLES_EXPORT_BATCH_SIZE': 2}
+
+
+def read_ndjson(response):
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_public_export_streams_every_public_article(client, users, make_articles):
+    (first, _), (second, _) = users
+    public = make_articles(first, 3) + make_articles(second, 2)
+    make_articles(first, 2, is_public=False, title='Draft')
+
+    rows = read_ndjson(client.get('/api/articles/export/'))
+    assert [row['id'] for row in rows] == sorted(public)
+    assert all(row['is_public'] for row in rows)
+
+
+def test_user_export_includes_drafts_of_that_user_only(client, users, make_articles):
+    (first, headers), (second, _) = users
+    own = make_articles(first, 2) + make_articles(first, 3, is_public=False, title='Draft')
+    make_articles(second, 2)
+
+    rows = read_ndjson(client.get('/api/articles/user/export/', headers=headers))
+    assert [row['id'] for row in rows] == sorted(own)
+
+
+def test_user_export_requires_login(client):
+    assert client.get('/api/articles/user/export/').status_code == 401
@@ -0,0 +1,97 @@
+import hashlib
+import json
+
+import pytest
+
+ARTICLES = 'query Articles($n: Int) { articles(first: $n) { edges { node { title } } } }'
+DEEP = '{ articles(first: 1) { edges { node { author { articles(first: 1) { edges { node { title } } } } } } } }'
+
+
+@pytest.fixture
+def app_config():
+    return {
+        'GRAPHQL_MAX_QUERY_LENGTH': 500,
+        'GRAPHQL_MAX_DEPTH': 5,
+        'GRAPHQL_MAX_COMPLEXITY': 100,
+        'GRAPHQL_INTROSPECTION': False,
+    }
+
+
+def sha256(query):
+    return hashlib.sha256(query.encode('utf-8')).hexdigest()
+
+
+def post(client, **body):
+    response = client.post('/graphql/auth', json=body)
+    return response.status_code, response.get_json()
+
+
+def messages(body):
+    return [error['message'] for error in body.get('errors', [])]
+
+
+def test_persisted_query_round_trip(client, users, make_articles):
+    make_articles(users[0][0], 1)
+    persisted = {'persistedQuery': {'version': 1, 'sha256Hash': sha256(ARTICLES)}}
+
+    status, body = post(client, extensions=persisted, variables={'n': 5})
+    assert (status, messages(body)) == (200, ['PersistedQueryNotFound'])
+    status, body = post(client, query=ARTICLES, extensions=persisted, variables={'n': 5})
+    assert status == 200 and body['data']['articles']['edges']
+    status, body = post(client, extensions=persisted, variables={'n': 5})
+    assert status == 200 and body['data']['articles']['edges'][0]['node']['title'] == 'Article 0'
+
+    # GET carries the extensions as a JSON string
+    args = {'extensions': json.dumps(persisted), 'variables': json.dumps({'n': 5})}
+    response = client.get('/graphql/auth', query_string=args)
+    assert response.status_code == 200 and response.get_json()['data']['articles']
+
+
+@pytest.mark.parametrize('extensions, message', [
+    ({'persistedQuery': {'version': 1, 'sha256Hash': sha256('{ __typename }')}}, 'Provided sha256Hash does not match query.'),
+    ({'persistedQuery': {'version': 2, 'sha256Hash': sha256(ARTICLES)}}, 'Unsupported persisted query.'),
+])
+def test_bad_persisted_queries(client, extensions, message):
+    status, body = post(client, query=ARTICLES, extensions=extensions)
+    assert (status, messages(body)) == (400, [message])
+
+
+def test_oversized_queries_are_refused_before_parsing(client):
+    status, body = post(client, query='{ ' + '__typename ' * 60 + '}')
+    assert (status, messages(body)) == (413, ['Query is too large.'])
+
+
+@pytest.mark.parametrize('n, message', [
+    (10, None),
+    (50, 'Query complexity 151 exceeds the limit of 100.'),
+    # an unbounded page counts as GRAPHQL_DEFAULT_LIST_SIZE rows
+    (None, 'Query complexity 301 exceeds the limit of 100.'),
+])
+def test_complexity_scales_with_page_size(client, n, message):
+    status, body = post(client, query=ARTICLES, variables={'n': n})
+    assert status == (400 if message else 200)
+    assert messages(body) == ([message] if message else [])
+
+
+def test_depth_limit(client):
+    status, body = post(client, query=DEEP)
+    assert (status, messages(body)) == (400, ['Query depth 8 exceeds the limit of 5.'])
+
+
+def test_introspection_can_be_disabled(client):
+    status, body = post(client, query='{ __schema { queryType { name } } }')
+    assert (status, messages(body)) == (400, ['GraphQL introspection is disabled.'])
+    status, body = post(client, query='{ __typename }')
+    assert (status, body['data']) == (200, {'__typename': 'Query'})
+
+
+def test_documents_are_parsed_once(client, monkeypatch):
+    import app.graph_view as graph_view
+
+    parsed = []
+    parse = graph_view.parse
+    monkeypatch.setattr(graph_view, 'parse', lambda source: parsed.append(source) or parse(source))
+    query = '{ articles(first: 3) { edges { cursor } } }'
+    for _ in range(3):
+        assert post(client, query=query)[0] == 200
+    assert parsed == [query]
@@ -0,0 +1,69 @@
+import pytest
+
+FEED = '''{
+  articles(first: 20) {
+    edges { node { title likeCount author { name articles(first: 2) {
+      pageInfo { hasNextPage } edges { node { title } }
+    } } } }
+  }
+}'''
+
+
+@pytest.fixture
+def aggregates(monkeypatch):
+    import mongomock
+    calls = []
+    aggregate = mongomock.collection.Collection.aggregate
+
+    def counting(self, pipeline, *args, **kwargs):
+        calls.append(pipeline)
+        return aggregate(self, pipeline, *args, **kwargs)
+
+    monkeypatch.setattr(mongomock.collection.Collection, 'aggregate', counting)
+    return calls
+
+
+def run(client, query):
+    response = client.post('/graphql/auth', json={'query': query})
+    assert response.status_code == 200, response.get_data(as_text=True)
+    body = response.get_json()
+    assert 'errors' not in body, body['errors']
+    return body['data']
+
+
+def feed_statements(client, users, make_articles, statements, per_user):
+    for user_id, _ in users:
+        make_articles(user_id, per_user, title=f"By {user_id}")
+    statements.clear()
+    data = run(client, FEED)
+    assert len(data['articles']['edges']) == per_user * len(users)
+    return [statement for statement in statements if statement.startswith('SELECT')], data
+
+
+def test_authors_and_their_articles_are_batched(client, users, make_articles, statements, aggregates):
+    selects, data = feed_statements(client, users, make_articles, statements, per_user=3)
+    # the page's count and rows, then one query per loader
+    assert len(selects) == 4
+    assert sum('FROM flask_user' in select for select in selects) == 1
+    assert sum('row_number()' in select.lower() for select in selects) == 1
+    assert len(aggregates) == 1
+
+    (first_id, _), _ = users
+    node = next(edge['node'] for edge in data['articles']['edges'] if edge['node']['author']['name'] == 'user 0')
+    own = node['author']['articles']
+    assert [edge['node']['title'] for edge in own['edges']] == [f"By {first_id} 2", f"By {first_id} 1"]
+    assert own['pageInfo']['hasNextPage'] is True
+    assert node['likeCount'] == 0
+
+
+def test_query_count_does_not_grow_with_the_page(client, users, make_articles, statements):
+    few, _ = feed_statements(client, users, make_articles, statements, per_user=1)
+    many, _ = feed_statements(client, users, make_articles, statements, per_user=4)
+    assert len(many) == len(few)
+
+
+def test_loaders_are_scoped_to_the_request(client, users):
+    # a loader shared between requests would answer the second user from the first one's cache
+    for index, (_, headers) in enumerate(users):
+        response = client.post('/graphql/auth', json={'query': '{ profile { email } }'}, headers=headers)
+        assert response.get_json()['data']['profile']['email'] == f"user{index}@example.com"
@@ -0,0 +1,81 @@
+import json
+
+import pytest
+
+
+@pytest.fixture
+def app_config():
+    return {'ARTICLES_IMPORT_BATCH_SIZE': 3}
+
+
+def post_ndjson(client, headers, records):
+    body = '\n'.join(record if isinstance(record, str) else json.dumps(record) for record in records)
+    return client.post('/api/articles/import/', data=body, content_type='application/x-ndjson', headers=headers)
+
+
+def article(title, **fields):
+    return dict({'title': title, 'content': f"about {title}", 'is_public': True}, **fields)
+
+
+def imported_titles(app, user_id):
+    from app.models import Article
+    with app.app_context():
+        return sorted(title for (title,) in Article.query.with_entities(Article.title).filter_by(user_id=user_id))
+
+
+def test_bad_rows_are_reported_by_line_and_the_rest_imported(app, client, users):
+    user_id, headers = users[0]
+    response = post_ndjson(client, headers, [
+        article('one'),
+        '{not json',
+        article(''),
+        article('two', is_public='yes'),
+        article('three'),
+        article('one'),
+        article('four', content='nul \x00 byte'),
+        article('中' * 40),
+        article('five'),
+    ])
+    assert response.status_code == 201
+    data = response.get_json()['data']
+    assert data['imported'] == 3
+    assert [error['line'] for error in data['errors']] == [2, 3, 4, 6, 7, 8]
+    assert data['errors'][3]['error'] == 'You have already created an article with this title before.'
+    assert 'NUL' in data['errors'][4]['error']
+    assert 'slug' in data['errors'][5]['error']
+    assert imported_titles(app, user_id) == ['five', 'one', 'three']
+
+
+def test_a_row_the_database_rejects_does_not_fail_its_batch(app, client, users):
+    from app import db
+    user_id, headers = users[0]
+    with app.app_context():
+        db.session.execute(db.text(
+            "CREATE TRIGGER reject_boom BEFORE INSERT ON flask_article WHEN NEW.title = 'boom' "
+            "BEGIN SELECT RAISE(ABORT, 'boom is not allowed'); END"
+        ))
+        db.session.commit()
+
+    response = post_ndjson(client, headers, [article('a'), article('boom'), article('b'), article('c'), article('d')])
+    data = response.get_json()['data']
+    assert data['imported'] == 4
+    assert data['errors'] == [{'line': 2, 'error': 'rejected by the database: boom is not allowed'}]
+    assert imported_titles(app, user_id) == ['a', 'b', 'c', 'd']
+
+
+def test_json_array_body_is_accepted(app, client, users):
+    user_id, headers = users[0]
+    response = client.post('/api/articles/import/', json=[article('x'), article('y')], headers=headers)
+    assert response.status_code == 201
+    assert response.get_json()['data'] == {'imported': 2, 'errors': []}
+    assert client.post('/api/articles/import/', json={'title': 'x'}, headers=headers).status_code == 400
+
+
+def test_cli_import_reads_ndjson(app, users, tmp_path):
+    user_id, _ = users[0]
+    source = tmp_path / 'articles.ndjson'
+    source.write_text('\n'.join(json.dumps(article(title)) for title in ('p', 'q', 'p')))
+    result = app.test_cli_runner().invoke(args=['articles', 'import', str(source), '--user-id', str(user_id)])
+    assert result.exit_code == 0
+    assert 'imported 2 articles, 1 rejected' in result.output
+    assert imported_titles(app, user_id) == ['p', 'q']
@@ -0,0 +1,61 @@
+import logging
+import re
+
+import pytest
+
+
+@pytest.fixture
+def app_config():
+    return {'N_PLUS_ONE_THRESHOLD': 3}
+
+
+@pytest.fixture
+def per_article(app, users, make_articles):
+    """A view that loads articles one query at a time."""
+    from app import db
+    from app.models import Article
+
+    ids = make_articles(users[0][0], 3)
+
+    def one_by_one():
+        return {'titles': [db.session.get(Article, article_id).title for article_id in ids]}
+
+    app.add_url_rule('/one-by-one', 'one_by_one', one_by_one)
+    return '/one-by-one'
+
+
+def timing(response):
+    return dict(re.findall(r'(\w+);dur=[\d.]+(?:;desc="(\d+) \w+")?', response.headers['Server-Timing']))
+
+
+def test_server_timing_counts_the_request_queries(client, users, make_articles, statements):
+    make_articles(users[0][0], 2)
+    statements.clear()
+    response = client.get('/api/articles/')
+    assert response.status_code == 200
+    assert timing(response) == {'db': str(len(statements)), 'mongo': '0', 'total': ''}
+    assert len(statements) == 2
+
+
+def test_unsampled_requests_get_no_header(client, monkeypatch):
+    from app.instrumentation import query_instrumentation
+
+    monkeypatch.setattr(query_instrumentation, 'sample_rate', 0)
+    assert 'Server-Timing' not in client.get('/api/articles/').headers
+
+
+def test_repeated_statements_are_reported(client, per_article, caplog):
+    with caplog.at_level(logging.WARNING, logger='app.instrumentation'):
+        response = client.get(per_article)
+    assert timing(response)['db'] == '3'
+    warning, = [record.getMessage() for record in caplog.records if 'N+1' in record.getMessage()]
+    assert warning.startswith('probable N+1 on GET /one-by-one: 3 x SELECT')
+
+
+def test_slow_queries_are_logged(client, caplog, monkeypatch):
+    from app.instrumentation import query_instrumentation
+
+    monkeypatch.setattr(query_instrumentation, 'slow_query_ms', 0)
+    with caplog.at_level(logging.WARNING, logger='app.instrumentation'):
+        client.get('/api/articles/')
+    assert any(record.getMessage().startswith('slow query') for record in caplog.records)
@@ -0,0 +1,97 @@
+import pytest
+
+
+@pytest.fixture
+def app_config():
+    # flushed by the tests themselves
+    return {'LIKE_BUFFER_FLUSH_INTERVAL': 3600, 'LIKE_BUFFER_MAX_PENDING': 3}
+
+
+@pytest.fixture
+def published():
+    from app.like_buffer import LikeCountBuffer
+
+    calls = []
+    buffer = LikeCountBuffer(publish=calls.append, max_pending=100, flush_interval=3600)
+    yield buffer, calls
+    buffer._stopped.set()
+
+
+def test_deltas_coalesce_into_one_publish(published):
+    buffer, calls = published
+    for article_id, delta in [(1, 1), (1, 1), (2, 1), (1, -1), (3, 1), (3, -1)]:
+        buffer.add(article_id, delta)
+    assert buffer.flush() == 2
+    # articles whose likes cancelled out aren't sent
+    assert calls == [{1: 1, 2: 1}]
+    assert buffer.flush() == 0
+    assert len(calls) == 1
+
+
+def test_failed_publish_keeps_the_deltas(published):
+    buffer, calls = published
+
+    def fail(deltas):
+        raise ConnectionError("broker down")
+
+    buffer.add(1, 1)
+    buffer.publish = fail
+    assert buffer.flush() == 0
+    buffer.add(1, 1)
+    buffer.publish = calls.append
+    buffer.flush()
+    assert calls == [{1: 2}]
+
+
+def test_likes_reach_mongo_once_flushed(app, client, users, make_articles):
+    from app.like_buffer import like_buffer
+    from app.mongo_models import ArticleLikeCount
+
+    (author_id, author), (_, reader) = users
+    first, second = make_articles(author_id, 2)
+    for headers in (author, reader):
+        assert client.get(f'/api/articles/{first}/like/', headers=headers).status_code == 200
+    with app.app_context():
+        assert ArticleLikeCount.sum_counts() == {}
+        assert like_buffer.pending() == {first: 2}
+        # a third article with pending deltas reaches LIKE_BUFFER_MAX_PENDING
+        assert client.get(f'/api/articles/{second}/like/', headers=reader).status_code == 200
+        assert client.get(f'/api/articles/{first}/unlike/', headers=author).status_code == 200
+        like_buffer.flush()
+        assert ArticleLikeCount.sum_counts() == {first: 1, second: 1}
+
+
+def test_max_pending_flushes_early(app):
+    from app.like_buffer import like_buffer
+    from app.mongo_models import ArticleLikeCount
+
+    with app.app_context():
+        for article_id in (1, 2):
+            like_buffer.add(article_id, 1)
+        assert ArticleLikeCount.sum_counts() == {}
+        like_buffer.add(3, 1)
+        assert like_buffer.pending() == {}
+        assert ArticleLikeCount.sum_counts() == {1: 1, 2: 1, 3: 1}
+
+
+def test_partial_bulk_failure_retries_only_the_failed_articles(app, monkeypatch):
+    from pymongo.errors import BulkWriteError
+    from app.mongo_models import ArticleLikeCount
+    from app.tasks import update_like_counts
+
+    class Retried(Exception):
+        pass
+
+    def bulk_update(deltas):
+        raise BulkWriteError({'writeErrors': [{'index': 1, 'code': 11000, 'errmsg': 'duplicate key'}]})
+
+    def retry(args=None, exc=None):
+        retried.append(args)
+        return Retried()
+
+    retried = []
+    monkeypatch.setattr(ArticleLikeCount, 'bulk_update', staticmethod(bulk_update))
+    monkeypatch.setattr(update_like_counts, 'retry', retry)
+    with app.app_context(), pytest.raises(Retried):
+        update_like_counts.delay({'1': 1, '2': 2, '3': 3})
+    assert retried == [({'2': 2},)]
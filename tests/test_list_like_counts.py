@@ -0,0 +1,63 @@
+import pytest
+
+
+@pytest.fixture
+def aggregates(monkeypatch):
+    """The $in lists of every like count aggregation."""
+    import mongomock
+    calls = []
+    aggregate = mongomock.collection.Collection.aggregate
+
+    def counting(self, pipeline, *args, **kwargs):
+        if self.name == 'article_like_counts':
+            calls.append(sorted(pipeline[0]['$match']['article_id']['$in']))
+        return aggregate(self, pipeline, *args, **kwargs)
+
+    monkeypatch.setattr(mongomock.collection.Collection, 'aggregate', counting)
+    return calls
+
+
+def like_counts(client, **args):
+    response = client.get('/api/articles/', query_string={'include': 'like_count', **args})
+    assert response.status_code == 200
+    return {article['id']: article['like_count'] for article in response.get_json()['data']}
+
+
+@pytest.mark.parametrize('fast', [False, True])
+def test_page_gets_like_counts_in_one_query(app, client, users, make_articles, aggregates, fast):
+    from app.mongo_models import ArticleLikeCount
+
+    app.config['FAST_SERIALIZER'] = fast
+    author_id, _ = users[0]
+    liked, other, unliked = make_articles(author_id, 3)
+    with app.app_context():
+        ArticleLikeCount.bulk_update({liked: 3, other: 1})
+    assert like_counts(client) == {liked: 3, other: 1, unliked: 0}
+    assert aggregates == [sorted([liked, other, unliked])]
+
+
+def test_like_counts_are_cached_per_article(app, client, users, make_articles, aggregates):
+    author_id, _ = users[0]
+    first = make_articles(author_id, 2)
+    like_counts(client)
+    like_counts(client)
+    assert len(aggregates) == 1
+    second = make_articles(author_id, 1, title='Later')
+    assert like_counts(client) == dict.fromkeys(first + second, 0)
+    # only the article that wasn't cached yet is looked up
+    assert aggregates[1:] == [second]
+
+
+def test_like_counts_work_with_projections(client, users, make_articles):
+    author_id, _ = users[0]
+    make_articles(author_id, 2)
+    response = client.get('/api/articles/', query_string={'include': 'like_count', 'fields': 'title'})
+    assert [set(article) for article in response.get_json()['data']] == [{'id', 'title', 'like_count'}] * 2
+
+
+def test_lists_without_include_skip_mongo(client, users, make_articles, aggregates):
+    author_id, _ = users[0]
+    make_articles(author_id, 2)
+    response = client.get('/api/articles/')
+    assert all('like_count' not in article for article in response.get_json()['data'])
+    assert aggregates == []
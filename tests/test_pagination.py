@@ -0,0 +1,74 @@
+import pytest
+
+
+@pytest.fixture
+def app_config():
+    return {'ARTICLES_MAX_PAGE_SIZE': 5}
+
+
+def get_page(client, url, headers=None, **args):
+    response = client.get(url, query_string=args, headers=headers or {})
+    assert response.status_code == 200
+    body = response.get_json()
+    return [article['id'] for article in body.get('data', [])], body['meta']
+
+
+def test_cursors_walk_forward_and_back_newest_first(client, users, make_articles):
+    author_id, _ = users[0]
+    # one batch shares created_at, so the id breaks the tie
+    ids = make_articles(author_id, 7)
+    newest_first = ids[::-1]
+
+    pages = []
+    first, meta = get_page(client, '/api/articles/', limit=3)
+    assert meta['prev'] is None
+    pages.append(first)
+    while meta['next']:
+        page, meta = get_page(client, '/api/articles/', limit=3, cursor=meta['next'])
+        pages.append(page)
+    assert pages == [newest_first[0:3], newest_first[3:6], newest_first[6:]]
+
+    back = []
+    while meta['prev']:
+        page, meta = get_page(client, '/api/articles/', limit=3, cursor=meta['prev'])
+        back.append(page)
+    assert back == [newest_first[3:6], newest_first[0:3]]
+    assert meta['next'] is not None
+
+
+def test_rows_written_between_pages_are_neither_skipped_nor_repeated(client, users, make_articles):
+    author_id, _ = users[0]
+    older = make_articles(author_id, 4)
+    first, meta = get_page(client, '/api/articles/', limit=2)
+    make_articles(author_id, 3, title='Newer')
+    second, meta = get_page(client, '/api/articles/', limit=2, cursor=meta['next'])
+    assert first + second == older[::-1]
+
+
+def test_limit_is_clamped(client, users, make_articles):
+    author_id, _ = users[0]
+    make_articles(author_id, 7)
+    page, meta = get_page(client, '/api/articles/', limit=50)
+    assert len(page) == meta['limit'] == 5
+    page, meta = get_page(client, '/api/articles/', limit=0)
+    assert len(page) == meta['limit'] == 1
+
+
+@pytest.mark.parametrize('cursor', ['not-base64!', 'WyJzaWRld2F5cyIsIjIwMjQtMDEtMDEiLDFd', 'bnVsbA'])
+def test_invalid_cursor_is_a_bad_request(client, cursor):
+    response = client.get('/api/articles/', query_string={'cursor': cursor})
+    assert response.status_code == 400
+    assert response.get_json()['message'] == 'invalid cursor.'
+
+
+def test_user_lists_page_their_own_articles(client, users, make_articles):
+    (author_id, author), (other_id, _) = users
+    published = make_articles(author_id, 3)
+    drafts = make_articles(author_id, 3, is_public=False, title='Draft')
+    make_articles(other_id, 2)
+
+    page, meta = get_page(client, '/api/articles/user/published/', author, limit=2)
+    rest, _ = get_page(client, '/api/articles/user/published/', author, limit=2, cursor=meta['next'])
+    assert page + rest == published[::-1]
+    page, _ = get_page(client, '/api/articles/user/private/', author, limit=5)
+    assert page == drafts[::-1]
@@ -0,0 +1,50 @@
+import asyncio
+import threading
+
+from conftest import PASSWORD
+
+
+def stored_hash(app, user_id):
+    from app import db
+    from app.models import User
+    with app.app_context():
+        return db.session.get(User, user_id).password
+
+
+def login(client, password):
+    return client.post('/api/auth/login/', json={'email': 'user0@example.com', 'password': password})
+
+
+def test_login_upgrades_hashes_of_another_cost(app, client, users):
+    from app import db
+    from app.models import User
+    from app.passwords import hash_password, hash_rounds
+
+    user_id, _ = users[0]
+    with app.app_context():
+        db.session.get(User, user_id).update_password(hash_password(PASSWORD, rounds=5))
+
+    assert login(client, 'wrong horse').status_code == 401
+    assert hash_rounds(stored_hash(app, user_id)) == 5
+    assert login(client, PASSWORD).status_code == 200
+    upgraded = stored_hash(app, user_id)
+    assert hash_rounds(upgraded) == app.config['BCRYPT_LOG_ROUNDS'] == 4
+    assert login(client, PASSWORD).status_code == 200
+    # already at the configured cost, so left alone
+    assert stored_hash(app, user_id) == upgraded
+
+
+def test_hashes_run_on_the_bcrypt_pool(app):
+    from app.passwords import password_hasher
+
+    with app.app_context():
+        assert password_hasher.run(lambda: threading.current_thread().name).startswith('bcrypt')
+        name = asyncio.run(password_hasher.run_async(lambda: threading.current_thread().name))
+        assert name.startswith('bcrypt')
+
+
+def test_calibrate_recommends_the_last_cost_within_budget(app):
+    result = app.test_cli_runner().invoke(args=['auth', 'calibrate-bcrypt', '--target-ms', '0', '--samples', '1'])
+    assert result.exit_code == 0, result.output
+    assert result.output.splitlines()[0].startswith('rounds=4 ')
+    assert result.output.splitlines()[-1] == "recommended BCRYPT_LOG_ROUNDS=4 (current 4)"
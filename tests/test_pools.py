@@ -0,0 +1,80 @@
+import pytest
+from sqlalchemy import exc as sa_exc
+
+
+@pytest.fixture
+def app_config():
+    return {'SQLALCHEMY_ENGINE_OPTIONS': {'pool_size': 2, 'max_overflow': 1, 'pool_timeout': 0.1}}
+
+
+@pytest.fixture
+def admin(app):
+    from flask_jwt_extended import create_access_token
+    with app.app_context():
+        return {'Authorization': f"Bearer {create_access_token(identity={'id': 1, 'is_admin': True})}"}
+
+
+def test_engine_uses_the_configured_instrumented_pool(app):
+    from app import db
+    from app.pools import InstrumentedQueuePool
+
+    with app.app_context():
+        pool = db.engine.pool
+    assert isinstance(pool, InstrumentedQueuePool)
+    assert (pool.size(), pool._max_overflow) == (2, 1)
+
+
+def test_pool_counts_checkouts_overflow_and_timeouts(app):
+    from app import db
+
+    with app.app_context():
+        pool = db.engine.pool
+        before = pool.describe()
+        held = [db.engine.connect() for _ in range(3)]
+        with pytest.raises(sa_exc.TimeoutError):
+            db.engine.connect()
+        described = pool.describe()
+        for connection in held:
+            connection.close()
+    assert described['checkouts'] - before['checkouts'] == 3
+    assert (described['overflow_events'], described['timeouts']) == (1, 1)
+    assert (described['checked_out'], described['overflow'], described['max_overflow']) == (3, 1, 1)
+
+
+def test_in_memory_sqlite_keeps_its_own_pool():
+    from app.pools import configure_engine_options
+
+    config = {'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'SQLALCHEMY_ENGINE_OPTIONS': {'pool_size': 2}}
+    configure_engine_options(config)
+    assert config['SQLALCHEMY_ENGINE_OPTIONS'] == {'pool_size': 2}
+
+
+def test_mongo_pool_listener_tracks_connections():
+    from types import SimpleNamespace
+    from pymongo import monitoring
+    from app.mongo_monitoring import MongoPoolListener
+
+    listener, address = MongoPoolListener(), ('mongo', 27017)
+    listener.connection_created(SimpleNamespace(address=address))
+    listener.connection_checked_out(SimpleNamespace(address=address, duration=0.002))
+    listener.connection_check_out_failed(
+        SimpleNamespace(address=address, reason=monitoring.ConnectionCheckOutFailedReason.TIMEOUT)
+    )
+    server = listener.describe()['mongo:27017']
+    assert (server['open'], server['checked_out'], server['checkouts'], server['timeouts']) == (1, 1, 1, 1)
+    assert server['wait_max_ms'] == 2.0
+
+
+def test_pool_metrics_are_for_admins_only(client, users, admin):
+    assert client.get('/api/admin/metrics/pools/', headers=users[0][1]).status_code == 403
+    response = client.get('/api/admin/metrics/pools/', headers=admin)
+    assert response.status_code == 200
+    data = response.get_json()['data']
+    assert data['sqlalchemy']['default']['size'] == 2
+    assert data['replicas'] == {}
+
+
+def test_redacted_urls_hide_passwords():
+    from app.pools import redacted
+    assert redacted('postgresql://flog:secret@db:5432/flog') == 'postgresql://flog:***@db:5432/flog'
+    assert redacted('redis://:secret@cache:6379/1') == 'redis://:***@cache:6379/1'
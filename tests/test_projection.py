@@ -0,0 +1,54 @@
+import pytest
+
+
+def list_articles(client, **args):
+    response = client.get('/api/articles/', query_string=args)
+    return response.status_code, response.get_json()
+
+
+def page_selects(statements):
+    return [statement for statement in statements if statement.startswith('SELECT') and 'LIMIT' in statement]
+
+
+@pytest.mark.parametrize('fast', [False, True])
+def test_fields_limit_the_response_and_the_query(app, client, users, make_articles, statements, fast):
+    app.config['FAST_SERIALIZER'] = fast
+    make_articles(users[0][0], 2)
+    statements.clear()
+    status, body = list_articles(client, fields='title, slug')
+    assert status == 200
+    assert [set(article) for article in body['data']] == [{'id', 'slug', 'title'}] * 2
+    select, = page_selects(statements)
+    assert 'content' not in select and 'search_vector' not in select
+    # the cursor still works off created_at
+    assert body['meta']['next'] is None and body['meta']['limit'] == 20
+
+
+@pytest.mark.parametrize('fast', [False, True])
+def test_summary_view_leaves_out_the_body(app, client, users, make_articles, statements, fast):
+    from app.schemas import ARTICLE_VIEWS
+
+    app.config['FAST_SERIALIZER'] = fast
+    make_articles(users[0][0], 1)
+    statements.clear()
+    status, body = list_articles(client, view='summary')
+    assert status == 200
+    assert set(body['data'][0]) == set(ARTICLE_VIEWS['summary'])
+    assert body['data'][0]['excerpt'] == 'content of article 0'
+    assert 'content' not in page_selects(statements)[0]
+
+
+def test_without_projection_every_field_is_returned(client, users, make_articles):
+    from app.schemas import ARTICLE_FIELDS
+
+    make_articles(users[0][0], 1)
+    assert set(list_articles(client)[1]['data'][0]) == ARTICLE_FIELDS
+
+
+@pytest.mark.parametrize('args, message', [
+    ({'fields': 'title,password'}, 'unknown fields: password'),
+    ({'view': 'everything'}, 'unknown view: everything'),
+])
+def test_unknown_fields_and_views_are_bad_requests(client, args, message):
+    status, body = list_articles(client, **args)
+    assert (status, body['message']) == (400, message)
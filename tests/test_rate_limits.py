@@ -0,0 +1,89 @@
+import pytest
+
+LOGIN = 'mutation Login($email: String!) { login(email: $email, password: "wrong") { response { status } } }'
+
+
+@pytest.fixture
+def app_config():
+    return {
+        'RATE_LIMIT_ENABLED': True,
+        'RATE_LIMITS': {'login': [{'limit': 3, 'period': 60, 'key': 'ip'}]},
+        'PROXY_FIX_X_FOR': 1,
+        'ADMISSION_CONTROL': True,
+        'ADMISSION_INITIAL_LIMIT': 8,
+        'ADMISSION_MAX_QUEUE_MS': 50,
+    }
+
+
+def rest_login(client, ip):
+    return client.post('/api/auth/login/', json={'email': 'user0@example.com', 'password': 'wrong'},
+                       headers={'X-Forwarded-For': ip})
+
+
+def graphql_login(client, ip, query=LOGIN):
+    return client.post('/graphql/auth', json={'query': query, 'variables': {'email': 'nobody@example.com'}},
+                       headers={'X-Forwarded-For': ip})
+
+
+def test_rest_limit_answers_429_with_retry_after(client, users):
+    statuses = [rest_login(client, '203.0.113.1').status_code for _ in range(3)]
+    assert statuses == [401, 401, 401]
+    response = rest_login(client, '203.0.113.1')
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) > 0
+    assert response.headers['RateLimit-Remaining'] == '0'
+
+
+def test_clients_behind_the_proxy_have_their_own_buckets(client, users):
+    for _ in range(3):
+        rest_login(client, '203.0.113.1')
+    assert rest_login(client, '203.0.113.1').status_code == 429
+    assert rest_login(client, '203.0.113.2').status_code == 401
+
+
+def test_graphql_mutation_limit_is_checked_before_execution(client):
+    for _ in range(3):
+        response = graphql_login(client, '203.0.113.1')
+        assert response.status_code == 200
+        assert response.get_json()['data']['login']['response']['status'] == 'error'
+    response = graphql_login(client, '203.0.113.1')
+    assert response.status_code == 429
+    assert 'Retry-After' in response.headers
+    assert response.get_json()['errors'][0]['message'] == "rate limit exceeded, retry later"
+
+
+def test_graphql_aliased_mutations_each_take_a_token(client):
+    query = 'mutation { a: login(email: "x", password: "y") { accessToken } b: login(email: "x", password: "y") { accessToken } }'
+    assert graphql_login(client, '203.0.113.1', query).status_code == 200
+    assert graphql_login(client, '203.0.113.1').status_code == 200
+    assert graphql_login(client, '203.0.113.1').status_code == 429
+
+
+def test_client_request_start_header_is_ignored_by_default(client):
+    from app.admission import admission_controller
+
+    response = client.get('/api/articles/', headers={'X-Request-Start': 't=1'})
+    assert response.status_code == 200
+    assert admission_controller.describe()['limit'] == 8
+
+
+def test_trusted_request_start_sheds_without_shrinking_the_limit(app, client):
+    from app.admission import admission_controller
+
+    admission_controller.trust_request_start = True
+    response = client.get('/api/articles/', headers={'X-Request-Start': 't=1'})
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+    assert admission_controller.describe()['limit'] == 8
+
+
+def test_saturated_requests_are_shed_and_shrink_the_limit(client):
+    from app.admission import admission_controller
+
+    admission_controller.in_flight = 8
+    try:
+        response = client.get('/api/articles/')
+    finally:
+        admission_controller.in_flight = 0
+    assert response.status_code == 503
+    assert admission_controller.describe()['limit'] == 7
@@ -0,0 +1,77 @@
+import pytest
+
+
+@pytest.fixture
+def socket_client(app):
+    from app import socketio
+    clients = []
+
+    def connect(headers=None):
+        token = headers['Authorization'].split()[1] if headers else None
+        client = socketio.test_client(app, auth={'token': token} if token else None)
+        clients.append(client)
+        return client
+
+    yield connect
+    for client in clients:
+        if client.is_connected():
+            client.disconnect()
+
+
+def events(client, name):
+    return [event['args'][0] for event in client.get_received() if event['name'] == name]
+
+
+def tick(app, deltas):
+    from app.realtime import like_events
+    with like_events._lock:
+        like_events._pending.update(deltas)
+    with app.app_context():
+        return like_events.tick()
+
+
+def test_anyone_can_follow_a_public_article(socket_client, users, make_articles):
+    (author_id, _), _ = users
+    article_id = make_articles(author_id, 1)[0]
+    client = socket_client()
+    assert client.emit('subscribe', {'article_id': article_id}, callback=True)['status'] == 'success'
+    assert client.emit('unsubscribe', {'article_id': article_id}, callback=True)['status'] == 'success'
+
+
+def test_drafts_are_only_open_to_their_author(socket_client, users, make_articles):
+    (author_id, author), (_, reader) = users
+    draft_id = make_articles(author_id, 1, is_public=False)[0]
+    assert socket_client().emit('subscribe', {'article_id': draft_id}, callback=True)['status'] == 'error'
+    assert socket_client(reader).emit('subscribe', {'article_id': draft_id}, callback=True)['status'] == 'error'
+    assert socket_client(author).emit('subscribe', {'article_id': draft_id}, callback=True)['status'] == 'success'
+    assert socket_client().emit('subscribe', {'article_id': 10 ** 6}, callback=True)['status'] == 'error'
+
+
+def test_user_rooms_are_only_open_to_their_owner(socket_client, users):
+    (author_id, author), (_, reader) = users
+    assert socket_client(reader).emit('subscribe', {'user_id': author_id}, callback=True)['status'] == 'error'
+    assert socket_client(author).emit('subscribe', {'user_id': author_id}, callback=True)['status'] == 'success'
+
+
+def test_tick_coalesces_likes_per_room(app, client, socket_client, users, make_articles):
+    (author_id, author), _ = users
+    public_id = make_articles(author_id, 1)[0]
+    draft_id = make_articles(author_id, 1, is_public=False, title='Draft')[0]
+    follower, owner = socket_client(), socket_client(author)
+    follower.emit('subscribe', {'article_id': public_id})
+    owner.emit('subscribe', {'article_id': draft_id})
+    # published, followed, then unpublished: the follower keeps its room membership
+    client.put(f'/api/articles/{draft_id}/public/', headers=author)
+    follower.emit('subscribe', {'article_id': draft_id})
+    client.put(f'/api/articles/{draft_id}/private/', headers=author)
+    follower.get_received()
+    owner.get_received()
+
+    assert tick(app, {public_id: 3, draft_id: 2}) == 2
+    assert events(follower, 'like_count') == [{'article_id': public_id, 'delta': 3}]
+    received = owner.get_received()
+    assert [event['name'] for event in received] == ['article_likes']
+    assert sorted(received[0]['args'][0], key=lambda change: change['article_id']) == [
+        {'article_id': public_id, 'delta': 3}, {'article_id': draft_id, 'delta': 2},
+    ]
+    assert tick(app, {public_id: 0}) == 0
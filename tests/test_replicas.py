@@ -0,0 +1,78 @@
+"""Read routing against a primary and a replica kept in two local SQLite files.
+
+The replica is a copy of the primary taken with `replicate()`, so anything
+written after the copy is only visible on the primary, which is what tells
+the two apart.
+"""
+import sqlite3
+
+import pytest
+
+
+@pytest.fixture
+def app_config(tmp_path):
+    return {
+        'SQLALCHEMY_REPLICA_URIS': [f"sqlite:///{tmp_path / 'replica.sqlite'}"],
+        'DB_REPLICA_STICKY_SECONDS': 60,
+    }
+
+
+@pytest.fixture
+def replicate(app, tmp_path):
+    def replicate():
+        source, target = sqlite3.connect(tmp_path / 'primary.sqlite'), sqlite3.connect(tmp_path / 'replica.sqlite')
+        source.backup(target)
+        source.close()
+        target.close()
+    return replicate
+
+
+def titles(client, headers=None):
+    response = client.get('/api/articles/?limit=50', headers=headers or {})
+    assert response.status_code == 200
+    return {article['title'] for article in response.get_json().get('data', [])}
+
+
+def test_writer_reads_from_primary_and_others_from_replica(client, users, make_articles, replicate):
+    (author_id, author), (_, reader) = users
+    make_articles(author_id, 2)
+    replicate()
+    response = client.post('/api/articles/', json={'title': 'written after the copy', 'content': 'x', 'is_public': True}, headers=author)
+    assert response.status_code == 201
+
+    assert 'written after the copy' not in titles(client)
+    assert 'written after the copy' not in titles(client, reader)
+    assert 'written after the copy' in titles(client, author)
+
+
+def test_article_cache_is_filled_from_primary(app, client, users, make_articles, replicate):
+    from app import db
+    from app.models import Article
+
+    (author_id, author), (_, reader) = users
+    article_id = make_articles(author_id, 1)[0]
+    with app.app_context():
+        slug = db.session.get(Article, article_id).slug
+    replicate()
+    response = client.put(f'/api/articles/{article_id}/', json={'content': 'updated on the primary'}, headers=author)
+    assert response.status_code == 200
+
+    response = client.get(f'/api/articles/{slug}/', headers=reader)
+    assert response.status_code == 200
+    assert response.get_json()['data']['content'] == 'updated on the primary'
+
+
+def test_unreachable_replica_is_taken_out_of_rotation(app, client, users, make_articles, tmp_path):
+    from app import db
+    from app.replicas import replica_router
+
+    author_id, _ = users[0]
+    make_articles(author_id, 1)
+    # a directory where the database file should be can't be opened
+    with app.app_context():
+        db.engines['replica_0'].dispose()
+    (tmp_path / 'replica.sqlite').unlink(missing_ok=True)
+    (tmp_path / 'replica.sqlite').mkdir()
+    replica_router.refresh()
+    assert not any(replica.healthy for replica in replica_router.replicas)
+    assert 'Article 0' in titles(client)
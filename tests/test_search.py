@@ -0,0 +1,79 @@
+"""Search paging and caching.
+
+The ranked @@ query needs PostgreSQL, so these tests seed the cached top-N
+ids it would have produced and cover everything that runs from there.
+"""
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+def register_functions(dbapi_connection, connection_record):
+    if type(dbapi_connection).__module__.startswith('sqlite3'):
+        dbapi_connection.create_function('websearch_to_tsquery', 2, lambda config, query: query)
+        dbapi_connection.create_function(
+            'ts_headline', 4, lambda config, text, query, options: text.replace(query, f'<b>{query}</b>')
+        )
+
+
+@pytest.fixture(autouse=True)
+def headline_functions():
+    event.listen(Engine, 'connect', register_functions)
+    yield
+    event.remove(Engine, 'connect', register_functions)
+
+
+@pytest.fixture
+def ranked(app, users, make_articles):
+    """Public article ids in a made-up rank order, cached for the query 'content'."""
+    from app.cache import search_cache
+
+    author_id, _ = users[0]
+    ids = make_articles(author_id, 5)
+    make_articles(author_id, 1, is_public=False, title='Draft')
+    ranking = [ids[2], ids[0], ids[4], ids[1], ids[3]]
+    search_cache.set('content', ranking)
+    return ranking
+
+
+def search(client, args=None, **body):
+    response = client.post('/api/articles/search/', query_string=args, json=body)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_pages_follow_the_cached_ranking(client, ranked):
+    first = search(client, q='  Content ', limit=2)
+    assert [item['id'] for item in first['data']] == ranked[:2]
+    assert first['meta'] == {'limit': 2, 'offset': 0, 'next_offset': 2}
+    last = search(client, q='content', limit=2, offset=4)
+    assert [item['id'] for item in last['data']] == ranked[4:]
+    assert last['meta']['next_offset'] is None
+
+
+def test_results_carry_snippets_and_skip_the_body(client, ranked):
+    item = search(client, q='content', limit=1)['data'][0]
+    assert item['snippet'].startswith('<b>content</b> of article')
+    assert 'content' not in item and 'search_vector' not in item
+    item = search(client, {'fields': 'id,content'}, q='content', limit=1)['data'][0]
+    assert item['snippet'] and 'content' in item
+
+
+def test_article_commits_clear_the_cache(client, users, ranked):
+    from app.cache import search_cache
+
+    author = users[0][1]
+    assert client.put(f'/api/articles/{ranked[0]}/', json={'content': 'edited'}, headers=author).status_code == 200
+    assert search_cache.get('content') is None
+
+
+@pytest.mark.parametrize('body, status, message', [
+    ({'q': ''}, 200, None),
+    ({'q': 'content', 'limit': 'many'}, 400, 'limit and offset must be integers'),
+    ({'q': 'content', 'offset': None}, 400, 'limit and offset must be integers'),
+])
+def test_invalid_searches(client, body, status, message):
+    response = client.post('/api/articles/search/', json=body)
+    assert response.status_code == status
+    if message:
+        assert response.get_json()['message'] == message
@@ -0,0 +1,55 @@
+"""search_vector upkeep; on SQLite the shims make a vector the title followed by the content."""
+
+
+def vectors(app):
+    from app import db
+    from app.models import Article
+    with app.app_context():
+        return dict(db.session.execute(db.select(Article.id, Article.search_vector).order_by(Article.id)).all())
+
+
+def test_vector_follows_title_and_content(app, client, users):
+    author = users[0][1]
+    response = client.post('/api/articles/', json={'title': 'Tea', 'content': 'green', 'is_public': True}, headers=author)
+    article_id = response.get_json()['data']['id']
+    assert vectors(app) == {article_id: 'Teagreen'}
+    client.put(f'/api/articles/{article_id}/', json={'content': 'black'}, headers=author)
+    assert vectors(app) == {article_id: 'Teablack'}
+    client.put(f'/api/articles/{article_id}/', json={'title': 'Coffee'}, headers=author)
+    assert vectors(app) == {article_id: 'Coffeeblack'}
+
+
+def test_flag_changes_leave_the_vector_alone(app, client, users, make_articles, statements):
+    author_id, author = users[0]
+    article_id = make_articles(author_id, 1)[0]
+    statements.clear()
+    assert client.put(f'/api/articles/{article_id}/private/', headers=author).status_code == 200
+    assert client.put(f'/api/articles/{article_id}/', json={'hero_image': 'tea.png'}, headers=author).status_code == 200
+    updates = [statement for statement in statements if statement.startswith('UPDATE')]
+    assert len(updates) == 2
+    assert not any('to_tsvector' in statement for statement in updates)
+
+
+def test_reindex_rebuilds_in_batches_and_resumes(app, users, make_articles):
+    from app import db
+    from app.models import Article
+
+    author_id, _ = users[0]
+    ids = make_articles(author_id, 5)
+    with app.app_context():
+        db.session.execute(db.update(Article).values(search_vector='stale'))
+        db.session.commit()
+        before = dict(db.session.execute(db.select(Article.id, Article.updated_at)).all())
+
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=['articles', 'reindex', '--batch-size', '2', '--rate', '100000', '--after-id', str(ids[1])])
+    assert result.exit_code == 0, result.output
+    assert f"resume with --after-id {ids[3]}" in result.output
+    assert "done, 3 articles reindexed" in result.output
+    assert list(vectors(app).values()) == ['stale', 'stale'] + [f"Article {n}content of article {n}" for n in (2, 3, 4)]
+
+    result = runner.invoke(args=['articles', 'reindex', '--rate', '100000'])
+    assert "done, 5 articles reindexed" in result.output
+    with app.app_context():
+        # a reindex isn't an edit
+        assert dict(db.session.execute(db.select(Article.id, Article.updated_at)).all()) == before
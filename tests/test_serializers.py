@@ -0,0 +1,58 @@
+import uuid
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+import pytest
+from flask import jsonify
+
+
+@dataclass
+class Point:
+    x: float
+    y: float
+
+
+ROWS = [
+    {'id': 1, 'title': 'café \U0001f600\x7f', 'created_at': datetime(2024, 5, 1, 12, 30, 5), 'score': 0.1},
+    {'id': 2, 'updated_at': datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc), 'on': date(2024, 5, 1), 'ratio': 1.5},
+    {'small': 1e-05, 'large': 1e16, 'nan': float('nan'), 'inf': float('-inf'), 'zero': -0.0},
+    {'uuid': uuid.UUID(int=7), 'price': Decimal('1.10'), 'point': Point(0.5, 2.0), 'none': None, 'tags': ('a', 1.25)},
+    {'id': 3, 'title': 'plain', 'score': 2.5, 'public': True, 'tags': ['a', 'b']},
+    {1: 'int keys', 2: 'are converted', 10: 'and sorted as ints'},
+]
+
+
+@pytest.mark.parametrize('provider', ['bson', 'default'])
+@pytest.mark.parametrize('debug', [False, True])
+@pytest.mark.parametrize('row', ROWS)
+def test_json_response_is_byte_identical_to_jsonify(app, row, debug, provider):
+    from flask.json.provider import DefaultJSONProvider
+    from app.serializers import json_response
+
+    # flask_pymongo installs its BSONProvider along with the mongo subsystem
+    if provider == 'default':
+        app.json = DefaultJSONProvider(app)
+    app.debug = debug
+    with app.app_context():
+        try:
+            expected = jsonify([row]).get_data()
+        except (TypeError, ValueError) as e:
+            # bson has no encoding for dates or UUIDs
+            with pytest.raises(type(e)):
+                json_response([row])
+        else:
+            assert json_response([row]).get_data() == expected
+
+
+def test_fast_serializer_lists_articles_like_marshmallow(app, client, users, make_articles):
+    author_id, author = users[0]
+    make_articles(author_id, 3)
+    make_articles(author_id, 2, is_public=False, title='Draft')
+    bodies = []
+    for fast in (False, True):
+        app.config['FAST_SERIALIZER'] = fast
+        response = client.get('/api/articles/?limit=4&fields=id,title,created_at', headers=author)
+        assert response.status_code == 200
+        bodies.append(response.get_data())
+    assert bodies[0] == bodies[1]
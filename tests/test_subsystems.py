@@ -0,0 +1,57 @@
+import click
+import pytest
+
+
+@pytest.fixture
+def app_config(request):
+    return getattr(request, 'param', {})
+
+
+def rules(app):
+    return {rule.rule for rule in app.url_map.iter_rules()}
+
+
+def test_web_role_builds_graphql_on_first_request(app, client):
+    assert app.config['SUBSYSTEMS'] == {'rest', 'graphql', 'socketio', 'celery', 'mongo', 'cli'}
+    view = app.view_functions['graphql']
+    assert view._view is None
+    response = client.post('/graphql/auth', json={'query': '{ __typename }'})
+    assert response.get_json() == {'data': {'__typename': 'Query'}}
+    assert view._view is not None
+
+
+@pytest.mark.parametrize('app_config', [{'APP_ROLE': 'worker'}], indirect=True)
+def test_worker_role_serves_nothing(app):
+    assert app.config['SUBSYSTEMS'] == {'celery', 'mongo'}
+    assert not any(rule.startswith(('/api', '/graphql')) for rule in rules(app))
+    assert 'articles' not in app.cli.commands
+
+
+@pytest.mark.parametrize('app_config', [{'APP_SUBSYSTEMS': ['rest', 'mongo']}], indirect=True)
+def test_app_subsystems_override_the_role(app, client, users):
+    assert '/graphql/auth' not in rules(app)
+    assert client.get('/api/articles/').status_code == 200
+    assert client.get('/api/auth/profile/', headers=users[0][1]).status_code == 200
+
+
+def test_cli_subsystems_join_under_the_flask_command():
+    from app.subsystems import enabled_subsystems
+
+    config = {'ROLE_SUBSYSTEMS': {'worker': ('celery',)}, 'APP_SUBSYSTEMS': []}
+    assert enabled_subsystems(config, 'worker') == {'celery'}
+    with click.Context(click.Command('flask')):
+        assert enabled_subsystems(config, 'worker') == {'celery', 'cli', 'migrate'}
+    with pytest.raises(ValueError, match='unknown app role: api'):
+        enabled_subsystems(config, 'api')
+
+
+def test_parse_importtime():
+    from app.commands import parse_importtime
+
+    output = "\n".join((
+        "import time: self [us] | cumulative | imported package",
+        "import time:       120 |        120 |   _io",
+        "import time:      2048 |       5000 | flask.app",
+        "unrelated line",
+    ))
+    assert parse_importtime(output) == [('_io', 120, 120), ('flask.app', 2048, 5000)]
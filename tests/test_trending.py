@@ -0,0 +1,106 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+
+@pytest.fixture
+def app_config():
+    return {
+        'TRENDING_REFRESH_INTERVAL': 0,
+        'TRENDING_LOCAL_TTL': 0,
+        # flushed by the tests themselves
+        'TRENDING_FLUSH_INTERVAL': 3600,
+    }
+
+
+def add_likes(app, likes):
+    """`likes` are (user_id, article_id, hours ago)."""
+    from app import db
+    from app.models import Like
+    now = datetime.now()
+    with app.app_context():
+        db.session.add_all(
+            Like(user_id=user_id, article_id=article_id, created_at=now - timedelta(hours=hours))
+            for user_id, article_id, hours in likes
+        )
+        db.session.commit()
+
+
+def rebuild(app):
+    from app.tasks import refresh_trending_articles
+    with app.app_context():
+        refresh_trending_articles.delay().get()
+
+
+def ranking(client, **args):
+    response = client.get('/api/articles/trending/', query_string=args)
+    assert response.status_code == 200
+    body = response.get_json()
+    return [(item['id'], item['trending_score']) for item in body.get('data', [])], body['meta']
+
+
+def test_recent_likes_outrank_older_ones(app, client, users, make_articles):
+    (first, _), (second, _) = users
+    older, recent, stale, draft = make_articles(first, 4)
+    add_likes(app, [
+        (first, older, 12), (second, older, 12),
+        (first, recent, 0),
+        # outside the 48 hour window
+        (first, stale, 50), (second, stale, 50),
+        (first, draft, 0),
+    ])
+    client.put(f'/api/articles/{draft}/private/', headers=users[0][1])
+    rebuild(app)
+
+    ranked, meta = ranking(client)
+    assert [article_id for article_id, _ in ranked] == [recent, older]
+    # two likes, two half-lives ago
+    assert [score for _, score in ranked] == pytest.approx([1.0, 0.5], abs=0.01)
+    assert meta['generated_at'] is not None
+
+
+def test_pages_and_skips_articles_hidden_since_the_rebuild(app, client, users, make_articles):
+    (first, author), (second, _) = users
+    ids = make_articles(first, 4)
+    add_likes(app, [(first, article_id, hours) for hours, article_id in enumerate(ids)])
+    rebuild(app)
+
+    page, meta = ranking(client, limit=2)
+    assert ([article_id for article_id, _ in page], meta['next_offset']) == (ids[:2], 2)
+    page, meta = ranking(client, limit=2, offset=2)
+    assert ([article_id for article_id, _ in page], meta['next_offset']) == (ids[2:], None)
+
+    client.put(f'/api/articles/{ids[0]}/private/', headers=author)
+    page, _ = ranking(client, limit=2)
+    assert [article_id for article_id, _ in page] == [ids[1]]
+
+
+def test_likes_between_rebuilds_are_added_once_flushed(app, client, users, make_articles):
+    from app.trending import trending
+
+    (first, author), (second, reader) = users
+    leader, challenger = make_articles(first, 2)
+    add_likes(app, [(first, leader, 1)])
+    rebuild(app)
+    for headers in (author, reader):
+        assert client.get(f'/api/articles/{challenger}/like/', headers=headers).status_code == 200
+    assert [article_id for article_id, _ in ranking(client)[0]] == [leader]
+    trending._increments.flush()
+    assert [article_id for article_id, _ in ranking(client)[0]] == [challenger, leader]
+
+    for headers in (author, reader):
+        assert client.get(f'/api/articles/{challenger}/unlike/', headers=headers).status_code == 200
+    trending._increments.flush()
+    # unliked down to nothing, so it drops out
+    assert [article_id for article_id, _ in ranking(client)[0]] == [leader]
+
+
+def test_first_read_starts_a_rebuild(app, client, users, make_articles):
+    from app.trending import trending
+
+    article_id = make_articles(users[0][0], 1)[0]
+    add_likes(app, [(users[0][0], article_id, 1)])
+    ranked, meta = ranking(client)
+    assert (ranked, meta['generated_at']) == ([], None)
+    trending._rebuilder.join(5)
+    assert [article_id for article_id, _ in ranking(client)[0]] == [article_id]